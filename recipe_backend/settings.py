@@ -144,6 +144,21 @@ STATIC_URL = "static/"
 MEDIA_URL= '/media/'
 MEDIA_ROOT= BASE_DIR / 'media'
 
+# Semantic recipe search. SEMANTIC_SEARCH_MODEL is a saved .keras model mapping
+# raw strings to embeddings; train one with `python manage.py
+# train_semantic_encoder`. Without it a lexical hashing encoder is used.
+# Build the index with `python manage.py build_semantic_index`.
+SEMANTIC_SEARCH_MODEL = config("SEMANTIC_SEARCH_MODEL", default="")
+SEMANTIC_INDEX_DIR = Path(config("SEMANTIC_INDEX_DIR", default=str(BASE_DIR / "semantic_index")))
+
+# Barcode scanning of grocery photos. Batches are decoded in a process pool
+# with this many workers; 0 uses one per CPU, 1 decodes in the web process.
+BARCODE_WORKERS = config("BARCODE_WORKERS", default=0, cast=int)
+
+# Receipt OCR runs as background jobs; Tesseract is CPU heavy, so its process
+# pool is bounded to OCR_WORKERS per web process (1 runs on the job thread).
+OCR_WORKERS = config("OCR_WORKERS", default=2, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -220,4 +235,8 @@ CACHES = {
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
 
-CACHE_MIDDLEWARE_KEY_PREFIX = 'recipes_app'
\ No newline at end of file
+CACHE_MIDDLEWARE_KEY_PREFIX = 'recipes_app'
+
+# Fraction of cache fills whose pickled size is measured for /metrics/cache/
+# (each measurement pickles the value again); 0 turns it off.
+CACHE_METRICS_PAYLOAD_SAMPLE_RATE = config("CACHE_METRICS_PAYLOAD_SAMPLE_RATE", default=0.05, cast=float)
\ No newline at end of file
@@ -21,7 +21,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from recipes.views.viewsets import GoogleLogin
 from recipes.views.auth_views import UserDetailView
-from recipes.views.stats_views import UserStatisticsView
+from recipes.views.stats_views import UserStatisticsView, CacheMetricsView
 from recipes.views.shopping_list_views import ShoppingListView
 
 urlpatterns = [
@@ -38,6 +38,7 @@ urlpatterns = [
     path("user/details/", UserDetailView.as_view(), name="user-details"),
     path("user/statistics/", UserStatisticsView.as_view(), name="user-statistics"),
     path("shopping-list/", ShoppingListView.as_view(), name="shopping-list"),
+    path("metrics/cache/", CacheMetricsView.as_view(), name="cache-metrics"),
 ]
 
 
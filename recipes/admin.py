@@ -16,6 +16,8 @@ from .models import (
     FodmapCategory,
     RecipeIngredient,
     Feedback,
+    Product,
+    IngestionJob,
 )
 from .models.policy import DietTypeRule, RestrictionRule, DietProtocol, DietProtocolRule, UserProtocol
 
@@ -79,7 +81,7 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Unit)
 class UnitAdmin(admin.ModelAdmin):
-    list_display = ["name", "unit_type"]
+    list_display = ["name", "unit_type", "to_base_factor"]
     list_filter = ["unit_type"]
     search_fields = ["name"]
 
@@ -97,6 +99,22 @@ class InventoryAdmin(admin.ModelAdmin):
     search_fields = ["user__username", "ingredient__name"]
     autocomplete_fields = ["user", "ingredient", "unit"]
 
+
+@admin.register(Product)
+class ProductAdmin(admin.ModelAdmin):
+    list_display = ["gtin", "name", "brand", "quantity", "ingredient"]
+    list_filter = [("ingredient", admin.EmptyFieldListFilter)]
+    search_fields = ["gtin", "name", "brand"]
+    autocomplete_fields = ["ingredient", "package_unit"]
+
+
+@admin.register(IngestionJob)
+class IngestionJobAdmin(admin.ModelAdmin):
+    list_display = ["user", "kind", "status", "processed", "total", "created_at", "finished_at"]
+    list_filter = ["kind", "status"]
+    search_fields = ["user__username"]
+    readonly_fields = ["result", "error"]
+
 @admin.register(Feedback)
 class FeedbackAdmin(admin.ModelAdmin):
     list_display = ['user','recipe','rating','created_at']
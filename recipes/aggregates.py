@@ -0,0 +1,203 @@
+"""Incremental maintenance of denormalized aggregates.
+
+Write hooks on Feedback and RecipePreference apply +/- deltas, so readers
+never have to aggregate the raw tables. Each hook receives the row state
+before and after the write as plain dicts (None for a missing side).
+"""
+
+# pylint: disable=no-member
+
+from collections import Counter, defaultdict
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Q, Sum, Count, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce
+from .models import Recipe, Feedback, RecipePreference, UserStatistics
+from .search.suggest import title_suggest_index
+
+User = get_user_model()
+
+
+def _active_feedback(state):
+    return state if state and state["is_active"] else None
+
+
+def _favorite(state):
+    return state if state and state["preference"] == "favorite" else None
+
+
+def feedback_changed(old, new):
+    old, new = _active_feedback(old), _active_feedback(new)
+    if old == new:
+        return
+    user_deltas = defaultdict(list)
+    for state, sign in ((old, -1), (new, 1)):
+        if state is None:
+            continue
+        rating = sign * (state["rating"] or 0)
+        if state["recipe_id"] is not None:
+            shift_recipe_ratings(state["recipe_id"], rating, sign)
+        user_deltas[state["user_id"]].append(
+            {"recipe_id": state["recipe_id"], "ratings_count": sign, "rating_sum": rating}
+        )
+    for user_id, deltas in user_deltas.items():
+        shift_user_statistics(user_id, deltas)
+
+
+def recipe_preference_changed(old, new):
+    old, new = _favorite(old), _favorite(new)
+    if old == new:
+        return
+    user_deltas = defaultdict(list)
+    for state, sign in ((old, -1), (new, 1)):
+        if state is None:
+            continue
+        shift_recipe_favorites(state["recipe_id"], sign)
+        user_deltas[state["user_id"]].append({"recipe_id": state["recipe_id"], "favorites_count": sign})
+    for user_id, deltas in user_deltas.items():
+        shift_user_statistics(user_id, deltas)
+
+
+# Recipe aggregates
+
+def shift_recipe_ratings(recipe_id, rating_delta, count_delta):
+    Recipe.all_objects.filter(pk=recipe_id).update(
+        rating_sum=F("rating_sum") + rating_delta,
+        rating_count=F("rating_count") + count_delta,
+    )
+    # Queryset updates send no signals, so re-score the title suggestions here
+    title_suggest_index.update([recipe_id])
+
+
+def shift_recipe_favorites(recipe_id, delta):
+    Recipe.all_objects.filter(pk=recipe_id).update(
+        favorites_count=F("favorites_count") + delta
+    )
+    title_suggest_index.update([recipe_id])
+
+
+def expected_recipe_aggregates():
+    """Subquery expressions recomputing the aggregates from the raw tables"""
+    ratings = (
+        Feedback.objects.filter(recipe=OuterRef("pk"))
+        .order_by()
+        .values("recipe")
+    )
+    favorites = (
+        RecipePreference.objects.filter(recipe=OuterRef("pk"), preference="favorite")
+        .order_by()
+        .values("recipe")
+    )
+    return {
+        "rating_sum": Coalesce(
+            Subquery(ratings.annotate(s=Sum("rating")).values("s"), output_field=IntegerField()), 0
+        ),
+        "rating_count": Coalesce(
+            Subquery(ratings.annotate(c=Count("id")).values("c"), output_field=IntegerField()), 0
+        ),
+        "favorites_count": Coalesce(
+            Subquery(favorites.annotate(c=Count("id")).values("c"), output_field=IntegerField()), 0
+        ),
+    }
+
+
+def drifted_recipes():
+    """Recipes whose stored aggregates disagree with the raw tables"""
+    expected = expected_recipe_aggregates()
+    return Recipe.all_objects.annotate(
+        **{f"expected_{name}": expr for name, expr in expected.items()}
+    ).filter(
+        ~Q(rating_sum=F("expected_rating_sum"))
+        | ~Q(rating_count=F("expected_rating_count"))
+        | ~Q(favorites_count=F("expected_favorites_count"))
+    )
+
+
+def reconcile_recipe_aggregates(recipe_ids):
+    updated = Recipe.all_objects.filter(pk__in=recipe_ids).update(**expected_recipe_aggregates())
+    title_suggest_index.update(recipe_ids)
+    return updated
+
+
+# Per-user statistics
+
+@transaction.atomic
+def shift_user_statistics(user_id, deltas):
+    """Apply interaction deltas to the user's statistics row.
+
+    A user without a row yet gets a full rebuild once the transaction
+    commits, which already includes the write that triggered this call
+    (and creates nothing if the user itself was deleted).
+    """
+    stats = UserStatistics.objects.select_for_update().filter(pk=user_id).first()
+    if stats is None:
+        transaction.on_commit(lambda: rebuild_user_statistics([user_id]))
+        return
+
+    recipes = {
+        row["id"]: row
+        for row in Recipe.all_objects.filter(
+            pk__in=[d["recipe_id"] for d in deltas if d["recipe_id"] is not None]
+        ).values("id", "cuisine", "fodmap_friendly")
+    }
+    for delta in deltas:
+        favorites = delta.get("favorites_count", 0)
+        ratings = delta.get("ratings_count", 0)
+        stats.favorites_count += favorites
+        stats.ratings_count += ratings
+        stats.rating_sum += delta.get("rating_sum", 0)
+
+        recipe = recipes.get(delta["recipe_id"])
+        if recipe is None:
+            continue
+        if recipe["fodmap_friendly"]:
+            stats.fodmap_recipes_tried += ratings
+        cuisine = (recipe["cuisine"] or "").strip()
+        if cuisine:
+            count = stats.cuisine_counts.get(cuisine, 0) + favorites + ratings
+            if count > 0:
+                stats.cuisine_counts[cuisine] = count
+            else:
+                stats.cuisine_counts.pop(cuisine, None)
+    stats.save()
+
+
+def rebuild_user_statistics(user_ids=None):
+    """Recompute statistics rows from the raw tables for the given users (all if None)"""
+    users = User.objects.all()
+    feedback = Feedback.objects.all()
+    favorites = RecipePreference.objects.filter(preference="favorite")
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+        feedback = feedback.filter(user_id__in=user_ids)
+        favorites = favorites.filter(user_id__in=user_ids)
+
+    rows = {
+        user_id: UserStatistics(user_id=user_id, cuisine_counts={})
+        for user_id in users.values_list("pk", flat=True)
+    }
+
+    for row in feedback.values("user_id").annotate(
+        c=Count("id"),
+        s=Coalesce(Sum("rating"), 0),
+        f=Count("id", filter=Q(recipe__fodmap_friendly=True)),
+    ).order_by():
+        stats = rows[row["user_id"]]
+        stats.ratings_count, stats.rating_sum, stats.fodmap_recipes_tried = row["c"], row["s"], row["f"]
+
+    for row in favorites.values("user_id").annotate(c=Count("id")).order_by():
+        rows[row["user_id"]].favorites_count = row["c"]
+
+    cuisines = defaultdict(Counter)
+    for source in (feedback, favorites):
+        for row in source.exclude(recipe__cuisine__isnull=True).exclude(recipe__cuisine="").values(
+            "user_id", "recipe__cuisine"
+        ).annotate(c=Count("id")).order_by():
+            cuisines[row["user_id"]][row["recipe__cuisine"].strip()] += row["c"]
+    for user_id, counts in cuisines.items():
+        rows[user_id].cuisine_counts = dict(counts)
+
+    with transaction.atomic():
+        UserStatistics.objects.filter(pk__in=list(rows)).delete()
+        UserStatistics.objects.bulk_create(rows.values())
+    return len(rows)
@@ -1,12 +1,20 @@
 from django.core.cache import cache
 from django.conf import settings
 import hashlib
-from typing import List, Optional, Union
+import pickle
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Union
 from functools import wraps
 import logging
 
 logger = logging.getLogger(__name__)
 
+_MISSING = object()
+
 class CacheKeys:
     RECIPE_DETAIL = 'recipe:detail:{recipe_id}'
     RECIPE_LIST = 'recipe:list:{filters_hash}'
@@ -14,7 +22,6 @@ class CacheKeys:
     RECIPE_FODMAP = 'recipe:fodmap'
     USER_PROFILE = 'user:profile:{user_id}'
     USER_FAVORITES = 'user:favorites:{user_id}'
-    USER_STATISTICS = 'user:stats:{user_id}'
     INGREDIENT_AUTOCOMPLETE = 'ingredient:autocomplete:{term}'
     
     TTL_SHORT = 60 * 5
@@ -22,8 +29,13 @@ class CacheKeys:
     TTL_LONG = 60 * 60 * 24
     
     @classmethod
-    def get_recipe_detail(cls, recipe_id: str | int) -> str:
-        return cls.RECIPE_DETAIL.format(recipe_id=recipe_id)
+    def get_recipe_detail(cls, recipe_id: str | int, **params) -> str:
+        """Detail key, varied by any response-shaping query params"""
+        key = cls.RECIPE_DETAIL.format(recipe_id=recipe_id)
+        if not params:
+            return key
+        params_str = ':'.join(f'{k}={v}' for k, v in sorted(params.items()))
+        return f"{key}:{hashlib.md5(params_str.encode()).hexdigest()[:8]}"
     
     @classmethod
     def get_recipe_list(cls, **filters) -> str:
@@ -31,6 +43,14 @@ class CacheKeys:
         filters_hash = hashlib.md5(filters_str.encode()).hexdigest()[:8]
         return cls.RECIPE_LIST.format(filters_hash=filters_hash)
     
+    @classmethod
+    def get_recipe_popular(cls, **params) -> str:
+        """Popular list key, varied by any response-shaping query params"""
+        if not params:
+            return cls.RECIPE_POPULAR
+        params_str = ':'.join(f'{k}={v}' for k, v in sorted(params.items()))
+        return f"{cls.RECIPE_POPULAR}:{hashlib.md5(params_str.encode()).hexdigest()[:8]}"
+
     @classmethod
     def get_user_profile(cls, user_id: str | int) -> str:
         return cls.USER_PROFILE.format(user_id=user_id)
@@ -38,7 +58,169 @@ class CacheKeys:
     @classmethod
     def get_user_favorites(cls, user_id: str | int) -> str:
         return cls.USER_FAVORITES.format(user_id=user_id)
-    
+
+    @classmethod
+    def families(cls) -> List[str]:
+        """Static key prefixes of the templates above, longest first"""
+        templates = [
+            value for name, value in vars(cls).items()
+            if name.isupper() and isinstance(value, str)
+        ]
+        prefixes = {template.split('{')[0].rstrip(':') for template in templates}
+        return sorted(prefixes, key=len, reverse=True)
+
+
+_DYNAMIC_SEGMENT = re.compile(r'^(\d+|[0-9a-f-]{8,})$')
+
+
+def key_family(cache_key: str) -> str:
+    """Map a concrete cache key to its family (the prefix before the id/hash)"""
+    for family in CacheKeys.families():
+        if cache_key == family or cache_key.startswith(family + ':'):
+            return family
+    if cache_key.startswith('tag:'):
+        return 'tag'
+    segments = [s for s in cache_key.split(':') if not _DYNAMIC_SEGMENT.match(s)]
+    return ':'.join(segments) or 'other'
+
+
+class CacheMetrics:
+    """Per key family hit/miss/fill/invalidation counters.
+
+    Counters are aggregated in-process under a lock and merged into the shared
+    cache with atomic increments every FLUSH_INTERVAL seconds, so the hot path
+    never does more than a dict update. Payload sizes need a second pickle, so
+    only a CACHE_METRICS_PAYLOAD_SAMPLE_RATE fraction of fills is measured.
+    """
+
+    COUNTERS = ('hits', 'misses', 'fills', 'fill_time_us', 'payload_bytes', 'payload_samples', 'invalidations')
+    FLUSH_INTERVAL = 30
+    COUNTER_KEY = 'metrics:cache:{family}:{counter}'
+    FAMILIES_KEY = 'metrics:cache:families'
+
+    _lock = threading.Lock()
+    _pending: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    _last_flush = time.monotonic()
+
+    @classmethod
+    def record(cls, cache_key: str, **deltas: int):
+        family = key_family(cache_key)
+        with cls._lock:
+            counters = cls._pending[family]
+            for counter, delta in deltas.items():
+                counters[counter] += delta
+            due = time.monotonic() - cls._last_flush >= cls.FLUSH_INTERVAL
+        if due:
+            cls.flush()
+
+    @classmethod
+    def flush(cls):
+        """Merge the in-process counters into the shared cache"""
+        with cls._lock:
+            pending, cls._pending = cls._pending, defaultdict(lambda: defaultdict(int))
+            cls._last_flush = time.monotonic()
+        if not pending:
+            return
+
+        try:
+            families = cache.get(cls.FAMILIES_KEY, set())
+            cache.set(cls.FAMILIES_KEY, families | set(pending), None)
+            for family, counters in pending.items():
+                for counter, delta in counters.items():
+                    if not delta:
+                        continue
+                    key = cls.COUNTER_KEY.format(family=family, counter=counter)
+                    cache.add(key, 0, None)
+                    cache.incr(key, delta)
+        except Exception as e:
+            logger.warning(f'Could not flush cache metrics: {e}')
+
+    @classmethod
+    def snapshot(cls) -> Dict[str, Dict[str, float]]:
+        """Flush local counters and return the aggregated metrics per family"""
+        cls.flush()
+        stats = {}
+        for family in sorted(cache.get(cls.FAMILIES_KEY, set())):
+            keys = {c: cls.COUNTER_KEY.format(family=family, counter=c) for c in cls.COUNTERS}
+            values = cache.get_many(list(keys.values()))
+            row = {c: values.get(k, 0) for c, k in keys.items()}
+            lookups = row['hits'] + row['misses']
+            row['hit_ratio'] = round(row['hits'] / lookups, 4) if lookups else None
+            row['avg_fill_ms'] = (
+                round(row['fill_time_us'] / row['fills'] / 1000, 3) if row['fills'] else None
+            )
+            row['avg_payload_bytes'] = (
+                row['payload_bytes'] // row['payload_samples'] if row['payload_samples'] else None
+            )
+            stats[family] = row
+        return stats
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._pending = defaultdict(lambda: defaultdict(int))
+        families = cache.get(cls.FAMILIES_KEY, set())
+        cache.delete_many([
+            cls.COUNTER_KEY.format(family=family, counter=counter)
+            for family in families
+            for counter in cls.COUNTERS
+        ])
+        cache.delete(cls.FAMILIES_KEY)
+
+
+def _payload_size(value: Any) -> int:
+    """Pickled size of a fill's value, or 0 when this fill is not sampled"""
+    rate = getattr(settings, 'CACHE_METRICS_PAYLOAD_SAMPLE_RATE', 0.05)
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return 0
+    try:
+        return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+def cache_get(cache_key: str, default: Any = None) -> Any:
+    """cache.get that records a hit or miss for the key family"""
+    value = cache.get(cache_key, _MISSING)
+    if value is _MISSING:
+        CacheMetrics.record(cache_key, misses=1)
+        return default
+    CacheMetrics.record(cache_key, hits=1)
+    return value
+
+
+def cache_set(cache_key: str, value: Any, ttl: int, fill_time: Optional[float] = None):
+    """cache.set that records the fill time (seconds) and payload size"""
+    cache.set(cache_key, value, ttl)
+    size = _payload_size(value)
+    CacheMetrics.record(
+        cache_key,
+        fills=1,
+        fill_time_us=int((fill_time or 0) * 1_000_000),
+        payload_bytes=size,
+        payload_samples=1 if size else 0,
+    )
+
+
+def cache_delete(cache_key: str):
+    cache.delete(cache_key)
+    CacheMetrics.record(cache_key, invalidations=1)
+
+
+def get_or_fill(cache_key: str, fill: Callable[[], Any], ttl: int, tags: Optional[List[str]] = None) -> Any:
+    """Return the cached value or compute it with fill(), recording metrics either way"""
+    value = cache_get(cache_key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    started = time.perf_counter()
+    value = fill()
+    cache_set(cache_key, value, ttl, fill_time=time.perf_counter() - started)
+    if tags:
+        CacheTagManager.add_tags(cache_key, tags)
+    return value
+
+
 class CacheTagManager:
     """Invalidate cache based on tags"""
     
@@ -63,7 +245,7 @@ class CacheTagManager:
         tagged_keys = cache.get(tag_key, set())
         
         for key in tagged_keys:
-            cache.delete(key)
+            cache_delete(key)
             
         cache.delete(tag_key)
         logger.info(f'Invalidated {len(tagged_keys)} cache keys for tag {tag}.')
@@ -87,12 +269,13 @@ def cache_with_tags(key_func, tags_func, ttl=CacheKeys.TTL_MEDIUM):
         def wrapper(*args, **kwargs):
             cache_key = key_func(*args, **kwargs)
             
-            cached_value = cache.get(cache_key)
+            cached_value = cache_get(cache_key)
             if cached_value is not None:
                 return cached_value
             
+            started = time.perf_counter()
             result = func(*args, **kwargs)
-            cache.set(cache_key, result, ttl)
+            cache_set(cache_key, result, ttl, fill_time=time.perf_counter() - started)
             tags = tags_func(*args, **kwargs)
             CacheTagManager.add_tags(cache_key, tags)
             
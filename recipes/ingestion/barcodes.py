@@ -0,0 +1,108 @@
+"""Grocery photos to Inventory: decode barcodes, look up products by GTIN, upsert lots.
+
+Each detected barcode counts as one package. A package adds the product's
+package size (e.g. 500 g) when known, otherwise one unit. Every image in
+the batch is decoded in the process pool. Products are fetched with one
+GTIN query, and all lots are written through one bulk upsert.
+"""
+
+# pylint: disable=no-member
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+from django.conf import settings
+from recipes.models import Product
+from recipes.policy.ingredients import resolve_ingredient_names
+from .decoding import decode_images
+from .inventory import bulk_upsert_inventory
+
+MAX_IMAGES = 50
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+
+def upce_to_upca(code: str) -> str:
+    """Expand an 8-digit UPC-E code to its 12-digit UPC-A form"""
+    system, d, check = code[0], code[1:7], code[7]
+    last = d[5]
+    if last in "012":
+        body = d[0:2] + last + "0000" + d[2:5]
+    elif last == "3":
+        body = d[0:3] + "00000" + d[3:5]
+    elif last == "4":
+        body = d[0:4] + "00000" + d[4]
+    else:
+        body = d[0:5] + "0000" + last
+    return system + body + check
+
+
+def gtin14(code: str, symbology: str = "") -> Optional[str]:
+    """Zero-padded GTIN-14 for an EAN-8, UPC-A/E, EAN-13 or GTIN-14 code, or None when the check digit fails"""
+    code = re.sub(r"\D", "", code or "")
+    if symbology == "UPCE" and len(code) == 8:
+        code = upce_to_upca(code)
+    if len(code) not in (8, 12, 13, 14):
+        return None
+    code = code.zfill(14)
+    total = sum(int(digit) * (3 if i % 2 == 0 else 1) for i, digit in enumerate(code[:13]))
+    return code if (10 - total % 10) % 10 == int(code[13]) else None
+
+
+@dataclass
+class ScanResult:
+    gtin: str
+    count: int
+    status: str
+    product: Optional[str] = None
+    ingredient_id: Optional[object] = None
+    inventory_id: Optional[object] = None
+    errors: List[str] = field(default_factory=list)
+
+
+def count_gtins(decoded) -> Tuple[Counter, List[int], List[int]]:
+    """Packages per GTIN, and the indexes of unreadable images and of images with no barcode"""
+    counts, unreadable, empty = Counter(), [], []
+    for index, symbols in enumerate(decoded):
+        if symbols is None:
+            unreadable.append(index)
+            continue
+        codes = [gtin14(data, symbology) for symbology, data in symbols]
+        counts.update(code for code in codes if code)
+        if not any(codes):
+            empty.append(index)
+    return counts, unreadable, empty
+
+
+def ingest_barcode_images(user, images: List[bytes]) -> dict:
+    """Decode a batch of photos and add the recognized products to the user's inventory"""
+    counts, unreadable, empty = count_gtins(decode_images(images, settings.BARCODE_WORKERS))
+    products = {
+        product.gtin: product
+        for product in Product.objects.filter(gtin__in=list(counts)).only(
+            "gtin", "name", "package_amount", "package_unit_id", "ingredient_id"
+        )
+    }
+    # Products imported before a matching ingredient or alias existed
+    late = resolve_ingredient_names(p.name for p in products.values() if p.ingredient_id is None)
+
+    results, items = [], []
+    for gtin, count in sorted(counts.items()):
+        product = products.get(gtin)
+        if product is None:
+            results.append(ScanResult(gtin, count, "unknown_product"))
+            continue
+        ingredient_id = product.ingredient_id or late.get(product.name.strip().lower())
+        result = ScanResult(gtin, count, "unmapped", product.name, ingredient_id)
+        results.append(result)
+        if ingredient_id is None:
+            continue
+        item = {"ingredient_id": str(ingredient_id), "quantity": float(count)}
+        if product.package_amount and product.package_unit_id:
+            item.update(quantity=count * product.package_amount, unit_id=str(product.package_unit_id))
+        items.append((result, item))
+
+    if items:
+        for (result, _), upserted in zip(items, bulk_upsert_inventory(user, [item for _, item in items])):
+            result.status, result.inventory_id, result.errors = upserted.status, upserted.id, upserted.errors
+    return {"results": results, "unreadable_images": unreadable, "images_without_barcode": empty}
@@ -0,0 +1,77 @@
+"""Barcode decoding of photos with OpenCV and pyzbar, run in worker processes.
+
+This module must stay free of Django imports: pool workers are started
+with "spawn" and import only what the pickled function needs.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+import numpy as np
+
+SYMBOLOGIES = ("EAN13", "EAN8", "UPCA", "UPCE")
+# Phone photos are downscaled before decoding; retail barcodes stay readable
+MAX_SIDE = 2000
+# Small crops are upscaled, zbar needs a few pixels per bar
+MIN_SIDE = 1000
+
+
+def _variants(image, cv2):
+    """The image as is, then attempts that rescue blurry, small or unevenly lit shots"""
+    side = max(image.shape[:2])
+    if side > MAX_SIDE:
+        image = cv2.resize(image, None, fx=MAX_SIDE / side, fy=MAX_SIDE / side, interpolation=cv2.INTER_AREA)
+    yield image
+    if side < MIN_SIDE:
+        yield cv2.resize(image, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+    yield cv2.adaptiveThreshold(image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 10)
+
+
+def decode_image(content: bytes) -> Optional[List[Tuple[str, str]]]:
+    """(symbology, digits) for every retail barcode in an encoded image; None when it is not a readable image"""
+    import cv2  # Only needed for barcode scanning
+    from pyzbar import pyzbar
+
+    try:
+        image = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    except cv2.error:
+        return None
+    if image is None:
+        return None
+    symbols = [getattr(pyzbar.ZBarSymbol, name) for name in SYMBOLOGIES]
+    for candidate in _variants(image, cv2):
+        found = pyzbar.decode(candidate, symbols=symbols)
+        if found:
+            return [(symbol.type, symbol.data.decode("ascii", "ignore")) for symbol in found]
+    return []
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers or None, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def decode_images(contents: List[bytes], workers: int = 0) -> List[Optional[List[Tuple[str, str]]]]:
+    """decode_image for each image, in order; a batch is spread over a shared process pool.
+
+    workers=0 uses one process per CPU, workers=1 decodes in the calling process.
+    """
+    if len(contents) <= 1 or workers == 1:
+        return [decode_image(content) for content in contents]
+    global _pool
+    try:
+        return list(_get_pool(workers).map(decode_image, contents))
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool next time
+        with _pool_lock:
+            _pool = None
+        raise
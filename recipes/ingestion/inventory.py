@@ -0,0 +1,183 @@
+"""Bulk upsert of a user's inventory, e.g. after a grocery run.
+
+Each item names its ingredient by id or by free text (resolved through
+names and aliases), gives a quantity as a number or text ("1 1/2 kg"),
+and optionally a unit and expiry date. An item updates the user's lot with
+the same ingredient, unit and expiry date, or creates one.
+
+All ids and names are validated with a handful of set queries. All writes
+happen in one transaction with bulk_create and bulk_update. Invalid items
+are reported and skipped without failing the rest.
+"""
+
+# pylint: disable=no-member
+
+import uuid
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from recipes.measurements.parsing import parse_quantity
+from recipes.measurements.units import normalize_unit_name
+from recipes.models import Ingredient, Inventory, Unit
+from recipes.policy.ingredients import resolve_ingredient_names
+
+MAX_ITEMS = 500
+ADD, SET = "add", "set"
+
+
+@dataclass
+class UpsertResult:
+    index: int
+    status: str
+    id: Optional[object] = None
+    ingredient_id: Optional[object] = None
+    errors: List[str] = field(default_factory=list)
+
+
+@dataclass
+class _Item:
+    index: int
+    ingredient_id: Optional[object] = None
+    unit_id: Optional[object] = None
+    quantity: Optional[float] = None
+    expiry_date: Optional[date] = None
+    errors: List[str] = field(default_factory=list)
+
+
+def _uuid(value) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+def _parse(index: int, raw) -> tuple:
+    """(_Item, ingredient name, unit name) with what can be checked without the database"""
+    item = _Item(index)
+    if not isinstance(raw, dict):
+        item.errors.append("Item must be an object")
+        return item, "", ""
+
+    name = ""
+    if raw.get("ingredient_id"):
+        item.ingredient_id = _uuid(raw["ingredient_id"])
+        if item.ingredient_id is None:
+            item.errors.append("Invalid ingredient_id")
+    elif str(raw.get("ingredient") or "").strip():
+        name = str(raw["ingredient"]).strip().lower()
+    else:
+        item.errors.append("ingredient_id or ingredient is required")
+
+    unit_name = ""
+    quantity = raw.get("quantity")
+    if isinstance(quantity, bool):
+        quantity = None
+    if isinstance(quantity, (int, float)):
+        item.quantity = float(quantity)
+    else:
+        parsed = parse_quantity(str(quantity or ""))
+        item.quantity = parsed.amount_max if parsed.amount_max is not None else parsed.amount
+        unit_name = normalize_unit_name(parsed.unit) if item.quantity is not None else ""
+    if item.quantity is None:
+        item.errors.append("Invalid quantity")
+    elif item.quantity < 0:
+        item.errors.append("Quantity cannot be negative")
+
+    if raw.get("unit_id"):
+        item.unit_id = _uuid(raw["unit_id"])
+        if item.unit_id is None:
+            item.errors.append("Invalid unit_id")
+        unit_name = ""
+    elif str(raw.get("unit") or "").strip():
+        unit_name = normalize_unit_name(str(raw["unit"]))
+
+    if raw.get("expiry_date"):
+        try:
+            item.expiry_date = date.fromisoformat(str(raw["expiry_date"]))
+        except ValueError:
+            item.errors.append("Invalid expiry_date, expected YYYY-MM-DD")
+    return item, name, unit_name
+
+
+def unit_ids_by_name(names) -> Dict[str, object]:
+    """Unit ids keyed by normalized name, also matching a trailing plural "s" ("cups" -> "cup")"""
+    wanted = {name for name in names if name}
+    if not wanted:
+        return {}
+    candidates = wanted | {name[:-1] for name in wanted if name.endswith("s")}
+    by_name = dict(Unit.objects.annotate(lname=Lower("name")).filter(lname__in=candidates).values_list("lname", "id"))
+    resolved = {}
+    for name in wanted:
+        unit_id = by_name.get(name) or (by_name.get(name[:-1]) if name.endswith("s") else None)
+        if unit_id:
+            resolved[name] = unit_id
+    return resolved
+
+
+def bulk_upsert_inventory(user, raw_items: list, mode: str = ADD) -> List[UpsertResult]:
+    """Create or update the user's lots for raw_items; mode "add" restocks, "set" overwrites quantities"""
+    parsed = [_parse(i, raw) for i, raw in enumerate(raw_items)]
+    ingredients_by_name = resolve_ingredient_names(name for _, name, _ in parsed)
+    units_by_name = unit_ids_by_name(unit for _, _, unit in parsed)
+
+    items = []
+    for item, name, unit_name in parsed:
+        if name:
+            item.ingredient_id = ingredients_by_name.get(name)
+            if item.ingredient_id is None:
+                item.errors.append(f"Unknown ingredient: {name}")
+        if unit_name:
+            item.unit_id = units_by_name.get(unit_name)
+            if item.unit_id is None:
+                item.errors.append(f"Unknown unit: {unit_name}")
+        items.append(item)
+
+    known_ingredients = set(
+        Ingredient.objects.filter(pk__in={i.ingredient_id for i in items if i.ingredient_id}).values_list("pk", flat=True)
+    )
+    known_units = set(Unit.objects.filter(pk__in={i.unit_id for i in items if i.unit_id}).values_list("pk", flat=True))
+    for item in items:
+        if item.ingredient_id and item.ingredient_id not in known_ingredients and not item.errors:
+            item.errors.append("Ingredient does not exist")
+        if item.unit_id and item.unit_id not in known_units and not item.errors:
+            item.errors.append("Unit does not exist")
+
+    valid = [item for item in items if not item.errors]
+    results = {item.index: UpsertResult(item.index, "error", errors=item.errors) for item in items if item.errors}
+    with transaction.atomic():
+        lots = {}
+        for lot in Inventory.objects.select_for_update().filter(
+            user=user, ingredient_id__in={item.ingredient_id for item in valid}
+        ).order_by("added_date", "pk"):
+            lots.setdefault((lot.ingredient_id, lot.unit_id, lot.expiry_date), lot)
+
+        created, updated = {}, {}
+        for item in valid:
+            key = (item.ingredient_id, item.unit_id, item.expiry_date)
+            lot = lots.get(key)
+            if lot is None:
+                lot = Inventory(
+                    user=user,
+                    ingredient_id=item.ingredient_id,
+                    unit_id=item.unit_id,
+                    expiry_date=item.expiry_date,
+                    quantity=item.quantity,
+                )
+                lots[key] = created[key] = lot
+                status = "created"
+            else:
+                lot.quantity = lot.quantity + item.quantity if mode == ADD else item.quantity
+                status = "created" if key in created else "updated"
+                if key not in created:
+                    updated[key] = lot
+            results[item.index] = UpsertResult(item.index, status, lot.pk, item.ingredient_id)
+
+        Inventory.objects.bulk_create(list(created.values()))
+        now = timezone.now()
+        for lot in updated.values():
+            lot.updated_at = now
+        Inventory.objects.bulk_update(list(updated.values()), ["quantity", "updated_at"])
+    return [results[i] for i in range(len(raw_items))]
@@ -0,0 +1,104 @@
+"""Receipt OCR with OpenCV preprocessing and Tesseract, run in worker processes.
+
+Like decoding, this module must stay free of Django imports: pool workers
+are started with "spawn" and import only what the pickled function needs.
+"""
+
+import importlib.util
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Optional
+import numpy as np
+
+# Tesseract reads best with text about 30 px high; narrow receipt photos are upscaled
+MIN_WIDTH = 1200
+MAX_WIDTH = 2400
+# Skew beyond this is more likely a misread of the text block than a tilted photo
+MAX_SKEW_DEGREES = 15
+# A single uniform block of text, which is what a receipt column is
+TESSERACT_CONFIG = "--oem 1 --psm 6"
+
+
+def ocr_available() -> bool:
+    return all(importlib.util.find_spec(name) for name in ("cv2", "pytesseract"))
+
+
+def _skew_angle(binary, cv2) -> float:
+    """Rotation in degrees that levels the text, from the minimum area rectangle around the ink"""
+    ink = cv2.findNonZero(255 - binary)
+    if ink is None:
+        return 0.0
+    angle = cv2.minAreaRect(ink)[-1]
+    # OpenCV reports angles in [0, 90); map to the smallest rotation either way
+    if angle > 45:
+        angle -= 90
+    return angle if abs(angle) <= MAX_SKEW_DEGREES else 0.0
+
+
+def preprocess(image, cv2):
+    """Grayscale receipt photo to a deskewed black-on-white binary image"""
+    width = image.shape[1]
+    if width < MIN_WIDTH or width > MAX_WIDTH:
+        scale = (MIN_WIDTH if width < MIN_WIDTH else MAX_WIDTH) / width
+        image = cv2.resize(
+            image, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC if scale > 1 else cv2.INTER_AREA
+        )
+    image = cv2.GaussianBlur(image, (3, 3), 0)
+    # Adaptive threshold copes with shadows and the uneven lighting of thermal paper
+    binary = cv2.adaptiveThreshold(image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15)
+
+    angle = _skew_angle(binary, cv2)
+    if angle:
+        height, width = binary.shape
+        rotation = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        binary = cv2.warpAffine(
+            binary, rotation, (width, height), flags=cv2.INTER_NEAREST, borderMode=cv2.BORDER_CONSTANT, borderValue=255
+        )
+    return binary
+
+
+def ocr_image(content: bytes) -> Optional[str]:
+    """Text of a receipt photo; None when it is not a readable image"""
+    import cv2  # Only needed for receipt OCR
+    import pytesseract
+
+    try:
+        image = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    except cv2.error:
+        return None
+    if image is None:
+        return None
+    return pytesseract.image_to_string(preprocess(image, cv2), config=TESSERACT_CONFIG)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def ocr_images(contents: List[bytes], workers: int = 2) -> Iterator[Optional[str]]:
+    """ocr_image for each image, yielded in order as they finish; workers=1 runs in the calling process.
+
+    The pool is shared by all jobs and bounded by workers, so concurrent
+    uploads queue for Tesseract instead of oversubscribing the CPUs.
+    """
+    if workers <= 1:
+        yield from (ocr_image(content) for content in contents)
+        return
+    global _pool
+    try:
+        yield from _get_pool(workers).map(ocr_image, contents)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool next time
+        with _pool_lock:
+            _pool = None
+        raise
@@ -0,0 +1,184 @@
+"""Receipt photos to Inventory as a background job.
+
+The upload only stores an IngestionJob and returns. After commit the job
+runs on a background thread: photos are OCR'd in the shared process pool,
+with progress saved after each image. Priced lines are parsed into a
+description and quantity, and descriptions are fuzzy matched against the
+ingredient autocomplete index. Everything matched is written with one
+bulk_upsert_inventory call.
+"""
+
+# pylint: disable=no-member
+
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Tuple
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from recipes.models import IngestionJob
+from recipes.search.autocomplete import autocomplete_index, normalize, trigrams
+from .inventory import bulk_upsert_inventory
+from .ocr import ocr_images
+
+logger = logging.getLogger(__name__)
+
+MAX_IMAGES = 20
+# Longest run of words tried against ingredient names ("extra virgin olive oil")
+MAX_WINDOW = 4
+# Trigram similarity between a run of receipt words and an ingredient name or alias
+MIN_MATCH_SCORE = 0.5
+
+_PRICE = re.compile(r"\s+-?[$€£]?(\d+[.,]\d{2})\s*-?\s*[A-Z*]{0,2}\s*$")
+_UNIT_PRICE = re.compile(r"\s*@.*$")
+_WEIGHT = re.compile(r"(\d+(?:[.,]\d+)?)\s*(kg|g|lbs?|oz)\b", re.IGNORECASE)
+_MULTIPLIER = re.compile(r"^(\d{1,2})\s*[x*]\s+|\s+[x*]\s*(\d{1,2})$|^(\d{1,2})\s+(?=[a-z])", re.IGNORECASE)
+_NOT_ITEMS = {
+    "total", "subtotal", "sub", "tax", "vat", "change", "cash", "card", "credit", "debit", "visa", "mastercard",
+    "amex", "balance", "due", "tender", "tendered", "savings", "discount", "coupon", "points", "payment",
+}
+
+
+@dataclass
+class ReceiptLine:
+    text: str
+    description: str
+    quantity: float
+    unit: str
+    price: float
+
+
+def parse_receipt(text: str) -> List[ReceiptLine]:
+    """Item lines of a receipt: lines ending in a price that are not totals, taxes or payments"""
+    lines = []
+    for raw in text.splitlines():
+        raw = " ".join(raw.split())
+        price = _PRICE.search(raw)
+        if not price or _NOT_ITEMS & set(normalize(raw).split()):
+            continue
+        description = _UNIT_PRICE.sub("", raw[:price.start()])
+
+        # "2 x YOGURT 500G" is two 500 g packages
+        quantity, unit = 1.0, ""
+        weight = _WEIGHT.search(description)
+        if weight:
+            quantity, unit = float(weight.group(1).replace(",", ".")), weight.group(2).lower()
+            description = (description[:weight.start()] + " " + description[weight.end():]).strip()
+        multiplier = _MULTIPLIER.search(description)
+        if multiplier:
+            quantity *= float(next(group for group in multiplier.groups() if group))
+            description = description[:multiplier.start()] + " " + description[multiplier.end():]
+
+        # Drop PLU and SKU codes, keep the words
+        description = " ".join(word for word in description.split() if not any(c.isdigit() for c in word))
+        if sum(c.isalpha() for c in description) >= 3 and quantity > 0:
+            lines.append(ReceiptLine(raw, description, quantity, unit, float(price.group(1).replace(",", "."))))
+    return lines
+
+
+def _similarity(a: str, b: str) -> float:
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+
+def match_ingredient(description: str) -> Tuple[Optional[dict], float]:
+    """Best autocomplete suggestion for any run of words in an abbreviated receipt description, and its score.
+
+    Receipts add brands and sizes around the ingredient ("KIRKLAND ORG
+    BANANAS"), so each run of up to MAX_WINDOW words is looked up on its own,
+    longest first, and scored against the whole matched name.
+    """
+    words = normalize(description).split()
+    best, best_score = None, 0.0
+    for size in range(min(len(words), MAX_WINDOW), 0, -1):
+        for start in range(len(words) - size + 1):
+            window = " ".join(words[start:start + size])
+            if len(window) < 3:
+                continue
+            for suggestion in autocomplete_index.suggest(window, limit=3):
+                score = _similarity(window, normalize(suggestion["matched_name"]))
+                if score > best_score:
+                    best, best_score = suggestion, score
+    return (best, best_score) if best_score >= MIN_MATCH_SCORE else (None, best_score)
+
+
+def add_receipt_lines(user, lines: List[Tuple[int, ReceiptLine]]) -> dict:
+    """Match (image index, line) pairs to ingredients and add the matched ones to the user's inventory"""
+    rows, items = [], []
+    for image, line in lines:
+        ingredient, score = match_ingredient(line.description)
+        row = {
+            "image": image,
+            **asdict(line),
+            "ingredient_id": str(ingredient["id"]) if ingredient else None,
+            "ingredient": ingredient["name"] if ingredient else None,
+            "score": round(score, 2),
+            "status": "unmatched",
+            "inventory_id": None,
+            "errors": [],
+        }
+        rows.append(row)
+        if ingredient:
+            item = {"ingredient_id": str(ingredient["id"]), "quantity": line.quantity}
+            if line.unit:
+                item["unit"] = line.unit
+            items.append((row, item))
+
+    if items:
+        for (row, _), upserted in zip(items, bulk_upsert_inventory(user, [item for _, item in items])):
+            row.update(status=upserted.status, inventory_id=upserted.id and str(upserted.id), errors=upserted.errors)
+    return {"lines": rows, "added": sum(row["status"] in ("created", "updated") for row in rows)}
+
+
+def run_receipt_job(job_id, images: List[bytes]) -> None:
+    """OCR, parse and upsert the images of a pending receipt job, saving progress after each image"""
+    job = IngestionJob.objects.select_related("user").get(pk=job_id)
+    jobs = IngestionJob.objects.filter(pk=job_id)
+    jobs.update(status=IngestionJob.Status.RUNNING, updated_at=timezone.now())
+    try:
+        lines, unreadable = [], []
+        for index, text in enumerate(ocr_images(images, settings.OCR_WORKERS)):
+            if text is None:
+                unreadable.append(index)
+            else:
+                lines.extend((index, line) for line in parse_receipt(text))
+            jobs.update(processed=index + 1, updated_at=timezone.now())
+
+        result = add_receipt_lines(job.user, lines)
+        result["unreadable_images"] = unreadable
+        jobs.update(status=IngestionJob.Status.DONE, result=result, finished_at=timezone.now(), updated_at=timezone.now())
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.exception("Receipt job %s failed", job_id)
+        jobs.update(status=IngestionJob.Status.FAILED, error=str(exc), finished_at=timezone.now(), updated_at=timezone.now())
+
+
+# Images are held in memory until their job runs, so a job whose process
+# exits first stays pending
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """One job thread per web process; each job already spreads its images over the OCR pool"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="receipt-jobs")
+        return _executor
+
+
+def _run_in_background(job_id, images) -> None:
+    try:
+        run_receipt_job(job_id, images)
+    finally:
+        connection.close()
+
+
+def start_receipt_job(user, images: List[bytes]) -> IngestionJob:
+    """Record a receipt job and queue it once the surrounding transaction commits"""
+    job = IngestionJob.objects.create(user=user, kind=IngestionJob.Kind.RECEIPT, total=len(images))
+    transaction.on_commit(lambda: _get_executor().submit(_run_in_background, job.pk, images))
+    return job
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.measurements.units import configured_factor, parsed_quantity_fields
+from recipes.models import RecipeIngredient
+
+PARSED_FIELDS = ["amount", "amount_max", "base_quantity", "base_unit"]
+
+
+class Command(BaseCommand):
+    help = "Parse RecipeIngredient.quantity into the structured amount and base quantity columns, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--all", action="store_true", help="Re-parse rows that already have an amount")
+
+    def handle(self, *args, **opts):
+        rows = RecipeIngredient.all_objects.order_by("pk")
+        if not opts["all"]:
+            rows = rows.filter(amount__isnull=True)
+
+        last_pk, processed, parsed = None, 0, 0
+        while True:
+            page = rows.filter(pk__gt=last_pk) if last_pk else rows
+            batch = list(
+                page.values_list("pk", "quantity", "unit__name", "unit__unit_type", "unit__to_base_factor")[
+                    :opts["batch_size"]
+                ]
+            )
+            if not batch:
+                break
+            updates = [
+                RecipeIngredient(
+                    pk=pk,
+                    **parsed_quantity_fields(quantity, unit_name, configured_factor(unit_type, factor)),
+                )
+                for pk, quantity, unit_name, unit_type, factor in batch
+            ]
+            with transaction.atomic():
+                RecipeIngredient.all_objects.bulk_update(updates, PARSED_FIELDS)
+
+            last_pk = batch[-1][0]
+            processed += len(batch)
+            parsed += sum(1 for row in updates if row.amount is not None)
+            self.stdout.write(f"Processed {processed} rows")
+
+        self.stdout.write(self.style.SUCCESS(f"Parsed {parsed} of {processed} quantities."))
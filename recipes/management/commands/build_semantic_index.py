@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+import numpy as np
+
+from recipes.search.semantic import get_encoder, ivf_centroids, recipe_documents, semantic_index
+
+
+class Command(BaseCommand):
+    help = "Embed every active recipe and rebuild the semantic search vectors and IVF centroids"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=512, help="Recipes embedded per encoder call")
+
+    def handle(self, *args, **opts):
+        encoder = get_encoder()
+        ids, texts = recipe_documents()
+        batch_size = opts["batch_size"]
+        vectors = np.concatenate(
+            [encoder.encode(texts[start:start + batch_size]) for start in range(0, len(texts), batch_size)]
+            or [np.zeros((0, encoder.dim), dtype=np.float32)]
+        )
+        centroids = ivf_centroids(vectors)
+        semantic_index.write(ids, vectors, centroids, encoder.name)
+
+        lists = f"{len(centroids)} IVF lists" if centroids is not None else "exact search"
+        self.stdout.write(
+            self.style.SUCCESS(f"Embedded {len(ids)} recipes with {encoder.name} ({lists}) into {semantic_index.directory}")
+        )
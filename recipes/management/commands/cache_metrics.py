@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+import json
+
+from recipes.cache_utils import CacheMetrics
+
+
+class Command(BaseCommand):
+    help = "Show cache hits, misses, fill time, payload size and invalidations per key family"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--json", action="store_true", help="Print raw JSON")
+        parser.add_argument("--reset", action="store_true", help="Clear all counters after printing")
+
+    def handle(self, *args, **opts):
+        stats = CacheMetrics.snapshot()
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(stats, indent=2))
+        elif not stats:
+            self.stdout.write("No cache metrics recorded yet.")
+        else:
+            header = f"{'family':<28}{'hits':>9}{'misses':>9}{'hit %':>8}{'fills':>8}{'fill ms':>10}{'bytes':>10}{'inval':>8}"
+            self.stdout.write(header)
+            self.stdout.write("-" * len(header))
+            for family, row in stats.items():
+                hit_pct = f"{row['hit_ratio'] * 100:.1f}" if row["hit_ratio"] is not None else "-"
+                fill_ms = f"{row['avg_fill_ms']:.2f}" if row["avg_fill_ms"] is not None else "-"
+                size = row["avg_payload_bytes"] if row["avg_payload_bytes"] is not None else "-"
+                self.stdout.write(
+                    f"{family:<28}{row['hits']:>9}{row['misses']:>9}{hit_pct:>8}"
+                    f"{row['fills']:>8}{fill_ms:>10}{size:>10}{row['invalidations']:>8}"
+                )
+
+        if opts["reset"]:
+            CacheMetrics.reset()
+            self.stdout.write(self.style.SUCCESS("Cache metrics reset."))
@@ -0,0 +1,90 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+import numpy as np
+
+from recipes.models import Recipe, RecipeSimilarity
+from recipes.search.similarity import load_vectors, score_batches, top_k
+
+# Keeps IN lists under SQLite's bound parameter limit
+DELETE_BATCH_SIZE = 500
+
+
+def changed_since(last_run, prefix=""):
+    """Recipes saved, deactivated or with ingredient rows changed after last_run"""
+    return (
+        Q(**{f"{prefix}updated_at__gt": last_run})
+        | Q(**{f"{prefix}recipeingredient__updated_at__gt": last_run})
+        | Q(**{f"{prefix}is_active": False})
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Store the top-k most similar recipes per recipe. By default only recipes changed since the last run, "
+        "recipes that listed them and recipes they now outrank a neighbor of are recomputed; IDF weights and "
+        "tag-only edits made without saving the recipe are fully refreshed with --full."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=10)
+        parser.add_argument("--full", action="store_true", help="Recompute every recipe")
+
+    def handle(self, *args, **opts):
+        now = timezone.now()
+        k = opts["top"]
+        vectors = load_vectors()
+        last_run = RecipeSimilarity.objects.aggregate(last=Max("computed_at"))["last"]
+
+        neighbors = {}
+        if opts["full"] or last_run is None:
+            targets = set(range(vectors.size))
+            stale_ids = None
+        else:
+            changed_ids = set(
+                Recipe.all_objects.filter(changed_since(last_run)).values_list("pk", flat=True).distinct()
+            )
+            changed_ids |= set(Recipe.objects.filter(similar_entries__isnull=True).values_list("pk", flat=True))
+            listing = RecipeSimilarity.objects.filter(changed_since(last_run, "neighbor__"))
+            affected_ids = set(listing.values_list("recipe_id", flat=True))
+
+            # A changed recipe may now beat the k-th neighbor of any other recipe (cosine is symmetric)
+            thresholds = np.zeros(vectors.size)
+            for recipe_id, score in RecipeSimilarity.objects.filter(rank=k).values_list("recipe_id", "score"):
+                if recipe_id in vectors.positions:
+                    thresholds[vectors.positions[recipe_id]] = score
+            targets = set()
+            changed_rows = [vectors.positions[pk] for pk in changed_ids if pk in vectors.positions]
+            for batch, scores in score_batches(vectors, changed_rows):
+                targets.update(np.flatnonzero((scores > thresholds).any(axis=0)).tolist())
+                neighbors.update(zip(batch.tolist(), top_k(scores, k)))
+            targets.update(neighbors)
+            targets.update(vectors.positions[pk] for pk in affected_ids if pk in vectors.positions)
+            stale_ids = list({vectors.ids[row] for row in targets} | changed_ids | affected_ids)
+
+        pending = sorted(targets - neighbors.keys())
+        for batch, scores in score_batches(vectors, pending):
+            neighbors.update(zip(batch.tolist(), top_k(scores, k)))
+
+        rows = [
+            RecipeSimilarity(
+                recipe_id=vectors.ids[row],
+                neighbor_id=vectors.ids[col],
+                rank=rank,
+                score=score,
+                computed_at=now,
+            )
+            for row in targets
+            for rank, (col, score) in enumerate(neighbors[row], start=1)
+        ]
+        with transaction.atomic():
+            if stale_ids is None:
+                RecipeSimilarity.objects.all().delete()
+            for start in range(0, len(stale_ids or ()), DELETE_BATCH_SIZE):
+                RecipeSimilarity.objects.filter(recipe_id__in=stale_ids[start:start + DELETE_BATCH_SIZE]).delete()
+            RecipeSimilarity.objects.bulk_create(rows, batch_size=1000)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Stored {len(rows)} neighbors for {len(targets)} of {vectors.size} recipes.")
+        )
@@ -0,0 +1,110 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+import numpy as np
+import pandas as pd
+
+from recipes.models import Recipe, Feedback, RecipePreference, TrendingRecipe
+
+# Weight of one event before decay. Ratings scale the feedback weight.
+FEEDBACK_WEIGHT = 1.0
+PREFERENCE_WEIGHTS = {"favorite": 2.0, "like": 1.0, "dislike": -1.0}
+
+
+def hourly_buckets(events: pd.DataFrame) -> pd.DataFrame:
+    """Sum event weights per (recipe, hour)"""
+    events = events.assign(bucket=events["ts"].dt.floor("h"))
+    return events.groupby(["recipe_id", "bucket"], as_index=False)["weight"].sum()
+
+
+def decayed_scores(buckets: pd.DataFrame, now, half_life_hours: float) -> pd.Series:
+    """Exponentially decayed score per recipe: sum(weight * 2^(-age / half_life))"""
+    age_hours = (pd.Timestamp(now).floor("h") - buckets["bucket"]) / pd.Timedelta(hours=1)
+    decay = np.exp(-np.log(2) * age_hours.to_numpy(dtype=float) / half_life_hours)
+    return (buckets["weight"] * decay).groupby(buckets["recipe_id"]).sum()
+
+
+def top_n(frame: pd.DataFrame, by: str, n: int) -> pd.DataFrame:
+    ranked = frame.sort_values("score", ascending=False)
+    ranked = ranked.groupby(by, sort=False).head(n)
+    return ranked.assign(rank=ranked.groupby(by, sort=False).cumcount() + 1)
+
+
+class Command(BaseCommand):
+    help = "Roll Feedback and RecipePreference events into hourly buckets and store time-decayed trending recipes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--half-life-hours", type=float, default=48.0)
+        parser.add_argument("--window-days", type=int, default=14)
+        parser.add_argument("--top", type=int, default=20)
+
+    def handle(self, *args, **opts):
+        now = timezone.now()
+        cutoff = now - timedelta(days=opts["window_days"])
+
+        feedback = pd.DataFrame.from_records(
+            Feedback.objects.filter(created_at__gte=cutoff, recipe__isnull=False)
+            .values_list("recipe_id", "created_at", "rating"),
+            columns=["recipe_id", "ts", "rating"],
+        )
+        feedback["weight"] = FEEDBACK_WEIGHT * (1 + feedback["rating"].astype(float) / 5)
+
+        preferences = pd.DataFrame.from_records(
+            RecipePreference.objects.filter(
+                updated_at__gte=cutoff, preference__in=PREFERENCE_WEIGHTS
+            ).values_list("recipe_id", "updated_at", "preference"),
+            columns=["recipe_id", "ts", "preference"],
+        )
+        preferences["weight"] = preferences["preference"].map(PREFERENCE_WEIGHTS).astype(float)
+
+        events = pd.concat(
+            [feedback[["recipe_id", "ts", "weight"]], preferences[["recipe_id", "ts", "weight"]]],
+            ignore_index=True,
+        )
+        if events.empty:
+            with transaction.atomic():
+                TrendingRecipe.objects.all().delete()
+            self.stdout.write(self.style.WARNING("No events in window; trending table cleared."))
+            return
+        events["ts"] = pd.to_datetime(events["ts"], utc=True)
+
+        scores = decayed_scores(hourly_buckets(events), now, opts["half_life_hours"])
+        scores = scores[scores > 0].rename("score").reset_index()
+
+        recipes = pd.DataFrame.from_records(
+            Recipe.objects.filter(pk__in=scores["recipe_id"].tolist())
+            .values_list("id", "cuisine", "fodmap_friendly"),
+            columns=["recipe_id", "cuisine", "fodmap_friendly"],
+        )
+        frame = scores.merge(recipes, on="recipe_id")
+        frame["cuisine"] = frame["cuisine"].fillna("").str.strip().str.lower()
+        frame["fodmap_friendly"] = frame["fodmap_friendly"].map({True: "true", False: "false"})
+        frame["all"] = ""
+
+        n = opts["top"]
+        scoped = [
+            (TrendingRecipe.Scope.ALL, top_n(frame, "all", n), "all"),
+            (TrendingRecipe.Scope.CUISINE, top_n(frame[frame["cuisine"] != ""], "cuisine", n), "cuisine"),
+            (TrendingRecipe.Scope.FODMAP, top_n(frame, "fodmap_friendly", n), "fodmap_friendly"),
+        ]
+        rows = [
+            TrendingRecipe(
+                scope=scope,
+                scope_value=value,
+                rank=rank,
+                recipe_id=recipe_id,
+                score=float(score),
+                computed_at=now,
+            )
+            for scope, ranked, column in scoped
+            for recipe_id, value, rank, score in ranked[["recipe_id", column, "rank", "score"]].itertuples(index=False)
+        ]
+
+        with transaction.atomic():
+            TrendingRecipe.objects.all().delete()
+            TrendingRecipe.objects.bulk_create(rows)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Stored {len(rows)} trending rows from {len(events)} events ({len(frame)} recipes).")
+        )
@@ -0,0 +1,98 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.ingestion.barcodes import gtin14
+from recipes.ingestion.inventory import unit_ids_by_name
+from recipes.measurements.parsing import parse_quantity
+from recipes.measurements.units import normalize_unit_name
+from recipes.models import Product
+from recipes.policy.ingredients import resolve_ingredient_names
+
+UPDATE_FIELDS = ["name", "brand", "quantity", "package_amount", "package_unit", "ingredient", "is_active", "updated_at"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load packaged products from a CSV dump (e.g. Open Food Facts) into the Product table, keyed by GTIN. "
+        "Rows are upserted, so the command can be re-run with a newer dump."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file, or - for stdin")
+        parser.add_argument("--delimiter", default="\t", help="Field delimiter (default: tab, as in Open Food Facts)")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--code-column", default="code")
+        parser.add_argument("--name-column", default="product_name")
+        parser.add_argument("--brand-column", default="brands")
+        parser.add_argument("--quantity-column", default="quantity")
+        parser.add_argument(
+            "--ingredient-column",
+            default="generic_name",
+            help="Column matched against ingredient names and aliases before the product name",
+        )
+
+    def handle(self, *args, **opts):
+        self.columns = opts
+        # Product dumps carry very long text columns
+        csv.field_size_limit(sys.maxsize)
+        try:
+            handle = sys.stdin if opts["path"] == "-" else open(opts["path"], newline="", encoding="utf-8")
+        except OSError as exc:
+            raise CommandError(exc) from exc
+
+        with handle:
+            reader = csv.DictReader(handle, delimiter=opts["delimiter"])
+            missing = {opts["code_column"], opts["name_column"]} - set(reader.fieldnames or ())
+            if missing:
+                raise CommandError(f"Missing columns: {', '.join(sorted(missing))}")
+
+            batch, read, written, skipped = {}, 0, 0, 0
+            for row in reader:
+                read += 1
+                gtin = gtin14(row.get(opts["code_column"]) or "")
+                name = (row.get(opts["name_column"]) or "").strip()
+                if gtin is None or not name:
+                    skipped += 1
+                    continue
+                batch[gtin] = (name, row)
+                if len(batch) >= opts["batch_size"]:
+                    written += self.write_batch(batch)
+                    batch = {}
+                    self.stdout.write(f"Read {read} rows")
+            if batch:
+                written += self.write_batch(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {written} products, skipped {skipped} rows without a valid code or name."))
+
+    def write_batch(self, batch) -> int:
+        opts, products = self.columns, []
+        for gtin, (name, row) in batch.items():
+            quantity = (row.get(opts["quantity_column"]) or "").strip()
+            parsed = parse_quantity(quantity)
+            product = Product(
+                gtin=gtin,
+                name=name[:255],
+                brand=(row.get(opts["brand_column"]) or "").split(",")[0].strip()[:255],
+                quantity=quantity[:100],
+                package_amount=parsed.amount,
+            )
+            product.unit_name = normalize_unit_name(parsed.unit) if parsed.amount is not None else ""
+            product.generic = (row.get(opts["ingredient_column"]) or "").strip().lower()
+            products.append(product)
+
+        units = unit_ids_by_name(p.unit_name for p in products)
+        ingredients = resolve_ingredient_names([p.generic for p in products] + [p.name.lower() for p in products])
+        for product in products:
+            product.package_unit_id = units.get(product.unit_name)
+            if product.package_unit_id is None:
+                product.package_amount = None
+            product.ingredient_id = ingredients.get(product.generic) or ingredients.get(product.name.lower())
+
+        with transaction.atomic():
+            Product.all_objects.bulk_create(
+                products, update_conflicts=True, unique_fields=["gtin"], update_fields=UPDATE_FIELDS
+            )
+        return len(products)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.search.fulltext import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text recipe search index"
+
+    @transaction.atomic
+    def handle(self, *args, **opts):
+        count = get_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} recipes."))
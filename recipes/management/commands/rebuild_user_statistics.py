@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+
+from recipes.aggregates import rebuild_user_statistics
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Rebuild per-user statistics rows from Feedback and RecipePreference"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", help="Only rebuild these user ids")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **opts):
+        user_ids = opts["user"] or list(User.objects.order_by("pk").values_list("pk", flat=True))
+        batch_size = opts["batch_size"]
+
+        total = 0
+        for start in range(0, len(user_ids), batch_size):
+            total += rebuild_user_statistics(user_ids[start:start + batch_size])
+            self.stdout.write(f"Rebuilt {total}/{len(user_ids)} users")
+
+        self.stdout.write(self.style.SUCCESS(f"User statistics rebuilt for {total} users."))
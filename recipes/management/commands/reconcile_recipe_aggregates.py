@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.aggregates import drifted_recipes, reconcile_recipe_aggregates
+
+
+class Command(BaseCommand):
+    help = "Recompute Recipe rating_sum/rating_count/favorites_count where they drifted from the raw tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report drifted recipes")
+
+    @transaction.atomic
+    def handle(self, *args, **opts):
+        drifted = list(
+            drifted_recipes().values(
+                "id", "title",
+                "rating_sum", "expected_rating_sum",
+                "rating_count", "expected_rating_count",
+                "favorites_count", "expected_favorites_count",
+            )
+        )
+        for row in drifted:
+            self.stdout.write(
+                f"{row['title']} ({row['id']}): "
+                f"sum {row['rating_sum']}->{row['expected_rating_sum']}, "
+                f"count {row['rating_count']}->{row['expected_rating_count']}, "
+                f"favorites {row['favorites_count']}->{row['expected_favorites_count']}"
+            )
+
+        if opts["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"{len(drifted)} recipes drifted (dry run)."))
+            return
+
+        updated = reconcile_recipe_aggregates([row["id"] for row in drifted])
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {updated} recipes."))
@@ -0,0 +1,112 @@
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+import numpy as np
+
+from recipes.models import Recipe, RecipeIngredient
+from recipes.search.semantic import recipe_documents
+
+# Labels seen in fewer recipes than this carry no similarity between recipes
+MIN_LABEL_RECIPES = 2
+MIN_RECIPES = 10
+
+
+def recipe_labels(ids):
+    """Multi-hot (recipes, labels) targets from each recipe's ingredients, tags and cuisine"""
+    labels = defaultdict(set)
+    for recipe_id, name in RecipeIngredient.objects.filter(recipe__is_active=True).values_list(
+        "recipe_id", "ingredient__name"
+    ):
+        labels[recipe_id].add(f"ingredient:{name.lower()}")
+    for recipe_id, name in Recipe.tags.through.objects.filter(
+        recipe__is_active=True, tag__is_active=True
+    ).values_list("recipe_id", "tag__name"):
+        labels[recipe_id].add(f"tag:{name.lower()}")
+    for recipe_id, cuisine in Recipe.objects.exclude(cuisine="").values_list("pk", "cuisine"):
+        if cuisine:
+            labels[recipe_id].add(f"cuisine:{cuisine.lower()}")
+
+    counts = Counter(label for pk in ids for label in labels[pk])
+    vocabulary = sorted(label for label, count in counts.items() if count >= MIN_LABEL_RECIPES)
+    position = {label: i for i, label in enumerate(vocabulary)}
+    targets = np.zeros((len(ids), len(vocabulary)), dtype=np.float32)
+    for row, pk in enumerate(ids):
+        targets[row, [position[label] for label in labels[pk] if label in position]] = 1.0
+    return targets, vocabulary
+
+
+def build_models(keras, texts, n_labels, dim, vocabulary_size, sequence_length, token_dropout):
+    """(trainer, encoder) sharing layers: raw string -> mean of token embeddings -> dim-wide embedding"""
+    vectorizer = keras.layers.TextVectorization(
+        max_tokens=vocabulary_size, output_mode="int", output_sequence_length=sequence_length
+    )
+    vectorizer.adapt(texts)
+
+    inputs = keras.Input(shape=(1,), dtype="string")
+    tokens = keras.layers.Embedding(vectorizer.vocabulary_size(), dim, mask_zero=True)(vectorizer(inputs))
+    # Dropping whole tokens makes the model infer labels from the words around them,
+    # so words used in similar recipes ("gut friendly", "low fodmap") end up close
+    tokens = keras.layers.Dropout(token_dropout, noise_shape=(None, sequence_length, 1))(tokens)
+    pooled = keras.layers.GlobalAveragePooling1D()(tokens)
+    embedding = keras.layers.Dense(dim, activation="tanh", name="embedding")(pooled)
+    outputs = keras.layers.Dense(n_labels, activation="sigmoid")(embedding)
+    return keras.Model(inputs, outputs), keras.Model(inputs, embedding)
+
+
+class Command(BaseCommand):
+    help = (
+        "Train a small Keras text encoder on the recipe catalogue and save it for SEMANTIC_SEARCH_MODEL. "
+        "Recipe documents are mapped to their ingredients, tags and cuisine, so queries match recipes "
+        "by meaning rather than shared words. Needs keras and tensorflow; run build_semantic_index afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", help="Output .keras file (default: SEMANTIC_SEARCH_MODEL)")
+        parser.add_argument("--dim", type=int, default=64, help="Embedding width")
+        parser.add_argument("--epochs", type=int, default=30)
+        parser.add_argument("--batch-size", type=int, default=64)
+        parser.add_argument("--vocabulary-size", type=int, default=20000)
+        parser.add_argument("--sequence-length", type=int, default=128)
+        parser.add_argument("--token-dropout", type=float, default=0.5)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        path = opts["path"] or settings.SEMANTIC_SEARCH_MODEL
+        if not path or Path(path).suffix != ".keras":
+            raise CommandError("Give a .keras output path or set SEMANTIC_SEARCH_MODEL to one")
+        try:
+            import keras  # Only needed to train the encoder
+            import tensorflow as tf
+        except ImportError as exc:
+            raise CommandError(f"Training the encoder needs keras and tensorflow: {exc}") from exc
+
+        ids, texts = recipe_documents()
+        targets, labels = recipe_labels(ids)
+        if len(ids) < MIN_RECIPES or not labels:
+            raise CommandError(
+                f"Need at least {MIN_RECIPES} recipes sharing ingredients, tags or cuisines; found {len(ids)} recipes"
+            )
+
+        keras.utils.set_random_seed(opts["seed"])
+        trainer, encoder = build_models(
+            keras, texts, len(labels), opts["dim"], opts["vocabulary_size"], opts["sequence_length"], opts["token_dropout"]
+        )
+        trainer.compile(optimizer="adam", loss="binary_crossentropy")
+        dataset = (
+            tf.data.Dataset.from_tensor_slices((texts, targets))
+            .shuffle(len(texts), seed=opts["seed"])
+            .batch(opts["batch_size"])
+        )
+        history = trainer.fit(dataset, epochs=opts["epochs"], verbose=0)
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        encoder.save(path)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Trained a {opts['dim']}-dimensional encoder on {len(ids)} recipes and {len(labels)} labels "
+                f"(final loss {history.history['loss'][-1]:.4f}); saved to {path}. "
+                "Run build_semantic_index to re-embed the recipes with it."
+            )
+        )
@@ -0,0 +1,142 @@
+"""Conversion between the weight, volume and count base units, and canonical totals.
+
+Quantities are stored in one of three base units (see units.py). Converting
+between them needs an ingredient: milliliters become grams through the
+ingredient's density and counts through its piece weight. The index keeps
+those overrides as one dense (ingredients + 1, 3) array of grams per base
+unit, so a whole shopping list is converted with a few array lookups. The
+extra last row stands for every ingredient without overrides.
+"""
+
+# pylint: disable=no-member
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from django.db.models import Q
+from recipes.models import Ingredient
+from recipes.search.index import VersionedIndex
+from .units import GRAM, MILLILITER, COUNT
+
+KINDS = (GRAM, MILLILITER, COUNT)
+KIND_INDEX = {kind: i for i, kind in enumerate(KINDS)}
+
+
+@dataclass
+class ConversionTables:
+    positions: Dict[object, int]
+    grams: np.ndarray
+
+    def rows(self, ingredient_ids: Sequence) -> np.ndarray:
+        default = len(self.grams) - 1
+        return np.fromiter((self.positions.get(pk, default) for pk in ingredient_ids), dtype=np.int64, count=len(ingredient_ids))
+
+
+@dataclass
+class CanonicalTotal:
+    quantity: Optional[float]
+    unit: str
+    # (quantity, base unit) sums that could not be converted into `unit`
+    unconverted: List[Tuple[float, str]] = field(default_factory=list)
+    unparsed: int = 0
+
+
+def _positive(values) -> np.ndarray:
+    array = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return np.where(array > 0, array, np.nan)
+
+
+class ConversionIndex(VersionedIndex):
+    version_key = "index:conversion:version"
+
+    def build(self):
+        rows = list(
+            Ingredient.objects.filter(Q(density__isnull=False) | Q(piece_weight__isnull=False))
+            .order_by("pk")
+            .values_list("pk", "density", "piece_weight")
+        )
+        grams = np.full((len(rows) + 1, len(KINDS)), np.nan)
+        grams[:, KIND_INDEX[GRAM]] = 1.0
+        if rows:
+            grams[:-1, KIND_INDEX[MILLILITER]] = _positive(r[1] for r in rows)
+            grams[:-1, KIND_INDEX[COUNT]] = _positive(r[2] for r in rows)
+        return ConversionTables({r[0]: i for i, r in enumerate(rows)}, grams)
+
+    def factors(self, ingredient_ids: Sequence, from_units: Sequence[str], to_units: Sequence[str]) -> np.ndarray:
+        """Multipliers from one base unit to another per row; NaN where the ingredient lacks the override"""
+        tables = self.get()
+        rows = tables.rows(ingredient_ids)
+        source = np.array([KIND_INDEX.get(u, -1) for u in from_units], dtype=np.int64)
+        target = np.array([KIND_INDEX.get(u, -1) for u in to_units], dtype=np.int64)
+        known = (source >= 0) & (target >= 0)
+        result = np.full(len(rows), np.nan)
+        with np.errstate(invalid="ignore"):
+            result[known] = tables.grams[rows[known], source[known]] / tables.grams[rows[known], target[known]]
+        result[known & (source == target)] = 1.0
+        return result
+
+    def canonical_totals(
+        self,
+        ingredient_ids: Sequence,
+        quantities: Sequence[Optional[float]],
+        base_units: Sequence[str],
+        row_counts: Optional[Sequence[int]] = None,
+    ) -> Dict[object, CanonicalTotal]:
+        """Sum base quantities into one unit per ingredient.
+
+        The unit chosen for an ingredient is the one that the most of its rows
+        convert into, preferring grams, then milliliters, then counts on a tie.
+        Rows that cannot reach it are summed per base unit in `unconverted`;
+        rows without a parsed quantity are only counted. Pre-aggregated input
+        passes the number of rows behind each quantity in row_counts.
+        """
+        if not len(ingredient_ids):
+            return {}
+        codes, groups = pd.factorize(pd.Series(list(ingredient_ids), dtype=object))
+        n_groups = len(groups)
+        tables = self.get()
+        rows = tables.rows(ingredient_ids)
+        quantity = np.array([np.nan if q is None else q for q in quantities], dtype=np.float64)
+        kind = np.array([KIND_INDEX.get(u, -1) for u in base_units], dtype=np.int64)
+        weight = np.ones(len(rows)) if row_counts is None else np.asarray(row_counts, dtype=np.float64)
+        valid = (kind >= 0) & ~np.isnan(quantity)
+        kind = np.where(valid, kind, 0)
+
+        # factor[r, c]: multiplier taking row r from its own unit into candidate unit c
+        grams = tables.grams[rows]
+        with np.errstate(invalid="ignore"):
+            factor = grams[np.arange(len(rows)), kind][:, None] / grams
+        factor[np.arange(len(rows)), kind] = 1.0
+        convertible = ~np.isnan(factor) & valid[:, None]
+
+        votes = np.stack(
+            [np.bincount(codes, weights=convertible[:, c] * weight, minlength=n_groups) for c in range(len(KINDS))],
+            axis=1,
+        )
+        canonical = votes.argmax(axis=1)
+        row_target = canonical[codes]
+        converts = convertible[np.arange(len(rows)), row_target]
+        totals = np.bincount(
+            codes[converts], weights=quantity[converts] * factor[converts, row_target[converts]], minlength=n_groups
+        )
+
+        left = valid & ~converts
+        cells = codes[left] * len(KINDS) + kind[left]
+        left_sums = np.bincount(cells, weights=quantity[left], minlength=n_groups * len(KINDS)).reshape(n_groups, -1)
+        left_rows = np.bincount(cells, minlength=n_groups * len(KINDS)).reshape(n_groups, -1)
+        unparsed = np.bincount(codes[~valid], weights=weight[~valid], minlength=n_groups)
+
+        result = {}
+        for g, pk in enumerate(groups):
+            has_total = votes[g].max() > 0
+            result[pk] = CanonicalTotal(
+                quantity=float(totals[g]) if has_total else None,
+                unit=KINDS[canonical[g]] if has_total else "",
+                unconverted=[(float(left_sums[g, c]), KINDS[c]) for c in np.flatnonzero(left_rows[g])],
+                unparsed=int(unparsed[g]),
+            )
+        return result
+
+
+conversion_index = ConversionIndex()
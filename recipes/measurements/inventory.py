@@ -0,0 +1,103 @@
+"""Net shopping needs: subtract a user's inventory lots from canonical totals.
+
+Lots are consumed first-expired-first-out: within an ingredient, lots with
+the earliest expiry date are used up before later ones, and lots without an
+expiry date come last. Expired lots are ignored. Allocation is a grouped
+cumulative sum over all lots of a list at once.
+"""
+
+# pylint: disable=no-member
+
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from django.db.models import F, Q
+from django.utils import timezone
+from recipes.models import Inventory
+from .conversion import CanonicalTotal, conversion_index
+from .units import configured_factor, to_base
+
+
+@dataclass
+class LotUse:
+    inventory_id: object
+    quantity: float
+    expiry_date: Optional[date]
+
+
+@dataclass
+class NetNeed:
+    on_hand: float = 0.0
+    to_buy: Optional[float] = None
+    lots: List[LotUse] = field(default_factory=list)
+
+
+# (inventory id, ingredient id, quantity, unit name, unit type, unit to_base_factor, expiry date)
+LOT_FIELDS = ("pk", "ingredient_id", "quantity", "unit__name", "unit__unit_type", "unit__to_base_factor", "expiry_date")
+
+
+def unexpired(today: Optional[date] = None) -> Q:
+    return Q(expiry_date__isnull=True) | Q(expiry_date__gte=today or timezone.localdate())
+
+
+def fefo_order(lot) -> tuple:
+    """Sort key placing a lot before those expiring later; lots without expiry go last"""
+    expiry = lot[6]
+    return (expiry is None, expiry or date.max, str(lot[0]))
+
+
+def lot_base(lot) -> tuple:
+    """(base quantity, base unit) of a LOT_FIELDS tuple; (None, "") when its unit has no fixed size"""
+    _, _, quantity, unit_name, unit_type, factor, _ = lot
+    configured = configured_factor(unit_type, factor)
+    return (quantity * configured[1], configured[0]) if configured else to_base(quantity, unit_name or "")
+
+
+def net_needs(user, totals: Dict[object, CanonicalTotal], today: Optional[date] = None) -> Dict[object, NetNeed]:
+    """Remaining quantity to buy per ingredient, in the unit of its CanonicalTotal"""
+    lots = list(
+        Inventory.objects.filter(unexpired(today), user=user, ingredient_id__in=list(totals))
+        .order_by("ingredient_id", F("expiry_date").asc(nulls_last=True), "added_date", "pk")
+        .values_list(*LOT_FIELDS)
+    )
+    return allocate_lots(totals, lots)
+
+
+def allocate_lots(totals: Dict[object, CanonicalTotal], lots: Sequence[tuple]) -> Dict[object, NetNeed]:
+    """Allocate lots (LOT_FIELDS tuples, grouped by ingredient, FEFO within it) against totals.
+
+    on_hand counts every lot that converts into the total's unit; lots
+    whose unit cannot be converted are left out of both figures.
+    """
+    result = {pk: NetNeed(to_buy=total.quantity) for pk, total in totals.items()}
+    if not lots:
+        return result
+
+    ingredient_ids = [lot[1] for lot in lots]
+    base = [lot_base(lot) for lot in lots]
+    factors = conversion_index.factors(
+        ingredient_ids, [unit for _, unit in base], [totals[pk].unit for pk in ingredient_ids]
+    )
+    amount = np.array([np.nan if q is None else q for q, _ in base], dtype=np.float64) * factors
+    amount = np.nan_to_num(amount, nan=0.0)
+
+    # Each ingredient's lots are one contiguous run
+    codes, groups = pd.factorize(pd.Series(ingredient_ids, dtype=object))
+    need = np.array([totals[pk].quantity or 0.0 for pk in groups], dtype=np.float64)
+    running = np.cumsum(amount)
+    starts = np.r_[0, np.flatnonzero(np.diff(codes)) + 1]
+    offset = np.repeat(running[starts] - amount[starts], np.diff(np.r_[starts, len(codes)]))
+    before = running - amount - offset
+    used = np.clip(need[codes] - before, 0.0, amount)
+
+    on_hand = np.bincount(codes, weights=amount, minlength=len(groups))
+    for g, pk in enumerate(groups):
+        line = result[pk]
+        line.on_hand = float(on_hand[g])
+        if line.to_buy is not None:
+            line.to_buy = max(line.to_buy - line.on_hand, 0.0)
+    for i in np.flatnonzero(used > 0):
+        result[ingredient_ids[i]].lots.append(LotUse(lots[i][0], float(used[i]), lots[i][6]))
+    return result
@@ -0,0 +1,124 @@
+"""Parse free-text recipe quantities such as "1 1/2", "½", "1-2", "2.5 cups", "1,000 g" or "a dozen"."""
+
+import re
+import unicodedata
+from dataclasses import dataclass, replace
+from fractions import Fraction
+from typing import Optional, Tuple
+
+WORD_NUMBERS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+    "half": 0.5, "quarter": 0.25, "dozen": 12,
+}
+# "a few cloves" has no definite amount; reading it as 1 would understate it
+VAGUE_WORDS = {"few", "little", "bit", "some", "several"}
+
+# "1,000" and "12,500.5" use thousands separators; otherwise a comma is a decimal point ("1,5 l")
+_THOUSANDS = r"\d{1,3}(?:,\d{3})+(?:\.\d+)?"
+_NUMBER = rf"\d+\s+\d+/\d+|\d+/\d+|{_THOUSANDS}|\d+(?:\.\d+|,\d{{1,2}})?|\.\d+"
+_QUALIFIER = re.compile(r"^(?:~|(?:about|around|roughly|approximately|approx|circa)\b\.?)\s*", re.IGNORECASE)
+_AND_FRACTION = re.compile(r"and\s+(?:a|an|one)\s+(half|quarter)\b", re.IGNORECASE)
+_QUANTITY = re.compile(
+    rf"^\s*(?P<low>{_NUMBER})(?:\s*(?P<sep>-|–|—|to|or)\s*(?P<high>{_NUMBER}))?(?![\d/])\s*(?P<unit>.*)$",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class ParsedQuantity:
+    amount: Optional[float]
+    amount_max: Optional[float]
+    unit: str
+    # Length of the numeric prefix in the normalized text
+    consumed: int = 0
+
+
+def _vulgar_fractions(text: str) -> str:
+    """'1½' -> '1 1/2', '¾' -> '3/4', and the fraction slash to '/'"""
+    out = []
+    for char in text.replace("⁄", "/"):
+        if unicodedata.category(char) == "No" and unicodedata.numeric(char, None) is not None:
+            value = Fraction(unicodedata.numeric(char)).limit_denominator(16)
+            out.append(f" {value.numerator}/{value.denominator}")
+        else:
+            out.append(char)
+    return "".join(out).strip()
+
+
+def _number(text: str) -> Optional[float]:
+    parts = text.split()
+    try:
+        if len(parts) == 2:
+            return float(parts[0]) + float(Fraction(parts[1]))
+        if "/" in text:
+            return float(Fraction(text))
+        if re.fullmatch(_THOUSANDS, text):
+            return float(text.replace(",", ""))
+        return float(text.replace(",", "."))
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def _is_mixed_number(match) -> bool:
+    return (
+        match.group("sep") in ("-", "–", "—")
+        and match.group("low").isdigit()
+        and re.fullmatch(r"\d+/\d+", match.group("high")) is not None
+        and _number(match.group("high")) < 1
+    )
+
+
+def parse_quantity(text) -> ParsedQuantity:
+    """Amount (and upper bound for ranges) plus any trailing unit text; amount is None when not numeric"""
+    text = _vulgar_fractions(str(text or ""))
+    qualifier = _QUALIFIER.match(text)
+    if qualifier:
+        # "about 2 cups" is read as 2 cups
+        parsed = parse_quantity(text[qualifier.end():])
+        if parsed.amount is None:
+            return ParsedQuantity(None, None, text)
+        return replace(parsed, consumed=parsed.consumed + qualifier.end())
+
+    match = _QUANTITY.match(text)
+    if match:
+        low = _number(match.group("low"))
+        high = _number(match.group("high")) if match.group("high") else None
+        if low is not None and high is not None and _is_mixed_number(match):
+            # "1-1/2 cups" is one and a half cups, not a range
+            low, high = low + high, None
+        if low is not None:
+            if high is not None and high < low:
+                low, high = high, low
+            return ParsedQuantity(low, high, match.group("unit").strip(), match.start("unit"))
+
+    words = text.split(None, 1)
+    if words and words[0].lower() in WORD_NUMBERS:
+        first = words[0].lower()
+        amount, rest = WORD_NUMBERS[first], words[1] if len(words) > 1 else ""
+        following = rest.split(None, 1)[0].lower() if rest else ""
+        if first in ("a", "an") and following in VAGUE_WORDS:
+            return ParsedQuantity(None, None, text)
+        if following == "couple" and first in ("a", "an"):
+            amount, rest = 2, rest[len("couple"):].lstrip()
+            if rest.lower().startswith("of "):
+                rest = rest[len("of"):].lstrip()
+        elif following == "dozen":
+            amount, rest = amount * 12, rest[len("dozen"):].lstrip()
+        elif following in ("a", "an") and amount < 1:
+            # "half a cup"
+            rest = rest[len(following):].lstrip()
+        fraction = _AND_FRACTION.match(rest)
+        if fraction:
+            amount, rest = amount + WORD_NUMBERS[fraction.group(1).lower()], rest[fraction.end():].lstrip()
+        return ParsedQuantity(float(amount), None, rest.strip(), len(text) - len(rest))
+    return ParsedQuantity(None, None, text)
+
+
+def split_quantity(text) -> Tuple[str, str]:
+    """Split "1 1/2 cups" into ("1 1/2", "cups"); non-numeric text is returned whole with no unit"""
+    text = _vulgar_fractions(str(text or ""))
+    parsed = parse_quantity(text)
+    if parsed.amount is None:
+        return text, ""
+    return text[:parsed.consumed].strip(), parsed.unit
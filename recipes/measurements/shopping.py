@@ -0,0 +1,221 @@
+"""Shopping list lines computed from one aggregated query.
+
+The query groups a list's RecipeIngredient rows by ingredient and base unit.
+It sums the parsed base quantities and collects each row's quantity, unit
+and recipe title as a JSON array. A correlated subquery attaches the user's
+unexpired inventory lots for the same ingredient. Rows arrive ordered by
+ingredient, so lines are produced in batches of whole ingredients while the
+cursor is still being read. Conversion and lot allocation run once per
+batch.
+
+Saved ShoppingLists reuse the same query restricted to the ingredients a
+mutation touches, and write only the items whose values changed.
+"""
+
+# pylint: disable=no-member
+
+import json
+import uuid
+from datetime import date
+from itertools import groupby, islice
+from typing import Iterator, List, Optional
+from django.db import transaction
+from django.db.models import Aggregate, Count, Func, OuterRef, Subquery, Sum, TextField
+from django.utils import timezone
+from recipes.models import Inventory, RecipeIngredient, ShoppingList, ShoppingListItem
+from .conversion import conversion_index
+from .inventory import LOT_FIELDS, allocate_lots, fefo_order, unexpired
+
+BATCH_INGREDIENTS = 200
+CURSOR_CHUNK_SIZE = 500
+
+
+class JSONRow(Func):
+    function = "JSON_ARRAY"
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function="JSON_BUILD_ARRAY", **extra_context)
+
+
+class JSONGroupArray(Aggregate):
+    """JSON array text with one [expression, ...] array per grouped row.
+
+    Element order within the array is unspecified.
+    """
+
+    function = "JSON_GROUP_ARRAY"
+    output_field = TextField()
+
+    def __init__(self, *expressions, **extra):
+        super().__init__(JSONRow(*expressions), **extra)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, function="JSON_AGG", template="%(function)s(%(distinct)s%(expressions)s)::text"
+        )
+
+
+def _json(value) -> list:
+    if value is None:
+        return []
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def _uuid(value) -> uuid.UUID:
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+def _date(value) -> Optional[date]:
+    return date.fromisoformat(value[:10]) if isinstance(value, str) else value
+
+
+def shopping_rows(recipe_ids, user, today: Optional[date] = None, ingredient_ids=None):
+    """One row per (ingredient, base unit) for the recipes, with the user's lots attached"""
+    lots = (
+        Inventory.objects.filter(unexpired(today), user=user, ingredient_id=OuterRef("ingredient_id"))
+        .order_by()
+        .values("ingredient_id")
+        .annotate(lots=JSONGroupArray(*LOT_FIELDS))
+        .values("lots")
+    )
+    rows = RecipeIngredient.objects.filter(recipe_id__in=recipe_ids)
+    if ingredient_ids is not None:
+        rows = rows.filter(ingredient_id__in=ingredient_ids)
+    return (
+        rows.values("ingredient_id", "ingredient__name", "base_unit")
+        .annotate(
+            total=Sum("base_quantity"),
+            row_count=Count("pk"),
+            lines=JSONGroupArray("created_at", "quantity", "unit__name", "recipe__title"),
+            lots=Subquery(lots, output_field=TextField()),
+        )
+        .order_by("ingredient__name", "ingredient_id", "base_unit")
+    )
+
+
+def _lines_for_batch(groups: List[list]) -> Iterator[dict]:
+    rows = [row for group in groups for row in group]
+    totals = conversion_index.canonical_totals(
+        [row["ingredient_id"] for row in rows],
+        [row["total"] for row in rows],
+        [row["base_unit"] for row in rows],
+        [row["row_count"] for row in rows],
+    )
+    lots = []
+    for group in groups:
+        ingredient_id = group[0]["ingredient_id"]
+        lots.extend(
+            sorted(
+                ((_uuid(lot[0]), ingredient_id, *lot[2:6], _date(lot[6])) for lot in _json(group[0]["lots"])),
+                key=fefo_order,
+            )
+        )
+    needs = allocate_lots(totals, lots)
+
+    for group in groups:
+        ingredient_id = group[0]["ingredient_id"]
+        total, need = totals[ingredient_id], needs[ingredient_id]
+        entries = sorted((entry for row in group for entry in _json(row["lines"])), key=lambda entry: entry[0])
+        yield {
+            "ingredient_id": ingredient_id,
+            "ingredient": group[0]["ingredient__name"],
+            "unit": total.unit or None,
+            "quantity": ", ".join(f"{quantity} {unit}" if unit else quantity for _, quantity, unit, _ in entries),
+            "total_quantity": total.quantity,
+            "to_buy": need.to_buy,
+            "unconverted": [{"quantity": quantity, "unit": unit} for quantity, unit in total.unconverted],
+            "recipes": list(dict.fromkeys(title for *_, title in entries)),
+            "in_inventory": need.on_hand > 0,
+            "inventory_quantity": need.on_hand,
+            "inventory_unit": total.unit or None,
+            "inventory_lots": [
+                {"id": lot.inventory_id, "quantity": lot.quantity, "expiry_date": lot.expiry_date}
+                for lot in need.lots
+            ],
+        }
+
+
+def shopping_lines(recipe_ids, user, today: Optional[date] = None, ingredient_ids=None) -> Iterator[dict]:
+    """Shopping list lines, one per ingredient, produced batch by batch from a single query"""
+    rows = shopping_rows(recipe_ids, user, today, ingredient_ids).iterator(chunk_size=CURSOR_CHUNK_SIZE)
+    groups = (list(group) for _, group in groupby(rows, key=lambda row: row["ingredient_id"]))
+    while True:
+        batch = list(islice(groups, BATCH_INGREDIENTS))
+        if not batch:
+            return
+        yield from _lines_for_batch(batch)
+
+
+ITEM_FIELDS = ["unit", "quantity", "total_quantity", "to_buy", "inventory_quantity", "unconverted", "recipes"]
+
+
+def _item_values(line: dict) -> dict:
+    return {
+        "unit": line["unit"] or "",
+        "quantity": line["quantity"],
+        "total_quantity": line["total_quantity"],
+        "to_buy": line["to_buy"],
+        "inventory_quantity": line["inventory_quantity"],
+        "unconverted": line["unconverted"],
+        "recipes": line["recipes"],
+    }
+
+
+def refresh_items(shopping_list, version: int, ingredient_ids=None) -> int:
+    """Recompute a saved list's items for ingredient_ids (all when None).
+
+    Only items whose values change are written, stamped with version. Items
+    no longer needed are soft deleted, and an item that now needs more than
+    when it was checked off is unchecked. Returns the number of items written.
+    """
+    recipe_ids = list(shopping_list.recipes.values_list("pk", flat=True))
+    lines = {}
+    if recipe_ids:
+        lines = {
+            line["ingredient_id"]: line
+            for line in shopping_lines(recipe_ids, shopping_list.user, ingredient_ids=ingredient_ids)
+        }
+    items = ShoppingListItem.all_objects.filter(shopping_list=shopping_list)
+    if ingredient_ids is not None:
+        items = items.filter(ingredient_id__in=ingredient_ids)
+    existing = {item.ingredient_id: item for item in items}
+
+    created, updated = [], []
+    for ingredient_id, line in lines.items():
+        values = _item_values(line)
+        item = existing.get(ingredient_id)
+        if item is None:
+            created.append(
+                ShoppingListItem(shopping_list=shopping_list, ingredient_id=ingredient_id, version=version, **values)
+            )
+            continue
+        if item.is_active and all(getattr(item, name) == value for name, value in values.items()):
+            continue
+        if (values["to_buy"] or 0) > (item.to_buy or 0):
+            item.checked = False
+        for name, value in values.items():
+            setattr(item, name, value)
+        item.is_active, item.deleted_at, item.version = True, None, version
+        updated.append(item)
+    for ingredient_id, item in existing.items():
+        if ingredient_id not in lines and item.is_active:
+            item.is_active, item.deleted_at, item.version = False, timezone.now(), version
+            updated.append(item)
+
+    now = timezone.now()
+    for item in updated:
+        item.updated_at = now
+    ShoppingListItem.all_objects.bulk_create(created)
+    ShoppingListItem.all_objects.bulk_update(
+        updated, ITEM_FIELDS + ["checked", "is_active", "deleted_at", "version", "updated_at"]
+    )
+    return len(created) + len(updated)
+
+
+def create_shopping_list(user, recipes, name: str = ""):
+    """Save a ShoppingList at version 1 for the recipes, with its items computed"""
+    with transaction.atomic():
+        shopping_list = ShoppingList.objects.create(user=user, name=name, version=1)
+        shopping_list.recipes.set(recipes)
+        refresh_items(shopping_list, shopping_list.version)
+    return shopping_list
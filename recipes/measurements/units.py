@@ -0,0 +1,94 @@
+"""Conversion of unit names to the base units used for aggregation: grams, milliliters and counts."""
+
+from typing import Optional, Tuple
+from .parsing import parse_quantity
+
+GRAM, MILLILITER, COUNT = "g", "ml", "count"
+BASE_UNIT_CHOICES = [(GRAM, "Grams"), (MILLILITER, "Milliliters"), (COUNT, "Count")]
+UNIT_TYPE_BASES = {"weight": GRAM, "volume": MILLILITER, "count": COUNT}
+
+_FACTORS = {
+    GRAM: {
+        ("mg", "milligram"): 0.001,
+        ("g", "gr", "gram", "gramme"): 1.0,
+        ("kg", "kilo", "kilogram"): 1000.0,
+        ("oz", "ounce"): 28.3495,
+        ("lb", "lbs", "pound"): 453.592,
+    },
+    MILLILITER: {
+        ("ml", "milliliter", "millilitre"): 1.0,
+        ("cl", "centiliter", "centilitre"): 10.0,
+        ("dl", "deciliter", "decilitre"): 100.0,
+        ("l", "liter", "litre"): 1000.0,
+        ("tsp", "teaspoon"): 4.92892,
+        ("tbsp", "tbs", "tablespoon"): 14.7868,
+        ("fl oz", "fluid ounce"): 29.5735,
+        ("cup", "c"): 236.588,
+        ("pint", "pt"): 473.176,
+        ("quart", "qt"): 946.353,
+        ("gallon", "gal"): 3785.41,
+    },
+    COUNT: {
+        ("piece", "pc", "pcs", "whole", "unit", "each", "item", "clove", "slice", "can", "egg", "stalk", "sprig"): 1.0,
+    },
+}
+UNIT_FACTORS = {name: (base, factor) for base, units in _FACTORS.items() for names, factor in units.items() for name in names}
+
+
+def normalize_unit_name(name: str) -> str:
+    return " ".join((name or "").lower().replace(".", " ").split())
+
+
+def unit_factor(name: str) -> Optional[Tuple[str, float]]:
+    """(base unit, factor) for a unit name, tolerating plurals and trailing words ("cups flour").
+
+    Returns None for units with no fixed size, such as a pinch.
+    """
+    words = normalize_unit_name(name).split()
+    for phrase in (" ".join(words), " ".join(words[:2]), " ".join(words[:1])):
+        for candidate in (phrase, phrase[:-1] if phrase.endswith("s") else "", phrase[:-2] if phrase.endswith("es") else ""):
+            if candidate in UNIT_FACTORS:
+                return UNIT_FACTORS[candidate]
+    return None
+
+
+def to_base(amount: Optional[float], unit_name: str) -> Tuple[Optional[float], str]:
+    """Convert an amount in `unit_name` to (base quantity, base unit); no unit means a count"""
+    if amount is None:
+        return None, ""
+    factor = unit_factor(unit_name) if normalize_unit_name(unit_name) else (COUNT, 1.0)
+    if factor is None:
+        return None, ""
+    base, multiplier = factor
+    return amount * multiplier, base
+
+
+def configured_factor(unit_type: Optional[str], to_base_factor: Optional[float]) -> Optional[Tuple[str, float]]:
+    """(base unit, factor) from a Unit's unit_type and to_base_factor, or None when no factor is set"""
+    if to_base_factor is None or unit_type not in UNIT_TYPE_BASES:
+        return None
+    return UNIT_TYPE_BASES[unit_type], to_base_factor
+
+
+def parsed_quantity_fields(
+    quantity: str, unit_name: Optional[str], unit_base: Optional[Tuple[str, float]] = None
+) -> dict:
+    """Structured RecipeIngredient columns for a free-text quantity and optional unit.
+
+    A unit written inside the quantity ("2 cups") is used when the row has no
+    unit. unit_base, the factor configured on the Unit row, takes precedence
+    over the name table. base_quantity converts the upper bound of a range so
+    that shopping totals never come up short.
+    """
+    parsed = parse_quantity(quantity)
+    amount = parsed.amount_max if parsed.amount_max is not None else parsed.amount
+    if unit_base is not None and amount is not None:
+        base_quantity, base_unit = amount * unit_base[1], unit_base[0]
+    else:
+        base_quantity, base_unit = to_base(amount, unit_name or parsed.unit)
+    return {
+        "amount": parsed.amount,
+        "amount_max": parsed.amount_max,
+        "base_quantity": base_quantity,
+        "base_unit": base_unit,
+    }
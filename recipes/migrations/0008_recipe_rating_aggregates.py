@@ -0,0 +1,55 @@
+# Generated by Django 5.1.4 on 2026-10-19 09:48
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Feedback = apps.get_model('recipes', 'Feedback')
+    RecipePreference = apps.get_model('recipes', 'RecipePreference')
+
+    ratings = Feedback.objects.filter(recipe=OuterRef('pk'), is_active=True).order_by().values('recipe')
+    favorites = RecipePreference.objects.filter(
+        recipe=OuterRef('pk'), preference='favorite'
+    ).order_by().values('recipe')
+    Recipe.objects.update(
+        rating_sum=Coalesce(Subquery(ratings.annotate(s=Sum('rating')).values('s'), output_field=IntegerField()), 0),
+        rating_count=Coalesce(Subquery(ratings.annotate(c=Count('id')).values('c'), output_field=IntegerField()), 0),
+        favorites_count=Coalesce(Subquery(favorites.annotate(c=Count('id')).values('c'), output_field=IntegerField()), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_alter_restrictionrule_rule_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='rating_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='rating_sum',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(models.OrderBy(models.ExpressionWrapper(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('rating_sum', models.FloatField()), '/', django.db.models.functions.comparison.NullIf('rating_count', 0)), output_field=models.FloatField()), descending=True), models.OrderBy(models.F('favorites_count'), descending=True), name='recipe_popularity_idx'),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.4 on 2026-10-19 09:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipepreference',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipepreference',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='TrendingRecipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('all', 'All'), ('cuisine', 'Cuisine'), ('fodmap', 'FODMAP friendly')], max_length=10)),
+                ('scope_value', models.CharField(blank=True, default='', max_length=100)),
+                ('rank', models.PositiveIntegerField()),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending_entries', to='recipes.recipe')),
+            ],
+            options={
+                'ordering': ['scope', 'scope_value', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('scope', 'scope_value', 'rank'), name='unique_trending_rank')],
+            },
+        ),
+    ]
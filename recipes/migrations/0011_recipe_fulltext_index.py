@@ -0,0 +1,48 @@
+from django.db import migrations
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS recipes_recipe_fts USING fts5("
+        "recipe_id UNINDEXED, title, description, instructions, ingredients, "
+        "tokenize='porter unicode61')"
+    )
+
+    ingredients = {}
+    for recipe_id, name in RecipeIngredient.objects.filter(is_active=True).values_list(
+        'recipe_id', 'ingredient__name'
+    ):
+        ingredients.setdefault(recipe_id, []).append(name)
+
+    rows = [
+        (r['id'].hex, r['title'], r['description'] or '', r['instructions'] or '',
+         ' '.join(ingredients.get(r['id'], [])))
+        for r in Recipe.objects.filter(is_active=True).values('id', 'title', 'description', 'instructions')
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO recipes_recipe_fts (recipe_id, title, description, instructions, ingredients) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            rows,
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS recipes_recipe_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_userstatistics'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
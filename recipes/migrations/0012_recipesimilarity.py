@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-19 10:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_fulltext_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField()),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.recipe')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_entries', to='recipes.recipe')),
+            ],
+            options={
+                'verbose_name_plural': 'Recipe similarities',
+                'ordering': ['recipe', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('recipe', 'rank'), name='unique_similarity_rank')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-19 10:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_userrecommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='amount',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='amount_max',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='base_quantity',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='base_unit',
+            field=models.CharField(blank=True, choices=[('g', 'Grams'), ('ml', 'Milliliters'), ('count', 'Count')], default='', editable=False, max_length=10),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.4 on 2026-10-19 10:20
+
+from django.db import migrations, models
+
+from recipes.measurements.units import UNIT_TYPE_BASES, unit_factor
+
+
+def seed_unit_factors(apps, schema_editor):
+    Unit = apps.get_model('recipes', 'Unit')
+    updates = []
+    for unit in Unit.objects.filter(to_base_factor__isnull=True):
+        known = unit_factor(unit.name)
+        if known and known[0] == UNIT_TYPE_BASES.get(unit.unit_type):
+            unit.to_base_factor = known[1]
+            updates.append(unit)
+    Unit.objects.bulk_update(updates, ['to_base_factor'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_recipeingredient_parsed_quantity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='density',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='piece_weight',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='to_base_factor',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(seed_unit_factors, migrations.RunPython.noop),
+    ]
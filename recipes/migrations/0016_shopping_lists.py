@@ -0,0 +1,60 @@
+# Generated by Django 5.1.4 on 2026-10-19 10:28
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_unit_conversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingList',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('name', models.CharField(blank=True, default='', max_length=200)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('recipes', models.ManyToManyField(blank=True, related_name='+', to='recipes.recipe')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_lists', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('unit', models.CharField(blank=True, default='', max_length=10)),
+                ('quantity', models.TextField(blank=True, default='')),
+                ('total_quantity', models.FloatField(blank=True, null=True)),
+                ('to_buy', models.FloatField(blank=True, null=True)),
+                ('inventory_quantity', models.FloatField(default=0)),
+                ('unconverted', models.JSONField(blank=True, default=list)),
+                ('recipes', models.JSONField(blank=True, default=list)),
+                ('checked', models.BooleanField(default=False)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.ingredient')),
+                ('shopping_list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='recipes.shoppinglist')),
+            ],
+            options={
+                'ordering': ['shopping_list', 'ingredient__name'],
+                'indexes': [models.Index(fields=['shopping_list', 'version'], name='recipes_sho_shoppin_6c1d04_idx')],
+                'constraints': [models.UniqueConstraint(fields=('shopping_list', 'ingredient'), name='unique_shopping_list_ingredient')],
+            },
+        ),
+    ]
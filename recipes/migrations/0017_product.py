@@ -0,0 +1,35 @@
+# Generated by Django 5.1.4 on 2026-10-19 10:37
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_shopping_lists'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('gtin', models.CharField(max_length=14, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('brand', models.CharField(blank=True, default='', max_length=255)),
+                ('quantity', models.CharField(blank=True, default='', help_text='Package size as printed, e.g. "500 g"', max_length=100)),
+                ('package_amount', models.FloatField(blank=True, null=True)),
+                ('ingredient', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='products', to='recipes.ingredient')),
+                ('package_unit', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='recipes.unit')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+SEARCH_TABLE = 'recipes_recipe_search'
+
+
+def create_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+        "recipe_id uuid PRIMARY KEY REFERENCES recipes_recipe (id) ON DELETE CASCADE, "
+        "document tsvector NOT NULL)"
+    )
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx ON {SEARCH_TABLE} USING GIN (document)"
+    )
+    schema_editor.execute(
+        f"INSERT INTO {SEARCH_TABLE} (recipe_id, document) "
+        "SELECT r.id, "
+        "setweight(to_tsvector(r.title), 'A') || "
+        "setweight(to_tsvector(coalesce(string_agg(i.name, ' '), '')), 'B') || "
+        "setweight(to_tsvector(coalesce(r.description, '')), 'B') || "
+        "setweight(to_tsvector(coalesce(r.instructions, '')), 'C') "
+        "FROM recipes_recipe r "
+        "LEFT JOIN recipes_recipeingredient ri ON ri.recipe_id = r.id AND ri.is_active "
+        "LEFT JOIN recipes_ingredient i ON i.id = ri.ingredient_id "
+        "WHERE r.is_active GROUP BY r.id"
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0018_ingestion_job'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -1,4 +1,8 @@
 from .base import BaseModel
-from .recipe import Recipe, Ingredient, IngredientAlias, Category, Unit, Tag, RecipeIngredient, FodmapCategory
+from .recipe import rating_average, Recipe, Ingredient, IngredientAlias, Category, Unit, Tag, RecipeIngredient, FodmapCategory
 from .user import UserProfile, Inventory, Feedback, DietaryRestriction, DietType, FoodPreference, RecipePreference
 from .policy import DietProtocol, ProtocolPhase, DietProtocolRule, UserProtocol, DietTypeRule, RestrictionRule
+from .stats import RecipeSimilarity, TrendingRecipe, UserRecommendation, UserStatistics
+from .shopping import ShoppingList, ShoppingListItem
+from .product import Product
+from .ingestion import IngestionJob
@@ -0,0 +1,37 @@
+# pylint: disable=no-member
+
+from django.db import models
+from django.contrib.auth.models import User
+from .base import BaseModel
+
+
+class IngestionJob(BaseModel):
+    """A background import into a user's inventory, e.g. OCR of receipt photos.
+
+    processed counts finished images out of total; result holds the parsed
+    lines and per-line upsert outcomes once the job is done.
+    """
+
+    class Kind(models.TextChoices):
+        RECEIPT = 'receipt', 'Receipt'
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ingestion_jobs')
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, default='')
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.kind} {self.status} ({self.processed}/{self.total})"
@@ -0,0 +1,23 @@
+# pylint: disable=no-member
+
+from django.db import models
+from .base import BaseModel
+from .recipe import Ingredient, Unit
+
+
+class Product(BaseModel):
+    """A packaged product by GTIN, loaded with the import_products command"""
+
+    # GTIN-14: EAN-8, UPC-A and EAN-13 codes are left padded with zeros
+    gtin = models.CharField(max_length=14, unique=True)
+    name = models.CharField(max_length=255)
+    brand = models.CharField(max_length=255, blank=True, default='')
+    quantity = models.CharField(max_length=100, blank=True, default='', help_text='Package size as printed, e.g. "500 g"')
+    package_amount = models.FloatField(null=True, blank=True)
+    package_unit = models.ForeignKey(Unit, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.SET_NULL, null=True, blank=True, related_name='products'
+    )
+
+    def __str__(self):
+        return f"{self.gtin} {self.name}"
@@ -2,12 +2,21 @@
 
 from django.db import models
 from .base import BaseModel
+from ..measurements.units import BASE_UNIT_CHOICES
 from django.contrib.auth import get_user_model
 from django.conf import settings
-from django.db.models import Q
-from django.db.models.functions import Lower
+from django.db.models import Q, F, FloatField, ExpressionWrapper
+from django.db.models.functions import Lower, Cast, NullIf
 User = get_user_model()
 
+
+def rating_average():
+    """Average rating computed from the denormalized columns, NULL for unrated recipes"""
+    return ExpressionWrapper(
+        Cast('rating_sum', FloatField()) / NullIf('rating_count', 0),
+        output_field=FloatField(),
+    )
+
 class Category(BaseModel):
     name = models.CharField(max_length=255, unique=True)
     description = models.TextField(blank=True, null=True)
@@ -25,6 +34,8 @@ class Unit(BaseModel):
         max_length=50,
         choices=[("weight", "Weight"), ("volume", "Volume"), ("count", "Count")],
     )
+    # Grams, milliliters or counts per one of this unit, according to unit_type
+    to_base_factor = models.FloatField(null=True, blank=True)
 
     def __str__(self):
         return str(self.name)
@@ -41,6 +52,9 @@ class Ingredient(BaseModel):
     substitutes = models.ManyToManyField('self', blank=True, symmetrical=False, related_name='substitute_for')
     nutritional_info = models.JSONField(null=True, blank=True)
     tags=models.ManyToManyField('Tag', blank=True, related_name='ingredients')
+    # Conversion overrides: grams per milliliter, and grams per whole item
+    density = models.FloatField(null=True, blank=True)
+    piece_weight = models.FloatField(null=True, blank=True)
 
     def __str__(self):
         return str(self.name)
@@ -86,10 +100,28 @@ class Recipe(BaseModel):
         blank=True,
         related_name='created_recipes'
     )
+    # Maintained by the Feedback/RecipePreference signals in recipes.aggregates,
+    # see the reconcile_recipe_aggregates command for repairing drift.
+    rating_sum = models.IntegerField(default=0, editable=False)
+    rating_count = models.IntegerField(default=0, editable=False)
+    favorites_count = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                rating_average().desc(),
+                F('favorites_count').desc(),
+                name='recipe_popularity_idx',
+            ),
+        ]
 
     def __str__(self):
         return str(self.title)
 
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
 
 class RecipeIngredient(BaseModel):
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
@@ -99,6 +131,11 @@ class RecipeIngredient(BaseModel):
         Unit, on_delete=models.SET_NULL, null=True, blank=True
     )
     notes = models.CharField(max_length=255, blank=True)
+    # Parsed from quantity/unit on save (see recipes.measurements); backfill with backfill_quantities
+    amount = models.FloatField(null=True, blank=True, editable=False)
+    amount_max = models.FloatField(null=True, blank=True, editable=False)
+    base_quantity = models.FloatField(null=True, blank=True, editable=False)
+    base_unit = models.CharField(max_length=10, choices=BASE_UNIT_CHOICES, blank=True, default='', editable=False)
     
     def __str__(self):
         return f"{self.quantity} {self.unit} {self.ingredient.name} in {self.recipe.title}"
@@ -0,0 +1,51 @@
+# pylint: disable=no-member
+
+from django.db import models
+from django.contrib.auth.models import User
+from .base import BaseModel
+from .recipe import Recipe, Ingredient
+
+
+class ShoppingList(BaseModel):
+    """A saved shopping list; version increases by one with every mutation"""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='shopping_lists')
+    name = models.CharField(max_length=200, blank=True, default='')
+    recipes = models.ManyToManyField(Recipe, blank=True, related_name='+')
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.name or self.pk} (v{self.version})"
+
+
+class ShoppingListItem(BaseModel):
+    """One ingredient line of a ShoppingList; version is the list version that last changed it.
+
+    Items whose ingredient is no longer needed are soft deleted rather than
+    removed, so clients syncing from an older version learn about them.
+    """
+
+    shopping_list = models.ForeignKey(ShoppingList, on_delete=models.CASCADE, related_name='items')
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, related_name='+')
+    unit = models.CharField(max_length=10, blank=True, default='')
+    quantity = models.TextField(blank=True, default='')
+    total_quantity = models.FloatField(null=True, blank=True)
+    to_buy = models.FloatField(null=True, blank=True)
+    inventory_quantity = models.FloatField(default=0)
+    unconverted = models.JSONField(default=list, blank=True)
+    recipes = models.JSONField(default=list, blank=True)
+    checked = models.BooleanField(default=False)
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['shopping_list', 'ingredient__name']
+        constraints = [
+            models.UniqueConstraint(fields=['shopping_list', 'ingredient'], name='unique_shopping_list_ingredient')
+        ]
+        indexes = [models.Index(fields=['shopping_list', 'version'])]
+
+    def __str__(self):
+        return f"{self.shopping_list_id} - {self.ingredient_id} ({self.to_buy} {self.unit})"
@@ -0,0 +1,99 @@
+# pylint: disable=no-member
+
+from django.db import models
+from django.contrib.auth.models import User
+from .recipe import Recipe
+
+
+class TrendingRecipe(models.Model):
+    """Top-N recipes per scope, rewritten by the compute_trending command"""
+
+    class Scope(models.TextChoices):
+        ALL = 'all', 'All'
+        CUISINE = 'cuisine', 'Cuisine'
+        FODMAP = 'fodmap', 'FODMAP friendly'
+
+    scope = models.CharField(max_length=10, choices=Scope.choices)
+    scope_value = models.CharField(max_length=100, blank=True, default='')
+    rank = models.PositiveIntegerField()
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='trending_entries')
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['scope', 'scope_value', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'scope_value', 'rank'], name='unique_trending_rank')
+        ]
+
+    def __str__(self):
+        return f"#{self.rank} {self.scope}:{self.scope_value} - {self.recipe_id} ({self.score:.3f})"
+
+
+class RecipeSimilarity(models.Model):
+    """Top-k most similar recipes per recipe, maintained by the compute_similar_recipes command"""
+
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='similar_entries')
+    neighbor = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveIntegerField()
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['recipe', 'rank']
+        verbose_name_plural = 'Recipe similarities'
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'rank'], name='unique_similarity_rank')
+        ]
+
+    def __str__(self):
+        return f"{self.recipe_id} #{self.rank} -> {self.neighbor_id} ({self.score:.3f})"
+
+
+class UserRecommendation(models.Model):
+    """Top-N personalized recipes per user, rewritten by the train_recommender command"""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recommendations')
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveIntegerField()
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['user', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'rank'], name='unique_recommendation_rank')
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} #{self.rank} -> {self.recipe_id} ({self.score:.3f})"
+
+
+class UserStatistics(models.Model):
+    """Per-user interaction totals, kept current by the Feedback/RecipePreference signals.
+
+    cuisine_counts counts one per favorite and one per rating, keyed by the
+    recipe cuisine. Rebuild with the rebuild_user_statistics command.
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='statistics')
+    favorites_count = models.IntegerField(default=0)
+    ratings_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    fodmap_recipes_tried = models.IntegerField(default=0)
+    cuisine_counts = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'User statistics'
+
+    def __str__(self):
+        return f"Statistics for {self.user_id}"
+
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.ratings_count if self.ratings_count else 0
+
+    def top_cuisines(self, limit=5):
+        ranked = sorted(self.cuisine_counts.items(), key=lambda item: (-item[1], item[0]))
+        return [{'cuisine': cuisine, 'count': count} for cuisine, count in ranked[:limit]]
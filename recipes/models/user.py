@@ -92,6 +92,8 @@ class RecipePreference(models.Model):
     preference = models.CharField(
         max_length=20, choices=PREFERENCE_CHOICES, default="neutral"
     )
+    created_at = models.DateTimeField(auto_now_add=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, null=True)
 
     class Meta:
         unique_together = ["user", "recipe"]
@@ -0,0 +1,298 @@
+"""Weekly meal planning that uses up the pantry under the user's diet policy.
+
+The index holds the catalog as flat arrays: one entry per recipe
+ingredient, sorted by recipe, with its amount in grams where the
+conversion tables allow (otherwise in its own base unit). A
+(ingredient, unit) pair is a "resource" that pantry lots and recipe
+entries share. Entries with no parsed amount ("salt, to taste") only
+need the ingredient to be present.
+
+Planning is greedy. Each round scores every eligible recipe in one
+vectorized pass and takes the best one:
+
+- It credits the share of each ingredient the remaining pantry covers,
+  with extra weight for lots close to their expiry date.
+- It charges for each ingredient that must be bought, less if the
+  ingredient is already on the list.
+
+Policy AVOID rules and per-serving LIMIT rules remove recipes up front.
+Variety is enforced as a cap per cuisine and per tag.
+"""
+
+# pylint: disable=no-member
+
+import math
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional
+import numpy as np
+from django.utils import timezone
+from recipes.measurements.conversion import conversion_index
+from recipes.measurements.inventory import LOT_FIELDS, lot_base, unexpired
+from recipes.measurements.units import GRAM
+from recipes.models import Ingredient, Inventory, Recipe, RecipeIngredient, UserProfile
+from recipes.policy.policy import CompiledPolicy, compile_policy_for_user, filter_recipe_ids_by_policy
+from recipes.search.index import VersionedIndex
+from recipes.search.suggest import recipe_score
+
+DEFAULT_DAYS = 7
+MAX_DAYS = 28
+DEFAULT_MAX_PER_CUISINE = 2
+DEFAULT_MAX_PER_TAG = 3
+
+NEW_PURCHASE_COST = 1.0
+REPEAT_PURCHASE_COST = 0.25
+# A lot expiring today weighs 1 + EXPIRY_WEIGHT; the bonus fades to 0 over the horizon
+EXPIRY_WEIGHT = 2.0
+EXPIRY_HORIZON_DAYS = 7
+QUALITY_WEIGHT = 0.1
+
+
+@dataclass
+class PlannerData:
+    recipe_ids: list
+    titles: List[str]
+    cuisine_codes: np.ndarray
+    servings: np.ndarray
+    quality: np.ndarray
+    ingredient_ids: list
+    ingredient_names: List[str]
+    resource_index: Dict[tuple, int]
+    resource_ingredient: np.ndarray
+    # Entries sorted by recipe; entry_offsets[i]:entry_offsets[i + 1] belong to recipe i
+    entry_offsets: np.ndarray
+    entry_recipe: np.ndarray
+    entry_resource: np.ndarray
+    entry_amount: np.ndarray
+    presence_recipe: np.ndarray
+    presence_ingredient: np.ndarray
+    tag_recipe: np.ndarray
+    tag_code: np.ndarray
+    tag_count: int
+
+
+@dataclass
+class PlannedMeal:
+    recipe_id: object
+    title: str
+    score: float
+    pantry_ingredients: List[str] = field(default_factory=list)
+    expiring_ingredients: List[str] = field(default_factory=list)
+    to_buy: List[str] = field(default_factory=list)
+
+
+class PlannerIndex(VersionedIndex):
+    version_key = "index:planner:version"
+
+    def build(self):
+        recipes = list(
+            Recipe.objects.order_by("pk").values_list(
+                "pk", "title", "cuisine", "servings", "rating_sum", "rating_count", "favorites_count"
+            )
+        )
+        position = {row[0]: i for i, row in enumerate(recipes)}
+        cuisines: Dict[str, int] = {}
+        codes = []
+        for cuisine in ((r[2] or "").strip().lower() for r in recipes):
+            codes.append(cuisines.setdefault(cuisine, len(cuisines)) if cuisine else -1)
+        cuisine_codes = np.array(codes, dtype=np.int32)
+
+        rows = [
+            row
+            for row in RecipeIngredient.objects.values_list(
+                "recipe_id", "ingredient_id", "ingredient__name", "base_quantity", "base_unit"
+            )
+            if row[0] in position
+        ]
+        rows.sort(key=lambda row: position[row[0]])
+        ingredient_index: Dict[object, int] = {}
+        ingredient_names: List[str] = []
+        for _, ingredient_id, name, _, _ in rows:
+            if ingredient_id not in ingredient_index:
+                ingredient_index[ingredient_id] = len(ingredient_names)
+                ingredient_names.append(name)
+
+        measured = [row for row in rows if row[3] is not None and row[4]]
+        to_grams = conversion_index.factors([r[1] for r in measured], [r[4] for r in measured], [GRAM] * len(measured))
+        resource_index: Dict[tuple, int] = {}
+        entry_recipe, entry_resource, entry_amount = [], [], []
+        for (recipe_id, ingredient_id, _, quantity, unit), factor in zip(measured, to_grams):
+            if not np.isnan(factor):
+                key, amount = (ingredient_id, GRAM), quantity * factor
+            else:
+                key, amount = (ingredient_id, unit), quantity
+            if amount <= 0:
+                continue
+            entry_recipe.append(position[recipe_id])
+            entry_resource.append(resource_index.setdefault(key, len(resource_index)))
+            entry_amount.append(amount)
+        presence = [(position[r[0]], ingredient_index[r[1]]) for r in rows if r[3] is None or not r[4]]
+
+        tags: Dict[object, int] = {}
+        tag_pairs = [
+            (position[recipe_id], tags.setdefault(tag_id, len(tags)))
+            for recipe_id, tag_id in Recipe.tags.through.objects.values_list("recipe_id", "tag_id")
+            if recipe_id in position
+        ]
+
+        entry_recipe = np.array(entry_recipe, dtype=np.int32)
+        return PlannerData(
+            recipe_ids=[r[0] for r in recipes],
+            titles=[r[1] for r in recipes],
+            cuisine_codes=cuisine_codes,
+            servings=np.array([max(r[3] or 1, 1) for r in recipes], dtype=np.float64),
+            quality=np.array([recipe_score(r[4], r[5], r[6]) for r in recipes], dtype=np.float64),
+            ingredient_ids=list(ingredient_index),
+            ingredient_names=ingredient_names,
+            resource_index=resource_index,
+            resource_ingredient=np.array([ingredient_index[key[0]] for key in resource_index], dtype=np.int32),
+            entry_offsets=np.searchsorted(entry_recipe, np.arange(len(recipes) + 1)),
+            entry_recipe=entry_recipe,
+            entry_resource=np.array(entry_resource, dtype=np.int32),
+            entry_amount=np.array(entry_amount, dtype=np.float64),
+            presence_recipe=np.array([p[0] for p in presence], dtype=np.int32),
+            presence_ingredient=np.array([p[1] for p in presence], dtype=np.int32),
+            tag_recipe=np.array([p[0] for p in tag_pairs], dtype=np.int32),
+            tag_code=np.array([p[1] for p in tag_pairs], dtype=np.int32),
+            tag_count=len(tags),
+        )
+
+
+planner_index = PlannerIndex()
+
+
+def within_limits(data: PlannerData, limits_by_tag_id: Dict) -> np.ndarray:
+    """Recipes whose per-serving amount of each LIMIT tag's ingredients is within its threshold.
+
+    Amounts are compared in the entry's resource unit, grams where the
+    ingredient converts.
+    """
+    ok = np.ones(len(data.recipe_ids), dtype=bool)
+    limits = {tag_id: threshold for tag_id, threshold in limits_by_tag_id.items() if math.isfinite(threshold)}
+    if not limits or not len(data.entry_amount):
+        return ok
+    position = {pk: i for i, pk in enumerate(data.ingredient_ids)}
+    tagged: Dict[object, np.ndarray] = {}
+    for ingredient_id, tag_id in Ingredient.tags.through.objects.filter(tag_id__in=list(limits)).values_list(
+        "ingredient_id", "tag_id"
+    ):
+        if ingredient_id in position:
+            mask = tagged.setdefault(tag_id, np.zeros(len(data.ingredient_ids), dtype=bool))
+            mask[position[ingredient_id]] = True
+    for tag_id, mask in tagged.items():
+        in_tag = mask[data.resource_ingredient[data.entry_resource]]
+        amount = np.bincount(data.entry_recipe, weights=data.entry_amount * in_tag, minlength=len(ok))
+        ok &= amount / data.servings <= limits[tag_id]
+    return ok
+
+
+def _pantry(data: PlannerData, user, today: date):
+    """Available amount and weight per resource, and which ingredients the user has at all"""
+    available = np.zeros(len(data.resource_index))
+    weight = np.ones(len(data.resource_index))
+    have = np.zeros(len(data.ingredient_ids), dtype=bool)
+    position = {pk: i for i, pk in enumerate(data.ingredient_ids)}
+    lots = [
+        lot
+        for lot in Inventory.objects.filter(unexpired(today), user=user, quantity__gt=0).values_list(*LOT_FIELDS)
+        if lot[1] in position
+    ]
+    if not lots:
+        return available, weight, have
+    base = [lot_base(lot) for lot in lots]
+    to_grams = conversion_index.factors([lot[1] for lot in lots], [unit for _, unit in base], [GRAM] * len(lots))
+    for lot, (quantity, unit), factor in zip(lots, base, to_grams):
+        have[position[lot[1]]] = True
+        key = (lot[1], GRAM) if not np.isnan(factor) else (lot[1], unit)
+        r = data.resource_index.get(key)
+        if r is None or quantity is None:
+            continue
+        available[r] += quantity * (factor if not np.isnan(factor) else 1.0)
+        if lot[6] is not None:
+            days_left = (lot[6] - today).days
+            bonus = EXPIRY_WEIGHT * max(0.0, 1.0 - days_left / EXPIRY_HORIZON_DAYS)
+            weight[r] = max(weight[r], 1.0 + bonus)
+    return available, weight, have
+
+
+def plan_meals(
+    user,
+    days: int = DEFAULT_DAYS,
+    max_per_cuisine: Optional[int] = DEFAULT_MAX_PER_CUISINE,
+    max_per_tag: Optional[int] = DEFAULT_MAX_PER_TAG,
+    today: Optional[date] = None,
+) -> List[PlannedMeal]:
+    """Pick up to `days` recipes for the user, best first; None disables a variety cap"""
+    data = planner_index.get()
+    n = len(data.recipe_ids)
+    if not n:
+        return []
+    today = today or timezone.localdate()
+    try:
+        policy = compile_policy_for_user(user)
+    except UserProfile.DoesNotExist:
+        policy = CompiledPolicy()
+
+    allowed = np.zeros(n, dtype=bool)
+    position = {pk: i for i, pk in enumerate(data.recipe_ids)}
+    allowed[[position[pk] for pk in filter_recipe_ids_by_policy(policy, data.recipe_ids)]] = True
+    allowed &= within_limits(data, policy.limits_by_tag_id)
+
+    available, weight, have = _pantry(data, user, today)
+    purchased = np.zeros(len(data.ingredient_ids), dtype=bool)
+    cuisine_used = np.zeros(int(data.cuisine_codes.max(initial=-1)) + 1, dtype=np.int32)
+    tag_used = np.zeros(data.tag_count, dtype=np.int32)
+    entry_ingredient = data.resource_ingredient[data.entry_resource]
+
+    meals = []
+    for _ in range(days):
+        eligible = allowed.copy()
+        if max_per_cuisine is not None and len(cuisine_used):
+            full = np.append(cuisine_used >= max_per_cuisine, False)
+            eligible &= ~full[data.cuisine_codes]
+        if max_per_tag is not None and data.tag_count:
+            full_tags = (tag_used >= max_per_tag)[data.tag_code]
+            eligible &= np.bincount(data.tag_recipe, weights=full_tags, minlength=n) == 0
+        if not eligible.any():
+            break
+
+        covered = np.minimum(data.entry_amount, available[data.entry_resource])
+        share = covered / data.entry_amount
+        buy = share < 1.0 - 1e-9
+        buy_cost = np.where(purchased[entry_ingredient], REPEAT_PURCHASE_COST, NEW_PURCHASE_COST) * buy
+        present = have[data.presence_ingredient]
+        presence_cost = np.where(purchased[data.presence_ingredient], REPEAT_PURCHASE_COST, NEW_PURCHASE_COST) * ~present
+        score = (
+            np.bincount(data.entry_recipe, weights=share * weight[data.entry_resource] - buy_cost, minlength=n)
+            + np.bincount(data.presence_recipe, weights=present - presence_cost, minlength=n)
+            + QUALITY_WEIGHT * data.quality
+        )
+        pick = int(np.argmax(np.where(eligible, score, -np.inf)))
+
+        entries = slice(data.entry_offsets[pick], data.entry_offsets[pick + 1])
+        resources = data.entry_resource[entries]
+        used = covered[entries]
+        presences = np.flatnonzero(data.presence_recipe == pick)
+        pantry = [data.ingredient_names[i] for i in data.resource_ingredient[resources[used > 0]]]
+        pantry += [data.ingredient_names[i] for i in data.presence_ingredient[presences[present[presences]]]]
+        expiring = [data.ingredient_names[data.resource_ingredient[r]] for r in resources[(used > 0) & (weight[resources] > 1)]]
+        to_buy = {int(i) for i in entry_ingredient[entries][buy[entries]]}
+        to_buy |= {int(i) for i in data.presence_ingredient[presences[~present[presences]]]}
+        meals.append(
+            PlannedMeal(
+                recipe_id=data.recipe_ids[pick],
+                title=data.titles[pick],
+                score=float(score[pick]),
+                pantry_ingredients=sorted(set(pantry)),
+                expiring_ingredients=sorted(set(expiring)),
+                to_buy=sorted(data.ingredient_names[i] for i in to_buy),
+            )
+        )
+
+        np.subtract.at(available, resources, used)
+        purchased[list(to_buy)] = True
+        allowed[pick] = False
+        if data.cuisine_codes[pick] >= 0:
+            cuisine_used[data.cuisine_codes[pick]] += 1
+        np.add.at(tag_used, data.tag_code[data.tag_recipe == pick], 1)
+    return meals
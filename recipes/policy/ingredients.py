@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Iterable, Optional
 from django.db.models.functions import Lower
 from recipes.models import Ingredient, IngredientAlias
 
@@ -12,4 +12,17 @@ def resolve_ingredient_name(name:str) -> Optional[Ingredient]:
         return alias.ingredient
     
     return Ingredient.objects.filter(name__iexact=n).first()
-    
\ No newline at end of file
+    
+
+def resolve_ingredient_names(names: Iterable[str]) -> Dict[str, object]:
+    """Ingredient ids for many names in two queries, keyed by the lowercased name; aliases win like above"""
+    wanted = {n.strip().lower() for n in names if n and n.strip()}
+    if not wanted:
+        return {}
+    resolved = dict(
+        Ingredient.objects.annotate(lname=Lower('name')).filter(lname__in=wanted).values_list('lname', 'id')
+    )
+    resolved.update(
+        IngredientAlias.objects.annotate(lname=Lower('name')).filter(lname__in=wanted).values_list('lname', 'ingredient_id')
+    )
+    return resolved
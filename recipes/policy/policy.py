@@ -1,8 +1,8 @@
 from dataclasses import dataclass, field
 from re import L
-from typing import Dict, Set, Optional
+from typing import Dict, Iterable, List, Set, Optional
 from django.db.models import Q
-from recipes.models import Tag, Ingredient, UserProfile
+from recipes.models import Tag, Ingredient, UserProfile, Recipe, RecipeIngredient
 from recipes.models.policy import DietTypeRule, RestrictionRule, DietProtocolRule
 
 @dataclass
@@ -54,5 +54,21 @@ def compile_policy_for_user(user) -> CompiledPolicy:
                 p.limits_by_tag_id[r.tag_id] = r.threshold
     return p
 
+
+def filter_recipe_ids_by_policy(policy: CompiledPolicy, recipe_ids: Iterable) -> List:
+    """Keep the recipes (in order) with no forbidden ingredient, ingredient tag or recipe tag"""
+    banned = set()
+    if policy.forbidden_ingredient_ids or policy.forbidden_tag_ids:
+        banned.update(
+            RecipeIngredient.objects.filter(
+                Q(ingredient_id__in=policy.forbidden_ingredient_ids)
+                | Q(ingredient__tags__in=policy.forbidden_tag_ids)
+            ).values_list('recipe_id', flat=True)
+        )
+    if policy.forbidden_tag_ids:
+        banned.update(
+            Recipe.tags.through.objects.filter(tag_id__in=policy.forbidden_tag_ids).values_list('recipe_id', flat=True)
+        )
+    return [recipe_id for recipe_id in recipe_ids if recipe_id not in banned]
             
     
\ No newline at end of file
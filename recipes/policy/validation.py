@@ -1,14 +1,11 @@
 from typing import List
-import re
 from recipes.models import Tag
+from recipes.measurements.parsing import parse_quantity
 from .policy import compile_policy_for_user
 from .ingredients import resolve_ingredient_name
 
-_NUM = re.compile(r"(\d+(?:\.\d+)?)")
-
 def _parse_float(s:str):
-    m = _NUM.search(s)
-    return float(m.group(1)) if m else None
+    return parse_quantity(s).amount
 
 def check_recipe_against_policy(user, recipe) -> List[str]:
     policy = compile_policy_for_user(user)
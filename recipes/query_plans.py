@@ -0,0 +1,102 @@
+"""Declarative select/prefetch plans for viewset actions.
+
+A viewset lists a QueryPlan per action in `query_plans` ("default" covers
+the rest). Lookups under `per_field` are only applied when that serializer
+field is actually rendered, so sparse responses load less.
+`missing_lookups` walks a serializer's field graph and reports relations
+that rendering would fetch lazily, which the tests use to keep plans and
+serializers in sync.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Set, Tuple
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, RelatedField
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    select_related: Tuple[str, ...] = ()
+    prefetch_related: Tuple = ()
+    per_field: Dict[str, Tuple] = field(default_factory=dict)
+
+    def apply(self, queryset, rendered_fields: Iterable[str]):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        lookups = list(self.prefetch_related)
+        for name in rendered_fields:
+            lookups.extend(self.per_field.get(name, ()))
+        return queryset.prefetch_related(*lookups) if lookups else queryset
+
+    def lookups(self) -> Set[str]:
+        """Every relation path the plan loads eagerly"""
+        paths = set(self.select_related)
+        prefetches = list(self.prefetch_related)
+        for extra in self.per_field.values():
+            prefetches.extend(extra)
+        for lookup in prefetches:
+            if isinstance(lookup, Prefetch):
+                paths.add(lookup.prefetch_to)
+                query = lookup.queryset.query if lookup.queryset is not None else None
+                if query is not None and isinstance(query.select_related, dict):
+                    paths.update(f"{lookup.prefetch_to}__{p}" for p in _flatten(query.select_related))
+            else:
+                paths.add(lookup)
+        return paths
+
+
+def _flatten(tree, prefix=""):
+    for name, children in tree.items():
+        yield prefix + name
+        yield from _flatten(children, f"{prefix}{name}__")
+
+
+def _readable(serializer):
+    return [(name, f) for name, f in serializer.fields.items() if not f.write_only]
+
+
+def required_lookups(serializer, prefix="") -> Set[str]:
+    """Relation paths rendering `serializer` touches (method fields are opaque)"""
+    required = set()
+    for _, f in _readable(serializer):
+        if f.source == "*":
+            continue
+        path = prefix + f.source.replace(".", "__")
+        if isinstance(f, serializers.ListSerializer):
+            required.add(path)
+            required |= required_lookups(f.child, path + "__")
+        elif isinstance(f, serializers.BaseSerializer):
+            required.add(path)
+            required |= required_lookups(f, path + "__")
+        elif isinstance(f, ManyRelatedField):
+            required.add(path)
+        elif isinstance(f, RelatedField) and not isinstance(f, PrimaryKeyRelatedField):
+            required.add(path)
+    return required
+
+
+def missing_lookups(serializer, plan: QueryPlan) -> Set[str]:
+    """Required relation paths not covered by the plan"""
+    loaded = plan.lookups()
+    return {
+        path for path in required_lookups(serializer)
+        if not any(l == path or l.startswith(path + "__") for l in loaded)
+    }
+
+
+class QueryPlanMixin:
+    """Apply the action's QueryPlan to `base_queryset()`"""
+
+    query_plans: Dict[str, QueryPlan] = {}
+
+    def get_query_plan(self) -> QueryPlan:
+        return self.query_plans.get(self.action) or self.query_plans.get("default", QueryPlan())
+
+    def base_queryset(self):
+        return self.queryset.all()
+
+    def get_queryset(self):
+        serializer = self.get_serializer()
+        rendered = [name for name, f in _readable(serializer)]
+        return self.get_query_plan().apply(self.base_queryset(), rendered)
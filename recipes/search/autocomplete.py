@@ -0,0 +1,127 @@
+"""In-memory ingredient autocomplete over names and aliases.
+
+Prefix lookups bisect a sorted array of normalized terms (the full name and
+every word start within it, so "oni" finds "Green Onion"). When prefixes
+yield too few results, a trigram index adds typo-tolerant matches.
+Results are weighted by how many recipes use the ingredient, and the
+serialized payloads are built with the index, so a keystroke never
+touches the database.
+"""
+
+# pylint: disable=no-member
+
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Set, Tuple
+from django.db.models import Count
+from recipes.models import Ingredient, IngredientAlias, RecipeIngredient
+from .index import VersionedIndex
+
+MIN_SIMILARITY = 0.3
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class AutocompleteData:
+    terms: List[Tuple[str, int]]            # sorted (term, name index)
+    names: List[Tuple[object, str, str]]    # (ingredient id, display name, normalized name)
+    trigram_postings: Dict[str, List[int]]  # trigram -> name indices
+    name_trigrams: List[Set[str]]
+    popularity: Dict[object, float]         # ingredient id -> 0..1
+    payloads: Dict[object, dict]
+
+
+class IngredientAutocompleteIndex(VersionedIndex):
+    version_key = "ingredient:autocomplete:version"
+
+    def build(self):
+        from recipes.serializers import IngredientSerializer
+
+        ingredients = Ingredient.objects.select_related("category", "default_unit", "fodmap_category")
+        payloads = {ingredient.pk: IngredientSerializer(ingredient).data for ingredient in ingredients}
+
+        names = [(pk, payload["name"], normalize(payload["name"])) for pk, payload in payloads.items()]
+        names += [
+            (pk, name, normalize(name))
+            for name, pk in IngredientAlias.objects.filter(ingredient__is_active=True).values_list(
+                "name", "ingredient_id"
+            )
+        ]
+
+        terms = []
+        trigram_postings = defaultdict(list)
+        name_trigrams = []
+        for i, (_, _, norm) in enumerate(names):
+            words = norm.split(" ")
+            for w in range(len(words)):
+                terms.append((" ".join(words[w:]), i))
+            grams = trigrams(norm)
+            name_trigrams.append(grams)
+            for gram in grams:
+                trigram_postings[gram].append(i)
+        terms.sort()
+
+        usage = dict(
+            RecipeIngredient.objects.values("ingredient_id").annotate(n=Count("recipe", distinct=True))
+            .values_list("ingredient_id", "n").order_by()
+        )
+        top = math.log1p(max(usage.values(), default=0)) or 1.0
+        popularity = {pk: math.log1p(n) / top for pk, n in usage.items()}
+
+        return AutocompleteData(terms, names, dict(trigram_postings), name_trigrams, popularity, payloads)
+
+    def suggest(self, text: str, limit: int = 10) -> List[dict]:
+        data = self.get()
+        query = normalize(text)
+        if not query:
+            return []
+
+        best: Dict[object, Tuple[float, str]] = {}
+
+        def offer(name_index, score):
+            pk, display, _ = data.names[name_index]
+            if pk not in data.payloads:
+                return
+            score += 0.5 * data.popularity.get(pk, 0.0)
+            if pk not in best or score > best[pk][0]:
+                best[pk] = (score, display)
+
+        start = bisect_left(data.terms, (query, -1))
+        for term, name_index in data.terms[start:]:
+            if not term.startswith(query):
+                break
+            whole_name = data.names[name_index][2]
+            # Matches at the start of the name beat matches at a later word; exact beats prefix
+            offer(name_index, 2.0 + (term == whole_name) + (term == query))
+
+        if len(best) < limit and len(query) >= 3:
+            grams = trigrams(query)
+            shared = defaultdict(int)
+            for gram in grams:
+                for name_index in data.trigram_postings.get(gram, ()):
+                    shared[name_index] += 1
+            for name_index, n in shared.items():
+                similarity = n / len(grams | data.name_trigrams[name_index])
+                if similarity >= MIN_SIMILARITY:
+                    offer(name_index, similarity)
+
+        ranked = sorted(best.items(), key=lambda item: (-item[1][0], item[1][1]))[:limit]
+        return [{**data.payloads[pk], "matched_name": display} for pk, (_, display) in ranked]
+
+
+autocomplete_index = IngredientAutocompleteIndex()
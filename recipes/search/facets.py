@@ -0,0 +1,182 @@
+"""Facet counts for recipe filters from in-memory bitmaps.
+
+Each active recipe gets a bit position. Every facet value (tag, cuisine,
+FODMAP flag, total-time bucket) keeps a Python int whose set bits are the
+recipes carrying it, so a filter is an AND/OR of ints and a count is
+`int.bit_count()`. Positions of removed recipes are cleared but never
+reused; the periodic rebuild compacts them.
+"""
+
+# pylint: disable=no-member
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from recipes.models import Ingredient, Recipe
+from .index import VersionedIndex
+
+# Upper bounds in minutes; the last bucket is open-ended
+TIME_BUCKETS = ((15, "0-15"), (30, "16-30"), (60, "31-60"), (None, "60+"))
+
+
+def time_bucket(total_time: int) -> str:
+    for limit, label in TIME_BUCKETS:
+        if limit is None or (total_time or 0) <= limit:
+            return label
+
+
+def to_bitmap(positions: Iterable[int]) -> int:
+    """Set bits at `positions`; building bytes first avoids O(n) big-int copies per bit"""
+    buf = bytearray()
+    for pos in positions:
+        byte = pos >> 3
+        if byte >= len(buf):
+            buf.extend(bytes(byte - len(buf) + 1))
+        buf[byte] |= 1 << (pos & 7)
+    return int.from_bytes(buf, "little")
+
+
+def facet_keys(values):
+    """(facet, value) pairs a recipe is counted under"""
+    cuisine, fodmap, bucket, tag_ids = values
+    keys = [("fodmap_friendly", fodmap), ("total_time", bucket)]
+    keys += [("tags", tag_id) for tag_id in tag_ids]
+    if cuisine:
+        keys.append(("cuisine", cuisine))
+    return keys
+
+
+@dataclass
+class FacetData:
+    ids: List[object] = field(default_factory=list)
+    positions: Dict[object, int] = field(default_factory=dict)
+    values: Dict[object, Tuple[str, bool, str, frozenset]] = field(default_factory=dict)
+    alive: int = 0
+    tags: Dict[object, int] = field(default_factory=lambda: defaultdict(int))
+    tag_names: Dict[object, str] = field(default_factory=dict)
+    cuisine: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    fodmap_friendly: Dict[bool, int] = field(default_factory=lambda: defaultdict(int))
+    total_time: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    def bitmap(self, recipe_ids: Iterable) -> int:
+        positions = (self.positions.get(pk) for pk in recipe_ids)
+        return to_bitmap(pos for pos in positions if pos is not None) & self.alive
+
+    def members(self, bits: int) -> list:
+        """Ids at the set positions of `bits`"""
+        raw = np.frombuffer(bits.to_bytes((bits.bit_length() + 7) // 8, "little"), dtype=np.uint8)
+        return [self.ids[pos] for pos in np.flatnonzero(np.unpackbits(raw, bitorder="little"))]
+
+    def any_tag(self, tag_ids: Iterable) -> int:
+        bits = 0
+        for tag_id in tag_ids:
+            bits |= self.tags.get(tag_id, 0)
+        return bits
+
+    def counts(self, selected: int) -> dict:
+        """Count every facet value within the `selected` bitmap"""
+
+        def count(bitmaps, label=str):
+            rows = [(label(key), (bits & selected).bit_count()) for key, bits in list(bitmaps.items())]
+            return [{"value": value, "count": n} for value, n in sorted(rows, key=lambda r: (-r[1], r[0])) if n]
+
+        tags = [
+            {"id": tag_id, "name": self.tag_names.get(tag_id, ""), "count": (bits & selected).bit_count()}
+            for tag_id, bits in list(self.tags.items())
+        ]
+        buckets = [label for _, label in TIME_BUCKETS]
+        return {
+            "count": selected.bit_count(),
+            "facets": {
+                "tags": sorted((t for t in tags if t["count"]), key=lambda t: (-t["count"], t["name"])),
+                "cuisine": count(self.cuisine),
+                "fodmap_friendly": count(self.fodmap_friendly, lambda flag: str(flag).lower()),
+                "total_time": sorted(count(self.total_time), key=lambda r: buckets.index(r["value"])),
+            },
+        }
+
+
+class RecipeFacetIndex(VersionedIndex):
+    version_key = "index:facets:version"
+
+    @staticmethod
+    def _load(recipe_ids: Optional[Set] = None):
+        recipes = Recipe.objects.all()
+        links = Recipe.tags.through.objects.filter(recipe__is_active=True, tag__is_active=True)
+        if recipe_ids is not None:
+            recipes = recipes.filter(pk__in=recipe_ids)
+            links = links.filter(recipe_id__in=recipe_ids)
+        tags = defaultdict(set)
+        names = {}
+        for recipe_id, tag_id, name in links.values_list("recipe_id", "tag_id", "tag__name"):
+            tags[recipe_id].add(tag_id)
+            names[tag_id] = name
+        rows = recipes.values_list("pk", "cuisine", "fodmap_friendly", "total_time")
+        return [
+            (pk, (cuisine or "", fodmap, time_bucket(total), frozenset(tags[pk])))
+            for pk, cuisine, fodmap, total in rows
+        ], names
+
+    @staticmethod
+    def _set(data: FacetData, pk, values, on: bool):
+        bit = 1 << data.positions[pk]
+        for facet, key in facet_keys(values):
+            bitmaps = getattr(data, facet)
+            if on:
+                bitmaps[key] |= bit
+            else:
+                bitmaps[key] &= ~bit
+                if not bitmaps[key]:
+                    del bitmaps[key]
+        data.alive = data.alive | bit if on else data.alive & ~bit
+
+    def build(self):
+        data = FacetData()
+        rows, data.tag_names = self._load()
+        members = defaultdict(list)
+        for pos, (pk, values) in enumerate(rows):
+            data.ids.append(pk)
+            data.positions[pk] = pos
+            data.values[pk] = values
+            for facet_key in facet_keys(values):
+                members[facet_key].append(pos)
+        for (facet, key), positions in members.items():
+            getattr(data, facet)[key] = to_bitmap(positions)
+        data.alive = (1 << len(rows)) - 1
+        return data
+
+    def patch(self, data, ids):
+        rows, names = self._load(set(ids))
+        data.tag_names.update(names)
+        for pk in ids:
+            if pk in data.values:
+                self._set(data, pk, data.values.pop(pk), on=False)
+        for pk, values in rows:
+            if pk not in data.positions:
+                data.positions[pk] = len(data.ids)
+                data.ids.append(pk)
+            data.values[pk] = values
+            self._set(data, pk, values, on=True)
+
+
+class IngredientTagIndex(VersionedIndex):
+    """Tag bitmaps over active ingredients, for tag expressions on the ingredient list"""
+
+    version_key = "index:ingredient-tags:version"
+
+    def build(self):
+        data = FacetData(ids=list(Ingredient.objects.values_list("pk", flat=True)))
+        data.positions = {pk: pos for pos, pk in enumerate(data.ids)}
+        members = defaultdict(list)
+        links = Ingredient.tags.through.objects.filter(ingredient__is_active=True, tag__is_active=True)
+        for ingredient_id, tag_id, name in links.values_list("ingredient_id", "tag_id", "tag__name"):
+            members[tag_id].append(data.positions[ingredient_id])
+            data.tag_names[tag_id] = name
+        data.tags.update((tag_id, to_bitmap(positions)) for tag_id, positions in members.items())
+        data.alive = (1 << len(data.ids)) - 1
+        return data
+
+
+recipe_facet_index = RecipeFacetIndex()
+ingredient_tag_index = IngredientTagIndex()
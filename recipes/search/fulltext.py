@@ -0,0 +1,196 @@
+"""Full-text recipe search over title, description, instructions and ingredient names.
+
+SQLite uses an FTS5 table (created by migration 0011) and Postgres a table
+of weighted tsvectors with a GIN index (migration 0019). Both are kept in
+sync by the signals in recipes.signals.
+"""
+
+# pylint: disable=no-member
+
+import re
+import uuid
+from dataclasses import dataclass
+from typing import Iterable, List
+from django.db import connection
+from django.db.models import Case, When, IntegerField
+from rest_framework.filters import BaseFilterBackend
+from recipes.models import Recipe, RecipeIngredient
+from .index import schedule_once
+
+FTS_TABLE = "recipes_recipe_fts"
+SEARCH_TABLE = "recipes_recipe_search"
+SEARCH_PARAM = "q"
+SEARCH_RESULT_LIMIT = 200
+# bm25 column weights: recipe_id (unindexed), title, description, instructions, ingredients
+BM25_WEIGHTS = (0.0, 10.0, 4.0, 1.0, 5.0)
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class SearchHit:
+    recipe_id: uuid.UUID
+    rank: float
+    snippet: str
+
+
+def _documents(recipe_ids):
+    ingredients = {}
+    for recipe_id, name in RecipeIngredient.objects.filter(recipe_id__in=recipe_ids).values_list(
+        "recipe_id", "ingredient__name"
+    ):
+        ingredients.setdefault(recipe_id, []).append(name)
+
+    for recipe in Recipe.objects.filter(pk__in=recipe_ids).values(
+        "id", "title", "description", "instructions"
+    ):
+        yield (
+            recipe["id"].hex,
+            recipe["title"],
+            recipe["description"] or "",
+            recipe["instructions"] or "",
+            " ".join(ingredients.get(recipe["id"], [])),
+        )
+
+
+def fts_query(text: str) -> str:
+    """Quote every token so user input can't inject FTS syntax; the last one matches as a prefix"""
+    tokens = _TOKEN.findall(text)
+    if not tokens:
+        return ""
+    quoted = [f'"{t}"' for t in tokens]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+class SqliteFtsBackend:
+    def index(self, recipe_ids: Iterable):
+        recipe_ids = list(recipe_ids)
+        if not recipe_ids:
+            return
+        self.remove(recipe_ids)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (recipe_id, title, description, instructions, ingredients) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                list(_documents(recipe_ids)),
+            )
+
+    def remove(self, recipe_ids: Iterable):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {FTS_TABLE} WHERE recipe_id = %s",
+                [(uuid.UUID(str(pk)).hex,) for pk in recipe_ids],
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        ids = list(Recipe.objects.values_list("pk", flat=True))
+        for start in range(0, len(ids), 500):
+            self.index(ids[start:start + 500])
+        return len(ids)
+
+    def search(self, text: str, limit: int = SEARCH_RESULT_LIMIT) -> List[SearchHit]:
+        query = fts_query(text)
+        if not query:
+            return []
+        weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT recipe_id, bm25({FTS_TABLE}, {weights}) AS rank, "
+                f"snippet({FTS_TABLE}, -1, '<mark>', '</mark>', '…', 12) "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s",
+                [query, limit],
+            )
+            return [SearchHit(uuid.UUID(rid), -rank, snippet) for rid, rank, snippet in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    # Title A, ingredients and description B, instructions C, as ts_rank weighs them
+    DOCUMENTS_SQL = (
+        "SELECT r.id, "
+        "setweight(to_tsvector(r.title), 'A') || "
+        "setweight(to_tsvector(coalesce(string_agg(i.name, ' '), '')), 'B') || "
+        "setweight(to_tsvector(coalesce(r.description, '')), 'B') || "
+        "setweight(to_tsvector(coalesce(r.instructions, '')), 'C') "
+        "FROM recipes_recipe r "
+        "LEFT JOIN recipes_recipeingredient ri ON ri.recipe_id = r.id AND ri.is_active "
+        "LEFT JOIN recipes_ingredient i ON i.id = ri.ingredient_id "
+        "WHERE r.is_active {where} GROUP BY r.id"
+    )
+
+    def index(self, recipe_ids: Iterable):
+        recipe_ids = [str(pk) for pk in recipe_ids]
+        if not recipe_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (recipe_id, document) "
+                + self.DOCUMENTS_SQL.format(where="AND r.id = ANY(%s::uuid[])")
+                + " ON CONFLICT (recipe_id) DO UPDATE SET document = EXCLUDED.document",
+                [recipe_ids],
+            )
+
+    def remove(self, recipe_ids: Iterable):
+        recipe_ids = [str(pk) for pk in recipe_ids]
+        if not recipe_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE recipe_id = ANY(%s::uuid[])", [recipe_ids])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE} (recipe_id, document) " + self.DOCUMENTS_SQL.format(where=""))
+            return cursor.rowcount
+
+    def search(self, text: str, limit: int = SEARCH_RESULT_LIMIT) -> List[SearchHit]:
+        # Only the matching rows are ranked; the GIN index finds them
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT s.recipe_id, ts_rank(s.document, q) AS rank, "
+                "ts_headline(coalesce(r.instructions, ''), q, 'StartSel=<mark>, StopSel=</mark>') "
+                f"FROM {SEARCH_TABLE} s JOIN recipes_recipe r ON r.id = s.recipe_id, "
+                "websearch_to_tsquery(%s) q "
+                "WHERE s.document @@ q ORDER BY rank DESC LIMIT %s",
+                [text, limit],
+            )
+            return [SearchHit(pk, rank, snippet) for pk, rank, snippet in cursor.fetchall()]
+
+
+def get_backend():
+    if connection.vendor == "postgresql":
+        return PostgresSearchBackend()
+    return SqliteFtsBackend()
+
+
+def schedule_reindex(recipe_ids: Iterable):
+    """Reindex recipes once the current transaction commits, deduplicated per transaction"""
+    schedule_once("fulltext:reindex", recipe_ids, _flush_reindex)
+
+
+def _flush_reindex(recipe_ids):
+    active = set(Recipe.objects.filter(pk__in=recipe_ids).values_list("pk", flat=True))
+    backend = get_backend()
+    backend.remove(recipe_ids - active)
+    backend.index(active)
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """Ranked ?q= search; put it last in filter_backends so relevance ordering wins"""
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(SEARCH_PARAM, "").strip()
+        if not text:
+            return queryset
+
+        hits = get_backend().search(text)
+        view.search_hits = {hit.recipe_id: hit for hit in hits}
+        if not hits:
+            return queryset.none()
+        position = Case(
+            *[When(pk=hit.recipe_id, then=i) for i, hit in enumerate(hits)],
+            output_field=IntegerField(),
+        )
+        return queryset.filter(pk__in=list(view.search_hits)).order_by(position)
@@ -0,0 +1,123 @@
+"""Base class for process-local in-memory indexes.
+
+Each process builds its own copy on first use. Writers call `invalidate()`
+after their transaction commits, which bumps a shared version counter in
+the cache; every process compares that counter with the version it built
+from and rebuilds on its next read. `max_age` bounds staleness when the
+cache is unavailable (e.g. the dummy backend in DEBUG).
+
+Indexes that implement `patch()` can call `update(ids)` instead: the writing
+process patches its own copy in place and only the other processes rebuild.
+
+`schedule_once` collects ids from many signals into one after-commit call.
+"""
+
+import logging
+import threading
+import time
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+_scheduled = threading.local()
+
+
+def schedule_once(key, ids, callback):
+    """Call callback(ids) once the current transaction commits, with the ids of every call for the same key"""
+    pending = _scheduled.__dict__.setdefault("pending", {})
+    queued = pending.get(key)
+    # A rolled back transaction drops its callbacks, so check ours is still queued
+    if queued is not None and any(entry[1] is queued[0] for entry in transaction.get_connection().run_on_commit):
+        queued[1].update(ids)
+        return
+
+    collected = set(ids)
+
+    def flush():
+        if pending.get(key, (None,))[0] is flush:
+            del pending[key]
+        callback(collected)
+
+    pending[key] = (flush, collected)
+    transaction.on_commit(flush)
+
+
+class VersionedIndex:
+    version_key = None
+    max_age = 60 * 10
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._version = None
+        self._built_at = 0.0
+
+    def build(self):
+        """Return the index data structure; called with the build lock held"""
+        raise NotImplementedError
+
+    def patch(self, data, ids):
+        """Bring the entries for `ids` in `data` up to date in place; called with the build lock held"""
+        raise NotImplementedError
+
+    def shared_version(self):
+        try:
+            cache.add(self.version_key, 1, None)
+            return cache.get(self.version_key)
+        except Exception as e:
+            logger.warning(f"Could not read index version {self.version_key}: {e}")
+            return None
+
+    def _fresh(self, version):
+        return (
+            self._data is not None
+            and self._version == version
+            and time.monotonic() - self._built_at < self.max_age
+        )
+
+    def get(self):
+        version = self.shared_version()
+        if self._fresh(version):
+            return self._data
+        with self._lock:
+            if not self._fresh(version):
+                started = time.perf_counter()
+                self._data = self.build()
+                self._version, self._built_at = version, time.monotonic()
+                logger.info(
+                    f"Built {type(self).__name__} v{version} in {(time.perf_counter() - started) * 1000:.1f} ms"
+                )
+        return self._data
+
+    def invalidate(self):
+        """Force a rebuild in every process once the current transaction commits"""
+        transaction.on_commit(self._bump)
+
+    def _bump(self):
+        self._data = None
+        try:
+            cache.add(self.version_key, 1, None)
+            cache.incr(self.version_key)
+        except Exception as e:
+            logger.warning(f"Could not bump index version {self.version_key}: {e}")
+
+    def update(self, ids):
+        """Patch the entries for `ids` once the current transaction commits, deduplicated per transaction"""
+        schedule_once((self, "update"), ids, self._flush)
+
+    def _flush(self, ids):
+        with self._lock:
+            previous = self._version
+            try:
+                cache.add(self.version_key, 1, None)
+                version = cache.incr(self.version_key)
+            except Exception as e:
+                logger.warning(f"Could not bump index version {self.version_key}: {e}")
+                version = None
+            if self._data is None or previous is None or version != previous + 1:
+                # Another process changed the index too (or the cache is down): rebuild on next read
+                self._data = None
+                return
+            self.patch(self._data, ids)
+            self._version = version
@@ -0,0 +1,86 @@
+"""Pantry matching: rank recipes by how much of their ingredient list the user already has.
+
+The index keeps, per ingredient, the sorted dense positions of the recipes
+that use it, plus each recipe's distinct ingredient count. Scoring a pantry
+touches only the posting lists of the pantry's ingredients.
+"""
+
+# pylint: disable=no-member
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from recipes.models import Recipe, RecipeIngredient
+from .index import VersionedIndex
+
+
+@dataclass
+class PantryData:
+    recipe_ids: list
+    ingredient_counts: np.ndarray
+    postings: Dict[int, np.ndarray]
+
+
+@dataclass
+class PantryMatch:
+    recipe_id: object
+    coverage: float
+    matched: int
+    missing: int
+
+
+class PantryIndex(VersionedIndex):
+    version_key = "index:pantry:version"
+
+    def build(self):
+        recipe_ids = list(Recipe.objects.order_by("pk").values_list("pk", flat=True))
+        position = {pk: i for i, pk in enumerate(recipe_ids)}
+
+        lists: Dict[int, list] = {}
+        counts = np.zeros(len(recipe_ids), dtype=np.int32)
+        pairs = (
+            RecipeIngredient.objects.filter(recipe__is_active=True)
+            .values_list("ingredient_id", "recipe_id")
+            .distinct()
+        )
+        for ingredient_id, recipe_id in pairs:
+            i = position.get(recipe_id)
+            if i is None:
+                continue
+            lists.setdefault(ingredient_id, []).append(i)
+            counts[i] += 1
+
+        postings = {ing: np.array(sorted(ids), dtype=np.int32) for ing, ids in lists.items()}
+        return PantryData(recipe_ids, counts, postings)
+
+    def match(self, ingredient_ids: Iterable, k: int = 20, max_missing: Optional[int] = None) -> List[PantryMatch]:
+        """Top-k recipes by coverage (share of the recipe's ingredients in the pantry), then fewest missing"""
+        data = self.get()
+        if not data.recipe_ids:
+            return []
+
+        hits = np.zeros(len(data.recipe_ids), dtype=np.int32)
+        for ingredient_id in set(ingredient_ids):
+            posting = data.postings.get(ingredient_id)
+            if posting is not None:
+                hits[posting] += 1
+
+        candidates = np.flatnonzero(hits)
+        if candidates.size == 0:
+            return []
+        matched = hits[candidates]
+        missing = data.ingredient_counts[candidates] - matched
+        if max_missing is not None:
+            keep = missing <= max_missing
+            candidates, matched, missing = candidates[keep], matched[keep], missing[keep]
+        coverage = matched / (matched + missing)
+
+        # lexsort uses the last key as primary: coverage desc, missing asc, matched desc
+        order = np.lexsort((-matched, missing, -coverage))[:k]
+        return [
+            PantryMatch(data.recipe_ids[candidates[i]], float(coverage[i]), int(matched[i]), int(missing[i]))
+            for i in order
+        ]
+
+
+pantry_index = PantryIndex()
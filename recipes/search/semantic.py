@@ -0,0 +1,322 @@
+"""Semantic recipe search over embedded recipe text.
+
+Each recipe becomes a short document (title, cuisine, description,
+ingredients, tags, plus descriptors such as "quick" or "gut friendly" derived
+from its fields). Documents are embedded in CPU batches by the saved Keras
+model named in SEMANTIC_SEARCH_MODEL, which `train_semantic_encoder` builds
+from the catalogue. Without a model, a feature-hashing encoder is used. It
+is lexical: it matches shared words, stems and spellings, not meaning.
+Unit-length float32 vectors go in an append-only file under
+SEMANTIC_INDEX_DIR, and every process memory-maps that file.
+
+Search is approximate via an inverted-file (IVF) index. Rows are assigned
+to the nearest of ~sqrt(n) spherical k-means centroids, and a query scores
+only the rows in its NPROBE nearest lists. Saved recipes are re-embedded
+after commit and appended; the newest row for a recipe wins. Deleted or
+soft-deleted recipes get a tombstone row, which takes them out of search.
+`build_semantic_index` re-embeds everything, retrains the centroids and
+compacts the files.
+"""
+
+# pylint: disable=no-member
+
+import fcntl
+import json
+import logging
+import os
+import threading
+import uuid
+import zlib
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+from django.conf import settings
+from recipes.models import Recipe, RecipeIngredient
+from .autocomplete import normalize, trigrams
+from .index import VersionedIndex, schedule_once
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.f32"
+ROWS_FILE = "rows.txt"
+CENTROIDS_FILE = "centroids.npy"
+META_FILE = "meta.json"
+
+ENCODE_BATCH_SIZE = 64
+HASH_DIM = 256
+NPROBE = 8
+IVF_MIN_ROWS = 1000
+KMEANS_ITERATIONS = 10
+QUICK_MINUTES = 30
+# IVF list id of a tombstone row: a zero vector marking its recipe as removed
+TOMBSTONE = -2
+
+
+def recipe_documents(recipe_ids: Optional[Iterable] = None) -> Tuple[List, List[str]]:
+    """(ids, texts) for active recipes, in three queries"""
+    recipes = Recipe.objects.all()
+    ingredients = RecipeIngredient.objects.filter(recipe__is_active=True)
+    tags = Recipe.tags.through.objects.filter(recipe__is_active=True, tag__is_active=True)
+    if recipe_ids is not None:
+        recipe_ids = list(recipe_ids)
+        recipes = recipes.filter(pk__in=recipe_ids)
+        ingredients = ingredients.filter(recipe_id__in=recipe_ids)
+        tags = tags.filter(recipe_id__in=recipe_ids)
+
+    ingredient_names = defaultdict(list)
+    for recipe_id, name in ingredients.values_list("recipe_id", "ingredient__name"):
+        ingredient_names[recipe_id].append(name)
+    tag_names = defaultdict(list)
+    for recipe_id, name in tags.values_list("recipe_id", "tag__name"):
+        tag_names[recipe_id].append(name)
+
+    ids, texts = [], []
+    fields = ("pk", "title", "cuisine", "description", "total_time", "fodmap_friendly")
+    for pk, title, cuisine, description, total_time, fodmap_friendly in recipes.values_list(*fields):
+        descriptors = []
+        if total_time and total_time <= QUICK_MINUTES:
+            descriptors.append("quick easy weeknight")
+        if fodmap_friendly:
+            descriptors.append("low fodmap gut friendly")
+        parts = [
+            title,
+            cuisine,
+            description,
+            "ingredients " + ", ".join(ingredient_names[pk]),
+            " ".join(tag_names[pk]),
+            " ".join(descriptors),
+        ]
+        ids.append(pk)
+        texts.append(". ".join(part for part in parts if part))
+    return ids, texts
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.where(norms > 0, norms, 1)).astype(np.float32)
+
+
+def _stem(word: str) -> str:
+    if word.endswith("oes"):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+class HashingEncoder:
+    """Signed feature hashing of words, word bigrams and character trigrams; needs no model"""
+
+    dim = HASH_DIM
+    name = f"hashing-{HASH_DIM}"
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = [_stem(word) for word in normalize(text).split()]
+            features = [(word, 1.0) for word in words]
+            features += [(f"{a} {b}", 0.5) for a, b in zip(words, words[1:])]
+            features += [(f"#{gram}", 0.2) for word in words for gram in trigrams(word)]
+            for feature, weight in features:
+                h = zlib.crc32(feature.encode())
+                vectors[row, h % self.dim] += weight if h & 0x80000000 else -weight
+        return _unit(vectors)
+
+
+class KerasEncoder:
+    """A saved Keras model mapping a batch of raw strings to embeddings"""
+
+    def __init__(self, path):
+        import keras  # Only needed when SEMANTIC_SEARCH_MODEL is set
+
+        self.model = keras.saving.load_model(path)
+        self.dim = int(self.model.output_shape[-1])
+        self.name = f"keras:{Path(path).name}:{self.dim}"
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.predict(np.array(texts, dtype=object), batch_size=ENCODE_BATCH_SIZE, verbose=0)
+        return _unit(np.asarray(vectors, dtype=np.float32))
+
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def get_encoder():
+    global _encoder
+    with _encoder_lock:
+        path = settings.SEMANTIC_SEARCH_MODEL
+        if _encoder is None or getattr(_encoder, "path", None) != path:
+            encoder = None
+            if path:
+                try:
+                    encoder = KerasEncoder(path)
+                except Exception as e:
+                    logger.warning(f"Could not load semantic search model {path}; using the hashing encoder: {e}")
+            _encoder = encoder or HashingEncoder()
+            _encoder.path = path
+        return _encoder
+
+
+def nearest_lists(vectors: np.ndarray, centroids: np.ndarray, chunk: int = 8192) -> np.ndarray:
+    return np.concatenate(
+        [np.argmax(vectors[i:i + chunk] @ centroids.T, axis=1) for i in range(0, len(vectors), chunk)]
+        or [np.zeros(0, dtype=np.int64)]
+    )
+
+
+def train_centroids(vectors: np.ndarray, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """Spherical k-means with ~sqrt(n) lists"""
+    n_lists = max(1, int(np.sqrt(len(vectors))))
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = nearest_lists(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        empty = ~sums.any(axis=1)
+        sums[empty] = centroids[empty]
+        centroids = _unit(sums)
+    return centroids
+
+
+def ivf_centroids(vectors: np.ndarray) -> Optional[np.ndarray]:
+    """Centroids for the IVF lists, or None when exact search is cheap enough"""
+    return train_centroids(vectors) if len(vectors) >= IVF_MIN_ROWS else None
+
+
+@dataclass
+class SemanticData:
+    encoder: str
+    vectors: np.ndarray  # (rows, dim) float32, memory-mapped
+    row_ids: List[object]
+    lists: np.ndarray  # IVF list per row; -1 without centroids
+    live: np.ndarray  # newest row per recipe
+    centroids: Optional[np.ndarray]
+
+
+class SemanticIndex(VersionedIndex):
+    version_key = "index:semantic:version"
+
+    @property
+    def directory(self) -> Path:
+        return Path(settings.SEMANTIC_INDEX_DIR)
+
+    def exists(self) -> bool:
+        return (self.directory / META_FILE).exists()
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self.directory / ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def build(self):
+        if not self.exists():
+            return None
+        meta = json.loads((self.directory / META_FILE).read_text())
+        dim = meta["dim"]
+        row_ids, lists = [], []
+        with open(self.directory / ROWS_FILE) as rows:
+            for line in rows:
+                pk, list_id = line.split()
+                row_ids.append(uuid.UUID(pk))
+                lists.append(int(list_id))
+        # A writer may be between appending the vector and its row line
+        n = min(len(row_ids), os.path.getsize(self.directory / VECTORS_FILE) // (4 * dim))
+        vectors = (
+            np.memmap(self.directory / VECTORS_FILE, dtype=np.float32, mode="r", shape=(n, dim))
+            if n else np.zeros((0, dim), dtype=np.float32)
+        )
+        lists = np.array(lists[:n], dtype=np.int64)
+        live = np.zeros(n, dtype=bool)
+        live[list({pk: row for row, pk in enumerate(row_ids[:n])}.values())] = True
+        live &= lists != TOMBSTONE
+        centroids_path = self.directory / CENTROIDS_FILE
+        centroids = np.load(centroids_path) if centroids_path.exists() else None
+        return SemanticData(meta["encoder"], vectors, row_ids[:n], lists, live, centroids)
+
+    def write(self, recipe_ids: List, vectors: np.ndarray, centroids: Optional[np.ndarray], encoder_name: str):
+        """Replace the index files with a freshly embedded set"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        lists = nearest_lists(vectors, centroids) if centroids is not None else np.full(len(vectors), -1)
+        with self._file_lock():
+            self._replace(VECTORS_FILE, lambda f: f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes()))
+            self._replace(ROWS_FILE, lambda f: f.write("".join(f"{pk} {l}\n" for pk, l in zip(recipe_ids, lists))))
+            if centroids is not None:
+                self._replace(CENTROIDS_FILE, lambda f: np.save(f, centroids.astype(np.float32)))
+            else:
+                (self.directory / CENTROIDS_FILE).unlink(missing_ok=True)
+            self._replace(META_FILE, lambda f: f.write(json.dumps({"encoder": encoder_name, "dim": vectors.shape[1]})))
+        self._bump()
+
+    def _replace(self, name, write):
+        tmp = self.directory / f"{name}.tmp"
+        with open(tmp, "w" if name.endswith((".txt", ".json")) else "wb") as f:
+            write(f)
+        os.replace(tmp, self.directory / name)
+
+    def append(self, recipe_ids: Iterable):
+        """Embed and append the given recipes, and tombstone those no longer active; a no-op until built"""
+        if not self.exists():
+            return
+        recipe_ids = set(recipe_ids)
+        if not recipe_ids:
+            return
+        ids, texts = recipe_documents(recipe_ids)
+        removed = list(recipe_ids - set(ids))
+        encoder = get_encoder()
+        vectors = encoder.encode(texts) if ids else np.zeros((0, encoder.dim), dtype=np.float32)
+        with self._file_lock():
+            meta = json.loads((self.directory / META_FILE).read_text())
+            if meta["encoder"] != encoder.name:
+                logger.warning(f"Semantic index was built with {meta['encoder']}; run build_semantic_index")
+                return
+            centroids_path = self.directory / CENTROIDS_FILE
+            lists = nearest_lists(vectors, np.load(centroids_path)) if centroids_path.exists() else [-1] * len(ids)
+            vectors = np.concatenate([vectors, np.zeros((len(removed), vectors.shape[1]), dtype=np.float32)])
+            ids, lists = ids + removed, list(lists) + [TOMBSTONE] * len(removed)
+            with open(self.directory / VECTORS_FILE, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self.directory / ROWS_FILE, "a") as f:
+                f.write("".join(f"{pk} {l}\n" for pk, l in zip(ids, lists)))
+        self._bump()
+
+    def schedule_append(self, recipe_ids: Iterable):
+        """Re-embed recipes once the current transaction commits, deduplicated per transaction"""
+        schedule_once((self, "append"), recipe_ids, self._flush_append)
+
+    def _flush_append(self, recipe_ids):
+        try:
+            self.append(recipe_ids)
+        except Exception as e:
+            logger.warning(f"Could not append recipes to the semantic index: {e}")
+
+    def search(self, text: str, k: int = 10, nprobe: int = NPROBE) -> List[Tuple[object, float]]:
+        """(recipe id, cosine score) pairs, best first; empty until the index is built"""
+        data = self.get()
+        if data is None or not len(data.vectors):
+            return []
+        encoder = get_encoder()
+        if encoder.name != data.encoder:
+            logger.warning(f"Semantic index was built with {data.encoder}; run build_semantic_index")
+            return []
+        query = encoder.encode([text])[0]
+        candidates = data.live
+        if data.centroids is not None:
+            probes = np.argsort(-(data.centroids @ query))[:nprobe]
+            candidates = candidates & np.isin(data.lists, probes)
+        rows = np.flatnonzero(candidates)
+        scores = data.vectors[rows] @ query
+        best = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(data.row_ids[rows[i]], float(scores[i])) for i in best if scores[i] > 0]
+
+
+semantic_index = SemanticIndex()
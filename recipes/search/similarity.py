@@ -0,0 +1,124 @@
+"""Sparse recipe feature vectors and batched cosine top-k neighbors.
+
+Each active recipe is a row over ingredient, tag and cuisine features.
+Features are IDF weighted, so a shared saffron counts for more than a
+shared salt, scaled per kind, and each row is L2-normalised so that dot
+products are cosines. Rows are kept in CSR form for reading a recipe's
+features and in CSC form for the products: a batch of recipes is scored
+against every recipe with a single `np.bincount` over the matching
+column entries.
+"""
+
+# pylint: disable=no-member
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Tuple
+import numpy as np
+from recipes.models import Recipe, RecipeIngredient
+
+INGREDIENT_WEIGHT = 1.0
+TAG_WEIGHT = 0.5
+CUISINE_WEIGHT = 0.75
+# Dense score cells per batch (rows x recipes); 4M float64 cells is 32 MB
+MAX_BATCH_CELLS = 4_000_000
+
+
+@dataclass
+class RecipeVectors:
+    ids: List[object]
+    positions: Dict[object, int]
+    indptr: np.ndarray
+    indices: np.ndarray
+    data: np.ndarray
+    col_indptr: np.ndarray
+    col_rows: np.ndarray
+    col_data: np.ndarray
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+
+def _compress(major: np.ndarray, minor: np.ndarray, values: np.ndarray, n: int):
+    order = np.lexsort((minor, major))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(major, minlength=n), out=indptr[1:])
+    return indptr, minor[order], values[order]
+
+
+def load_vectors() -> RecipeVectors:
+    recipes = list(Recipe.objects.values_list("pk", "cuisine"))
+    ids = [pk for pk, _ in recipes]
+    positions = {pk: pos for pos, pk in enumerate(ids)}
+
+    pairs = [(positions[pk], ("cuisine", cuisine.strip().lower())) for pk, cuisine in recipes if (cuisine or "").strip()]
+    pairs += [
+        (positions[recipe_id], ("ingredient", ingredient_id))
+        for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+            recipe__is_active=True, ingredient__is_active=True
+        ).values_list("recipe_id", "ingredient_id").distinct()
+    ]
+    pairs += [
+        (positions[recipe_id], ("tag", tag_id))
+        for recipe_id, tag_id in Recipe.tags.through.objects.filter(
+            recipe__is_active=True, tag__is_active=True
+        ).values_list("recipe_id", "tag_id")
+    ]
+
+    columns = {}
+    rows = np.fromiter((row for row, _ in pairs), dtype=np.int64, count=len(pairs))
+    cols = np.fromiter((columns.setdefault(feature, len(columns)) for _, feature in pairs), dtype=np.int64, count=len(pairs))
+    kind_weight = {"ingredient": INGREDIENT_WEIGHT, "tag": TAG_WEIGHT, "cuisine": CUISINE_WEIGHT}
+    col_weight = np.array([kind_weight[kind] for kind, _ in columns], dtype=np.float64)
+
+    n = len(ids)
+    df = np.bincount(cols, minlength=len(columns))
+    idf = np.log((1 + n) / (1 + df)) + 1
+    values = col_weight[cols] * idf[cols]
+    norms = np.sqrt(np.bincount(rows, weights=values ** 2, minlength=n))
+    values = values / np.where(norms > 0, norms, 1)[rows]
+
+    indptr, indices, data = _compress(rows, cols, values, n)
+    col_indptr, col_rows, col_data = _compress(cols, rows, values, len(columns))
+    return RecipeVectors(ids, positions, indptr, indices, data, col_indptr, col_rows, col_data)
+
+
+def _ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Concatenated aranges [starts[i], starts[i] + lengths[i])"""
+    offsets = np.cumsum(lengths) - lengths
+    return np.arange(lengths.sum()) - np.repeat(offsets, lengths) + np.repeat(starts, lengths)
+
+
+def score_batches(vectors: RecipeVectors, rows: Iterable[int]) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Yield (row positions, dense cosine scores against every recipe) in memory-bounded batches"""
+    rows = np.asarray(list(rows), dtype=np.int64)
+    n = vectors.size
+    batch_size = max(1, MAX_BATCH_CELLS // max(n, 1))
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        # Query features: (batch row, column, weight)
+        lengths = vectors.indptr[batch + 1] - vectors.indptr[batch]
+        entries = _ranges(vectors.indptr[batch], lengths)
+        q_batch = np.repeat(np.arange(len(batch)), lengths)
+        q_cols, q_weights = vectors.indices[entries], vectors.data[entries]
+        # Every recipe carrying each query feature
+        col_lengths = vectors.col_indptr[q_cols + 1] - vectors.col_indptr[q_cols]
+        members = _ranges(vectors.col_indptr[q_cols], col_lengths)
+        keys = np.repeat(q_batch, col_lengths) * n + vectors.col_rows[members]
+        weights = np.repeat(q_weights, col_lengths) * vectors.col_data[members]
+        scores = np.bincount(keys, weights=weights, minlength=len(batch) * n).reshape(len(batch), n)
+        scores[np.arange(len(batch)), batch] = 0.0
+        yield batch, scores
+
+
+def top_k(scores: np.ndarray, k: int) -> List[List[Tuple[int, float]]]:
+    """Best k positive (position, score) pairs per row of `scores`, best first"""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return [[] for _ in range(len(scores))]
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    result = []
+    for row, cols in zip(scores, candidates):
+        cols = cols[np.lexsort((cols, -row[cols]))]
+        result.append([(int(col), float(row[col])) for col in cols if row[col] > 0])
+    return result
@@ -0,0 +1,131 @@
+"""Search-as-you-type over recipe titles and cuisines.
+
+Every word of a title or cuisine contributes its edge n-grams ("p", "pa",
+"pad", ... up to MAX_GRAM characters) to a posting list kept sorted by
+recipe score, so the top suggestions for a single prefix are a slice.
+Multi-word queries walk the shortest posting list in score order and keep
+the recipes whose words cover every query token.
+
+Recipe saves and changes to their rating and favorite counters (see
+recipes.aggregates) are applied with `update()`, patching this process's
+copy in place.
+"""
+
+# pylint: disable=no-member
+
+import math
+from bisect import bisect_left, insort
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from recipes.models import Recipe
+from .autocomplete import normalize
+from .index import VersionedIndex
+
+MAX_GRAM = 12
+SCAN_LIMIT = 5000
+# Shrinks averages from few ratings toward PRIOR_MEAN (a Bayesian average)
+PRIOR_MEAN = 3.0
+PRIOR_COUNT = 5
+FIELDS = ("pk", "title", "cuisine", "rating_sum", "rating_count", "favorites_count")
+
+
+def recipe_score(rating_sum: int, rating_count: int, favorites_count: int) -> float:
+    bayesian = (rating_sum + PRIOR_MEAN * PRIOR_COUNT) / (rating_count + PRIOR_COUNT)
+    return bayesian + 0.1 * math.log1p(favorites_count)
+
+
+def edge_grams(words) -> set:
+    return {word[:n] for word in words for n in range(1, min(len(word), MAX_GRAM) + 1)}
+
+
+@dataclass
+class SuggestEntry:
+    title: str
+    cuisine: str
+    words: Tuple[str, ...]
+    score: float
+    average_rating: Optional[float]
+
+    def sort_key(self, pk):
+        return (-self.score, self.title.lower(), pk)
+
+
+@dataclass
+class SuggestData:
+    entries: Dict[object, SuggestEntry]
+    postings: Dict[str, List[Tuple[float, str, object]]]  # gram -> sorted (-score, title, recipe id)
+
+
+class TitleSuggestIndex(VersionedIndex):
+    version_key = "index:suggest:version"
+
+    @staticmethod
+    def _entry(row) -> SuggestEntry:
+        pk, title, cuisine, rating_sum, rating_count, favorites_count = row
+        words = tuple(normalize(f"{title} {cuisine or ''}").split())
+        return SuggestEntry(
+            title=title,
+            cuisine=cuisine or "",
+            words=words,
+            score=recipe_score(rating_sum, rating_count, favorites_count),
+            average_rating=rating_sum / rating_count if rating_count else None,
+        )
+
+    def build(self):
+        entries = {row[0]: self._entry(row) for row in Recipe.objects.values_list(*FIELDS).iterator()}
+        postings = defaultdict(list)
+        for pk, entry in entries.items():
+            for gram in edge_grams(entry.words):
+                postings[gram].append(entry.sort_key(pk))
+        for posting in postings.values():
+            posting.sort()
+        return SuggestData(entries, dict(postings))
+
+    def _remove(self, data, pk):
+        entry = data.entries.pop(pk, None)
+        if entry is None:
+            return
+        key = entry.sort_key(pk)
+        for gram in edge_grams(entry.words):
+            posting = data.postings[gram]
+            i = bisect_left(posting, key)
+            if i < len(posting) and posting[i] == key:
+                del posting[i]
+
+    def _add(self, data, row):
+        entry = self._entry(row)
+        data.entries[row[0]] = entry
+        for gram in edge_grams(entry.words):
+            insort(data.postings.setdefault(gram, []), entry.sort_key(row[0]))
+
+    def patch(self, data, ids):
+        rows = Recipe.objects.filter(pk__in=ids).values_list(*FIELDS)
+        for pk in ids:
+            self._remove(data, pk)
+        for row in rows:
+            self._add(data, row)
+
+    def suggest(self, text: str, limit: int = 10) -> List[dict]:
+        data = self.get()
+        tokens = normalize(text).split()
+        if not tokens:
+            return []
+        lists = [data.postings.get(token[:MAX_GRAM], []) for token in tokens]
+        shortest = min(lists, key=len)
+
+        results = []
+        for *_, pk in shortest[:SCAN_LIMIT]:
+            entry = data.entries[pk]
+            if len(tokens) > 1 or len(tokens[0]) > MAX_GRAM:
+                if not all(any(word.startswith(token) for word in entry.words) for token in tokens):
+                    continue
+            results.append(
+                {"id": pk, "title": entry.title, "cuisine": entry.cuisine, "average_rating": entry.average_rating}
+            )
+            if len(results) == limit:
+                break
+        return results
+
+
+title_suggest_index = TitleSuggestIndex()
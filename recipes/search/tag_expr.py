@@ -0,0 +1,134 @@
+"""Boolean tag expressions evaluated against tag bitmaps.
+
+    ?tag_expr=vegan AND (quick OR "one pot") AND NOT spicy
+
+Tags are matched by name, case-insensitively; quote names containing
+spaces or keywords. NOT binds tighter than AND, which binds tighter than
+OR, and adjacent terms are ANDed. An unknown tag matches nothing. The
+whole predicate is set algebra on Python ints, followed by a single
+`pk__in` lookup.
+"""
+
+import re
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+TAG_EXPR_PARAM = "tag_expr"
+MAX_EXPRESSION_LENGTH = 500
+# Parentheses and NOTs nested deeper than this are rejected before they exhaust the stack
+MAX_NESTING_DEPTH = 32
+_TOKEN = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+KEYWORDS = {"AND", "OR", "NOT"}
+
+
+class TagExpressionError(ValueError):
+    pass
+
+
+def tokenize(text):
+    tokens, pos = [], 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match:
+            raise TagExpressionError(f"Unexpected character at position {pos}")
+        lparen, rparen, quoted, word = match.groups()
+        if lparen or rparen:
+            tokens.append((lparen or rparen, None))
+        elif quoted is not None:
+            tokens.append(("TAG", quoted))
+        elif word.upper() in KEYWORDS:
+            tokens.append((word.upper(), None))
+        else:
+            tokens.append(("TAG", word))
+        pos = match.end()
+    return tokens
+
+
+def parse(text):
+    """Parse into nested ("and"|"or", left, right), ("not", operand) and ("tag", name) tuples"""
+    if len(text) > MAX_EXPRESSION_LENGTH:
+        raise TagExpressionError(f"Expression is longer than {MAX_EXPRESSION_LENGTH} characters")
+    tokens = tokenize(text)
+    if not tokens:
+        raise TagExpressionError("Expression is empty")
+    pos = depth = 0
+
+    def peek():
+        return tokens[pos][0] if pos < len(tokens) else None
+
+    def take(kind):
+        nonlocal pos
+        if peek() != kind:
+            found = peek() or "end of expression"
+            raise TagExpressionError(f"Expected {kind} but found {found}")
+        pos += 1
+        return tokens[pos - 1][1]
+
+    def parse_or():
+        node = parse_and()
+        while peek() == "OR":
+            take("OR")
+            node = ("or", node, parse_and())
+        return node
+
+    def parse_and():
+        node = parse_not()
+        while peek() in ("AND", "NOT", "TAG", "("):
+            if peek() == "AND":
+                take("AND")
+            node = ("and", node, parse_not())
+        return node
+
+    def parse_not():
+        nonlocal depth
+        if peek() not in ("NOT", "("):
+            return ("tag", take("TAG"))
+        depth += 1
+        if depth > MAX_NESTING_DEPTH:
+            raise TagExpressionError(f"Expression is nested deeper than {MAX_NESTING_DEPTH} levels")
+        if peek() == "NOT":
+            take("NOT")
+            node = ("not", parse_not())
+        else:
+            take("(")
+            node = parse_or()
+            take(")")
+        depth -= 1
+        return node
+
+    node = parse_or()
+    if pos != len(tokens):
+        raise TagExpressionError(f"Unexpected {peek()} after expression")
+    return node
+
+
+def evaluate(node, data) -> int:
+    """Bitmap of the rows in `data` (a FacetData) matching the parsed expression"""
+    by_name = {name.lower(): tag_id for tag_id, name in data.tag_names.items()}
+
+    def walk(node):
+        op = node[0]
+        if op == "tag":
+            return data.tags.get(by_name.get(node[1].lower()), 0)
+        if op == "not":
+            return data.alive & ~walk(node[1])
+        left, right = walk(node[1]), walk(node[2])
+        return left & right if op == "and" else left | right
+
+    return walk(node) & data.alive
+
+
+class TagExpressionFilter(BaseFilterBackend):
+    """?tag_expr= filtering against the view's `tag_index` (a VersionedIndex of FacetData)"""
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(TAG_EXPR_PARAM, "").strip()
+        if not text:
+            return queryset
+        try:
+            node = parse(text)
+        except TagExpressionError as e:
+            raise ValidationError({TAG_EXPR_PARAM: str(e)})
+        data = view.tag_index.get()
+        return queryset.filter(pk__in=data.members(evaluate(node, data)))
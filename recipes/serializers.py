@@ -1,6 +1,7 @@
 # pylint: disable=no-member
 
 from django.contrib.auth.models import User
+from django.db.models import Prefetch
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
 from .models import (
@@ -19,6 +20,9 @@ from .models import (
     RecipePreference,
     FoodPreference,
     Unit,
+    ShoppingList,
+    ShoppingListItem,
+    IngestionJob,
 )
 
 
@@ -84,6 +88,41 @@ class RegisterSerializer(serializers.Serializer):
         return value
 
 
+def _csv_query_param(request, name):
+    return {part.strip() for part in request.query_params.get(name, "").split(",") if part.strip()}
+
+
+class SparseFieldsMixin:
+    """Let the top-level serializer of a request trim its output with ?fields=a,b
+    and add any names listed in Meta.expandable_fields with ?expand=c,d.
+    Write-only fields are always kept.
+    """
+
+    def _is_request_root(self):
+        parent = self.parent
+        return parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+
+    def get_field_names(self, declared_fields, info):
+        names = list(super().get_field_names(declared_fields, info))
+        request = self.context.get("request")
+        if request is None or not self._is_request_root():
+            return names
+
+        expand = _csv_query_param(request, "expand")
+        names += [
+            name for name in getattr(self.Meta, "expandable_fields", ())
+            if name in expand and name not in names
+        ]
+
+        only = _csv_query_param(request, "fields")
+        if only:
+            names = [
+                name for name in names
+                if name in only or getattr(declared_fields.get(name), "write_only", False)
+            ]
+        return names
+
+
 class FodmapCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = FodmapCategory
@@ -93,7 +132,7 @@ class FodmapCategorySerializer(serializers.ModelSerializer):
 class UnitSerializer(serializers.ModelSerializer):
     class Meta:
         model = Unit
-        fields = ["id", "name", "unit_type"]
+        fields = ["id", "name", "unit_type", "to_base_factor"]
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -116,6 +155,8 @@ class IngredientSerializer(serializers.ModelSerializer):
             "default_unit",
             "fodmap_category",
             "nutritional_info",
+            "density",
+            "piece_weight",
         ]
 
 
@@ -134,7 +175,7 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "description"]
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     ingredients_detail = RecipeIngredientSerializer(
         source="recipeingredient_set", many=True, read_only=True
     )
@@ -149,6 +190,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     ingredients_data = serializers.ListField(
         child=serializers.DictField(), write_only=True, required=False
     )
+    average_rating = serializers.FloatField(read_only=True)
     
     def validate_title(self, value):
         if len(value) < 1:
@@ -174,10 +216,13 @@ class RecipeSerializer(serializers.ModelSerializer):
             "fodmap_friendly",
             "fodmap_notes",
             "image",
+            "average_rating",
+            "rating_count",
+            "favorites_count",
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["created_at", "updated_at"]
+        read_only_fields = ["rating_count", "favorites_count", "created_at", "updated_at"]
 
     def create(self, validated_data):
         ingredients_data = validated_data.pop("ingredients_data", [])
@@ -215,7 +260,7 @@ class RecipeSerializer(serializers.ModelSerializer):
             instance.tags.set(tags)
 
         if ingredients_data is not None:
-            instance.recipe_ingredients.all().delete()
+            instance.recipeingredient_set.all().delete()
             for ingredient_data in ingredients_data:
                 ingredient_name = ingredient_data.get("ingredient_name")
                 quantity = ingredient_data.get("quantity")
@@ -251,6 +296,47 @@ class RecipeSerializer(serializers.ModelSerializer):
         return value
 
 
+class RecipeListSerializer(RecipeSerializer):
+    """Compact recipe rows for list endpoints; any RecipeSerializer field can be added with ?expand="""
+
+    tags = serializers.SlugRelatedField(slug_field="name", many=True, read_only=True)
+    thumbnail = serializers.ImageField(source="image", read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = [
+            "id",
+            "title",
+            "prep_time",
+            "cook_time",
+            "total_time",
+            "cuisine",
+            "tags",
+            "fodmap_friendly",
+            "thumbnail",
+        ]
+        expandable_fields = [
+            "description",
+            "ingredients_detail",
+            "instructions",
+            "servings",
+            "fodmap_notes",
+            "image",
+            "average_rating",
+            "rating_count",
+            "favorites_count",
+            "created_at",
+            "updated_at",
+        ]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        hits = self.context.get("search_hits")
+        if hits is not None and instance.pk in hits:
+            data["search_rank"] = hits[instance.pk].rank
+            data["snippet"] = hits[instance.pk].snippet
+        return data
+
+
 class DietTypeSerializer(serializers.ModelSerializer):
     class Meta:
         model = DietType
@@ -297,8 +383,24 @@ class UserProfileSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["user", "created_at", "updated_at"]
 
+    @staticmethod
+    def eager_loading(queryset, profile_path="", user_path="user__"):
+        """Load everything needed to render the profiles at `profile_path` in a fixed number of queries"""
+        return queryset.select_related(user_path.rstrip("_")).prefetch_related(
+            f"{profile_path}diet_types",
+            f"{profile_path}dietary_restrictions",
+            Prefetch(
+                f"{user_path}food_preferences",
+                queryset=FoodPreference.objects.select_related(
+                    "ingredient__category",
+                    "ingredient__default_unit",
+                    "ingredient__fodmap_category",
+                ),
+            ),
+        )
+
     def get_food_preferences(self, obj):
-        preferences = FoodPreference.objects.filter(user=obj.user)
+        preferences = obj.user.food_preferences.all()
         return FoodPreferenceSerializer(preferences, many=True).data
 
 
@@ -318,9 +420,15 @@ class FeedbackSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["created_at"]
 
+    @staticmethod
+    def eager_loading(queryset):
+        return UserProfileSerializer.eager_loading(
+            queryset.select_related("user__profile"), profile_path="user__profile__", user_path="user__"
+        )
+
     def get_user_profile(self, obj):
         try:
-            return UserProfileSerializer(obj.user.profile).data
+            return UserProfileSerializer(obj.user.profile, context=self.context).data
         except UserProfile.DoesNotExist:
             return None
 
@@ -350,6 +458,82 @@ class InventorySerializer(serializers.ModelSerializer):
         fields = ["id", "user", "ingredient", "quantity", "unit"]
 
 
+class ShoppingListItemSerializer(serializers.ModelSerializer):
+    ingredient_name = serializers.CharField(source="ingredient.name", read_only=True)
+    removed = serializers.SerializerMethodField()
+
+    def get_removed(self, obj):
+        return not obj.is_active
+
+    class Meta:
+        model = ShoppingListItem
+        fields = [
+            "id",
+            "ingredient",
+            "ingredient_name",
+            "unit",
+            "quantity",
+            "total_quantity",
+            "to_buy",
+            "inventory_quantity",
+            "unconverted",
+            "recipes",
+            "checked",
+            "version",
+            "removed",
+        ]
+        read_only_fields = fields
+
+
+class ShoppingListSerializer(serializers.ModelSerializer):
+    items = ShoppingListItemSerializer(many=True, read_only=True)
+    recipe_ids = serializers.PrimaryKeyRelatedField(
+        queryset=Recipe.objects.all(), source="recipes", many=True, required=False
+    )
+
+    class Meta:
+        model = ShoppingList
+        fields = ["id", "name", "recipe_ids", "version", "items", "created_at", "updated_at"]
+        read_only_fields = ["version", "created_at", "updated_at"]
+
+    @staticmethod
+    def eager_loading(queryset):
+        return queryset.prefetch_related(
+            "recipes",
+            Prefetch("items", queryset=ShoppingListItem.objects.select_related("ingredient").order_by("ingredient__name")),
+        )
+
+
+class ShoppingListRecipesSerializer(serializers.Serializer):
+    recipe_ids = serializers.PrimaryKeyRelatedField(queryset=Recipe.objects.all(), many=True, allow_empty=False)
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """recipe_ids for an unsaved shopping list; checked up front because the response is streamed"""
+
+    recipe_ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+
+
+class ShoppingListCheckSerializer(serializers.Serializer):
+    item_ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+    checked = serializers.BooleanField(default=True)
+
+
+class IngestionJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = IngestionJob
+        fields = [
+            "id", "kind", "status", "total", "processed", "progress", "result", "error",
+            "created_at", "updated_at", "finished_at",
+        ]
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        return round(obj.processed / obj.total, 2) if obj.total else 0.0
+
+
 class FoodPreferenceSerializer(serializers.ModelSerializer):
     ingredient = IngredientSerializer(read_only=True)
     ingredient_id = serializers.PrimaryKeyRelatedField(
@@ -363,7 +547,7 @@ class FoodPreferenceSerializer(serializers.ModelSerializer):
 
 
 class RecipePreferenceSerializer(serializers.ModelSerializer):
-    recipe = RecipeSerializer(read_only=True)
+    recipe = RecipeListSerializer(read_only=True)
     recipe_id = serializers.PrimaryKeyRelatedField(
         queryset=Recipe.objects.all(), source="recipe", write_only=True
     )
@@ -1,9 +1,204 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save, pre_save, post_delete, m2m_changed
+from django.db import transaction
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+from .models import UserProfile, Feedback, RecipePreference, Recipe, RecipeIngredient, Ingredient, IngredientAlias, Tag, Unit
+from . import aggregates
+from .cache_utils import CacheTagManager
+from .measurements.units import configured_factor, parsed_quantity_fields
+from .measurements.conversion import conversion_index
+from .search import fulltext
+from .search.pantry import pantry_index
+from .search.autocomplete import autocomplete_index
+from .search.suggest import title_suggest_index
+from .search.facets import recipe_facet_index, ingredient_tag_index
+from .search.index import schedule_once
+from .search.semantic import semantic_index
+from .planning.planner import planner_index
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
-        UserProfile.objects.create(user=instance)
\ No newline at end of file
+        UserProfile.objects.create(user=instance)
+
+def invalidate_recipe_details(recipe_ids):
+    """Drop the cached detail responses of the recipes once the write commits"""
+    schedule_once("recipe:detail", recipe_ids, _drop_recipe_details)
+
+
+def _drop_recipe_details(recipe_ids):
+    CacheTagManager.invalidate_tags([f"recipe:{recipe_id}" for recipe_id in recipe_ids])
+
+
+def invalidate_all_recipe_details():
+    transaction.on_commit(lambda: CacheTagManager.invalidate_tag("recipe:all"))
+
+
+def _recipe_ids(*states):
+    return [state["recipe_id"] for state in states if state and state["recipe_id"] is not None]
+
+
+FEEDBACK_STATE_FIELDS = ("recipe_id", "rating", "is_active", "user_id")
+RECIPE_PREFERENCE_STATE_FIELDS = ("recipe_id", "preference", "user_id")
+
+
+def _state(instance, fields):
+    return {name: getattr(instance, name) for name in fields}
+
+
+@receiver(pre_save, sender=Feedback)
+def remember_feedback_state(sender, instance, raw=False, **kwargs):
+    instance._previous_state = None
+    if raw or instance._state.adding:
+        return
+    instance._previous_state = (
+        Feedback.all_objects.filter(pk=instance.pk).values(*FEEDBACK_STATE_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=Feedback)
+def update_aggregates_on_feedback_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous, current = getattr(instance, "_previous_state", None), _state(instance, FEEDBACK_STATE_FIELDS)
+    aggregates.feedback_changed(previous, current)
+    invalidate_recipe_details(_recipe_ids(previous, current))
+
+
+@receiver(post_delete, sender=Feedback)
+def update_aggregates_on_feedback_delete(sender, instance, **kwargs):
+    aggregates.feedback_changed(_state(instance, FEEDBACK_STATE_FIELDS), None)
+    invalidate_recipe_details(_recipe_ids(_state(instance, FEEDBACK_STATE_FIELDS)))
+
+
+@receiver(pre_save, sender=RecipePreference)
+def remember_recipe_preference_state(sender, instance, raw=False, **kwargs):
+    instance._previous_state = None
+    if raw or instance._state.adding:
+        return
+    instance._previous_state = (
+        RecipePreference.objects.filter(pk=instance.pk).values(*RECIPE_PREFERENCE_STATE_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=RecipePreference)
+def update_aggregates_on_recipe_preference_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous, current = getattr(instance, "_previous_state", None), _state(instance, RECIPE_PREFERENCE_STATE_FIELDS)
+    aggregates.recipe_preference_changed(previous, current)
+    invalidate_recipe_details(_recipe_ids(previous, current))
+
+
+@receiver(post_delete, sender=RecipePreference)
+def update_aggregates_on_recipe_preference_delete(sender, instance, **kwargs):
+    aggregates.recipe_preference_changed(_state(instance, RECIPE_PREFERENCE_STATE_FIELDS), None)
+    invalidate_recipe_details(_recipe_ids(_state(instance, RECIPE_PREFERENCE_STATE_FIELDS)))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def reindex_recipe(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fulltext.schedule_reindex([instance.pk])
+        title_suggest_index.update([instance.pk])
+        recipe_facet_index.update([instance.pk])
+        semantic_index.schedule_append([instance.pk])
+        invalidate_recipe_details([instance.pk])
+        pantry_index.invalidate()
+        planner_index.invalidate()
+
+
+@receiver(post_init, sender=RecipeIngredient)
+def remember_parsed_quantity_source(sender, instance, **kwargs):
+    # __dict__ so that deferred fields are not loaded
+    instance._parsed_source = (instance.__dict__.get("quantity"), instance.__dict__.get("unit_id"))
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def parse_recipe_ingredient_quantity(sender, instance, **kwargs):
+    source = (instance.quantity, instance.unit_id)
+    if not instance._state.adding and instance._parsed_source == source:
+        return
+    unit = None
+    if RecipeIngredient.unit.is_cached(instance):
+        unit = instance.unit and (instance.unit.name, instance.unit.unit_type, instance.unit.to_base_factor)
+    elif instance.unit_id:
+        unit = Unit.all_objects.filter(pk=instance.unit_id).values_list("name", "unit_type", "to_base_factor").first()
+    name, unit_type, factor = unit or (None, None, None)
+    for field, value in parsed_quantity_fields(instance.quantity, name, configured_factor(unit_type, factor)).items():
+        setattr(instance, field, value)
+    instance._parsed_source = source
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def reindex_recipe_ingredients(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fulltext.schedule_reindex([instance.recipe_id])
+        semantic_index.schedule_append([instance.recipe_id])
+        invalidate_recipe_details([instance.recipe_id])
+        pantry_index.invalidate()
+        planner_index.invalidate()
+
+
+@receiver(post_save, sender=Ingredient)
+def reindex_recipes_using_ingredient(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    recipe_ids = list(RecipeIngredient.objects.filter(ingredient=instance).values_list("recipe_id", flat=True))
+    fulltext.schedule_reindex(recipe_ids)
+    invalidate_recipe_details(recipe_ids)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=IngredientAlias)
+@receiver(post_delete, sender=IngredientAlias)
+def rebuild_ingredient_autocomplete(sender, instance, raw=False, **kwargs):
+    if not raw:
+        autocomplete_index.invalidate()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def rebuild_conversion_tables(sender, instance, raw=False, **kwargs):
+    if not raw:
+        conversion_index.invalidate()
+        planner_index.invalidate()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def update_facets_on_recipe_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    planner_index.invalidate()
+    if not reverse:
+        recipe_facet_index.update([instance.pk])
+        semantic_index.schedule_append([instance.pk])
+        invalidate_recipe_details([instance.pk])
+    elif pk_set:
+        recipe_facet_index.update(pk_set)
+        invalidate_recipe_details(pk_set)
+    else:
+        # tag.recipe_set.clear() does not report which recipes lost the tag
+        recipe_facet_index.invalidate()
+        invalidate_all_recipe_details()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def rebuild_tag_indexes(sender, instance, raw=False, **kwargs):
+    if not raw:
+        recipe_facet_index.invalidate()
+        ingredient_tag_index.invalidate()
+        # Recipe details embed their tags
+        invalidate_all_recipe_details()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(m2m_changed, sender=Ingredient.tags.through)
+def rebuild_ingredient_tag_index(sender, raw=False, action="post_save", **kwargs):
+    if not raw and action.startswith("post_"):
+        ingredient_tag_index.invalidate()
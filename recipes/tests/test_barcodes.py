@@ -0,0 +1,118 @@
+import importlib.util
+import os
+import tempfile
+from unittest import mock, skipUnless
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+from ..ingestion.barcodes import gtin14
+from ..ingestion.decoding import decode_image
+from ..models import Ingredient, IngredientAlias, Inventory, Product, Unit
+
+User = get_user_model()
+
+
+class Gtin14Tests(TestCase):
+    def test_pads_known_lengths_and_checks_the_check_digit(self):
+        self.assertEqual(gtin14("4006381333931"), "04006381333931")
+        self.assertEqual(gtin14("036000291452"), "00036000291452")
+        self.assertEqual(gtin14("96385074"), "00000096385074")
+        self.assertIsNone(gtin14("4006381333932"))
+        self.assertIsNone(gtin14("12345"))
+
+    def test_expands_upc_e(self):
+        self.assertEqual(gtin14("04252614", "UPCE"), "00042100005264")
+
+
+class ImportProductsTests(TestCase):
+    def setUp(self):
+        self.grams = Unit.objects.create(name="g", unit_type="weight")
+        self.rice = Ingredient.objects.create(name="Rice")
+        self.oats = Ingredient.objects.create(name="Oats")
+        IngredientAlias.objects.create(name="rolled oats", ingredient=self.oats)
+
+    def import_csv(self, text):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as handle:
+            handle.write(text)
+        self.addCleanup(os.remove, handle.name)
+        call_command("import_products", handle.name, "--batch-size", "2", stdout=open(os.devnull, "w"))
+
+    def test_upserts_by_gtin_and_maps_ingredients(self):
+        self.import_csv(
+            "code\tproduct_name\tbrands\tquantity\tgeneric_name\n"
+            "4006381333931\tBasmati\tAcme, Other\t500 g\trice\n"
+            "036000291452\tRolled oats\t\t1 kg\t\n"
+            "1234\tBad code\t\t\t\n"
+            "96385074\tMystery snack\t\t6\t\n"
+        )
+        basmati = Product.objects.get(gtin="04006381333931")
+        self.assertEqual((basmati.brand, basmati.package_amount, basmati.package_unit, basmati.ingredient), ("Acme", 500, self.grams, self.rice))
+        oats = Product.objects.get(gtin="00036000291452")
+        self.assertEqual((oats.ingredient, oats.package_amount), (self.oats, None))
+        self.assertIsNone(Product.objects.get(gtin="00000096385074").ingredient)
+        self.assertEqual(Product.objects.count(), 3)
+
+        self.import_csv("code\tproduct_name\tquantity\n4006381333931\tBasmati rice\t1 g\n")
+        basmati.refresh_from_db()
+        self.assertEqual((basmati.name, basmati.package_amount), ("Basmati rice", 1))
+        self.assertEqual(Product.objects.count(), 3)
+
+
+class ScanBarcodesTests(TestCase):
+    def setUp(self):
+        self.grams = Unit.objects.create(name="g", unit_type="weight")
+        self.rice = Ingredient.objects.create(name="Rice")
+        self.beans = Ingredient.objects.create(name="Black beans")
+        Product.objects.create(
+            gtin="04006381333931", name="Basmati", package_amount=500, package_unit=self.grams, ingredient=self.rice
+        )
+        # Imported before the ingredient existed, resolved by name at scan time
+        Product.objects.create(gtin="00036000291452", name="Black beans")
+        Product.objects.create(gtin="00000096385074", name="Gum")
+        self.user = User.objects.create_user(username="u", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def scan(self, count=4):
+        images = [SimpleUploadedFile(f"{i}.jpg", b"jpeg", content_type="image/jpeg") for i in range(count)]
+        return self.client.post("/api/inventory/scan_barcodes/", {"images": images}, format="multipart")
+
+    @mock.patch("recipes.ingestion.barcodes.decode_images")
+    def test_counts_packages_and_upserts_inventory(self, decode_images):
+        decode_images.return_value = [
+            [("EAN13", "4006381333931"), ("UPCA", "036000291452")],
+            [("EAN13", "4006381333931"), ("EAN8", "96385074"), ("EAN13", "5901234123457")],
+            None,
+            [("EAN13", "0000000000001")],
+        ]
+        response = self.scan()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["unreadable_images"], response.data["images_without_barcode"]), ([2], [3]))
+        self.assertEqual(response.data["added"], 2)
+        statuses = {r["gtin"]: (r["count"], r["status"]) for r in response.data["results"]}
+        self.assertEqual(
+            statuses,
+            {
+                "00000096385074": (1, "unmapped"),
+                "00036000291452": (1, "created"),
+                "04006381333931": (2, "created"),
+                "05901234123457": (1, "unknown_product"),
+            },
+        )
+        self.assertEqual(Inventory.objects.get(ingredient=self.rice).quantity, 1000)
+        beans = Inventory.objects.get(ingredient=self.beans)
+        self.assertEqual((beans.quantity, beans.unit), (1, None))
+
+        decode_images.return_value = [[("EAN13", "4006381333931")]]
+        self.scan(1)
+        self.assertEqual(Inventory.objects.get(ingredient=self.rice).quantity, 1500)
+
+    def test_rejects_empty_and_oversized_batches(self):
+        self.assertEqual(self.client.post("/api/inventory/scan_barcodes/", {}, format="multipart").status_code, 400)
+        self.assertEqual(self.scan(51).status_code, 400)
+
+    @skipUnless(importlib.util.find_spec("cv2"), "OpenCV is not installed")
+    def test_decode_image_rejects_non_images(self):
+        self.assertIsNone(decode_image(b"not an image"))
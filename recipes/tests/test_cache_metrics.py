@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from ..cache_utils import (
+    CacheKeys,
+    CacheMetrics,
+    CacheTagManager,
+    get_or_fill,
+    key_family,
+)
+from ..models import Feedback, Recipe
+
+User = get_user_model()
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, CACHE_METRICS_PAYLOAD_SAMPLE_RATE=1.0)
+class CacheMetricsTests(TestCase):
+    def setUp(self):
+        CacheMetrics.reset()
+
+    def test_key_family(self):
+        self.assertEqual(key_family(CacheKeys.get_recipe_detail(42)), "recipe:detail")
+        self.assertEqual(key_family(CacheKeys.get_recipe_list(cuisine="thai")), "recipe:list")
+        self.assertEqual(key_family(CacheKeys.RECIPE_POPULAR), "recipe:popular")
+        self.assertEqual(key_family(CacheTagManager.tag_key("recipe:1")), "tag")
+
+    def test_hits_misses_fills_and_invalidations(self):
+        key = CacheKeys.get_recipe_detail(7)
+        calls = []
+
+        def fill():
+            calls.append(1)
+            return {"id": 7, "title": "Soup"}
+
+        get_or_fill(key, fill, CacheKeys.TTL_SHORT, tags=["recipe:7"])
+        get_or_fill(key, fill, CacheKeys.TTL_SHORT, tags=["recipe:7"])
+        get_or_fill(key, fill, CacheKeys.TTL_SHORT, tags=["recipe:7"])
+        CacheTagManager.invalidate_tag("recipe:7")
+
+        row = CacheMetrics.snapshot()["recipe:detail"]
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(row["hits"], 2)
+        self.assertEqual(row["misses"], 1)
+        self.assertEqual(row["fills"], 1)
+        self.assertEqual(row["invalidations"], 1)
+        self.assertGreater(row["avg_payload_bytes"], 0)
+        self.assertAlmostEqual(row["hit_ratio"], 2 / 3, places=3)
+
+    @override_settings(CACHE_METRICS_PAYLOAD_SAMPLE_RATE=0)
+    def test_payload_sizes_can_be_turned_off(self):
+        get_or_fill(CacheKeys.get_recipe_detail(8), lambda: {"id": 8}, CacheKeys.TTL_SHORT)
+        row = CacheMetrics.snapshot()["recipe:detail"]
+        self.assertEqual((row["fills"], row["avg_payload_bytes"]), (1, None))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RecipeDetailCacheTests(TestCase):
+    def setUp(self):
+        CacheMetrics.reset()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe = Recipe.objects.create(title="Soup", instructions="Simmer", servings=2)
+        self.client = APIClient()
+
+    def get(self, **params):
+        response = self.client.get(f"/api/recipes/{self.recipe.pk}/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_retrieve_is_served_from_the_cache(self):
+        self.get()
+        self.assertEqual(self.get()["title"], "Soup")
+        self.assertEqual(list(self.get(fields="id,title")), ["id", "title"])
+        row = CacheMetrics.snapshot()["recipe:detail"]
+        self.assertEqual((row["misses"], row["hits"], row["fills"]), (2, 1, 2))
+
+    def test_writes_to_the_recipe_invalidate_its_detail(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.title = "Stew"
+            self.recipe.save()
+        self.assertEqual(self.get()["title"], "Stew")
+
+        user = User.objects.create_user(username="u", password="x")
+        with self.captureOnCommitCallbacks(execute=True):
+            Feedback.objects.create(user=user, recipe=self.recipe, rating=4)
+        self.assertEqual(self.get()["rating_count"], 1)
+        row = CacheMetrics.snapshot()["recipe:detail"]
+        self.assertEqual((row["misses"], row["hits"], row["invalidations"]), (3, 0, 2))
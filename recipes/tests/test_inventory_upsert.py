@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+from ..models import Ingredient, IngredientAlias, Inventory, Unit
+
+User = get_user_model()
+
+
+class InventoryBulkUpsertTests(TestCase):
+    def setUp(self):
+        self.cup = Unit.objects.create(name="cup", unit_type="volume")
+        self.grams = Unit.objects.create(name="g", unit_type="weight")
+        self.rice = Ingredient.objects.create(name="Rice")
+        self.scallion = Ingredient.objects.create(name="Spring onion")
+        IngredientAlias.objects.create(name="scallions", ingredient=self.scallion)
+        self.user = User.objects.create_user(username="u", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.lot = Inventory.objects.create(user=self.user, ingredient=self.rice, quantity=100, unit=self.grams)
+
+    def upsert(self, items, **extra):
+        return self.client.post("/api/inventory/bulk_upsert/", {"items": items, **extra}, format="json")
+
+    def test_creates_updates_and_reports_errors_per_item(self):
+        items = [
+            {"ingredient_id": str(self.rice.pk), "quantity": 400, "unit_id": str(self.grams.pk)},
+            {"ingredient": "Scallions", "quantity": "1 1/2 cups", "expiry_date": "2030-01-05"},
+            {"ingredient": "rice", "quantity": "2", "unit": "cups"},
+            {"ingredient": "dragonfruit", "quantity": 1},
+            {"ingredient": "rice", "quantity": -1},
+            {"ingredient_id": str(self.rice.pk), "quantity": 50, "unit": "g"},
+        ]
+        # name, alias and unit lookups, two existence checks, the locked lot read, two writes, plus the savepoint
+        with self.assertNumQueries(10):
+            response = self.upsert(items)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["created"], response.data["updated"], response.data["errors"]), (2, 2, 2))
+        results = response.data["results"]
+        self.assertEqual([r["status"] for r in results], ["updated", "created", "created", "error", "error", "updated"])
+        self.assertEqual(results[3]["errors"], ["Unknown ingredient: dragonfruit"])
+
+        self.lot.refresh_from_db()
+        self.assertEqual(self.lot.quantity, 550)
+        scallions = Inventory.objects.get(ingredient=self.scallion)
+        self.assertEqual((scallions.quantity, scallions.unit, str(scallions.expiry_date)), (1.5, self.cup, "2030-01-05"))
+
+    def test_set_mode_and_request_validation(self):
+        response = self.upsert([{"ingredient": "rice", "quantity": 30, "unit": "g"}], mode="set")
+        self.assertEqual(response.data["results"][0]["id"], self.lot.pk)
+        self.lot.refresh_from_db()
+        self.assertEqual(self.lot.quantity, 30)
+
+        self.assertEqual(self.upsert([]).status_code, 400)
+        self.assertEqual(self.upsert([{}], mode="replace").status_code, 400)
+        self.assertEqual(self.upsert([{}] * 501).status_code, 400)
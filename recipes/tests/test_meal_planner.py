@@ -0,0 +1,82 @@
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from ..models import DietaryRestriction, Ingredient, Inventory, Recipe, RecipeIngredient, ShoppingList, Tag, Unit, UserProfile
+from ..models.policy import RestrictionRule
+from ..planning.planner import plan_meals
+
+User = get_user_model()
+
+
+class MealPlannerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grams = Unit.objects.create(name="g", unit_type="weight", to_base_factor=1.0)
+            self.cured = Tag.objects.create(name="cured meat")
+            names = ["rice", "spinach", "beans", "bacon", "tofu", "salt"]
+            self.ing = {name: Ingredient.objects.create(name=name) for name in names}
+            self.ing["bacon"].tags.add(self.cured)
+            self.recipes = {}
+            for title, cuisine, items in [
+                ("Spinach rice", "indian", [("rice", "200"), ("spinach", "150"), ("salt", "to taste")]),
+                ("Bean stew", "mexican", [("beans", "400"), ("rice", "100")]),
+                ("Bacon beans", "mexican", [("beans", "300"), ("bacon", "200")]),
+                ("Tofu rice", "indian", [("tofu", "200"), ("rice", "150")]),
+                ("Tofu stir fry", "chinese", [("tofu", "300"), ("spinach", "100")]),
+            ]:
+                recipe = Recipe.objects.create(title=title, cuisine=cuisine, instructions="Cook.", servings=2)
+                for name, quantity in items:
+                    RecipeIngredient.objects.create(
+                        recipe=recipe, ingredient=self.ing[name], quantity=quantity, unit=self.grams
+                    )
+                self.recipes[title] = recipe
+        self.user = User.objects.create_user(username="u", password="x")
+
+    def stock(self, name, quantity, expires_in=None):
+        expiry = timezone.localdate() + timedelta(days=expires_in) if expires_in is not None else None
+        Inventory.objects.create(
+            user=self.user, ingredient=self.ing[name], quantity=quantity, unit=self.grams, expiry_date=expiry
+        )
+
+    def test_prefers_expiring_pantry_items(self):
+        self.stock("rice", 1000)
+        self.stock("tofu", 500)
+        self.stock("spinach", 200, expires_in=1)
+        [meal] = plan_meals(self.user, days=1)
+        self.assertEqual((meal.title, meal.expiring_ingredients, meal.to_buy), ("Tofu stir fry", ["spinach"], []))
+
+        Inventory.objects.filter(ingredient=self.ing["tofu"]).delete()
+        [meal] = plan_meals(self.user, days=1)
+        self.assertEqual((meal.title, meal.pantry_ingredients, meal.to_buy), ("Spinach rice", ["rice", "spinach"], ["salt"]))
+
+    def test_policy_limits_and_variety(self):
+        restriction = DietaryRestriction.objects.create(name="Low cured meat")
+        RestrictionRule.objects.create(restriction=restriction, tag=self.cured, rule=RestrictionRule.Rule.LIMIT, threshold=50)
+        self.user.profile.dietary_restrictions.add(restriction)
+
+        meals = plan_meals(self.user, days=5, max_per_cuisine=1)
+        titles = [meal.title for meal in meals]
+        self.assertNotIn("Bacon beans", titles)
+        self.assertEqual(len(titles), 3)
+        cuisines = [self.recipes[title].cuisine for title in titles]
+        self.assertEqual(len(set(cuisines)), len(cuisines))
+
+    def test_users_without_a_profile_have_no_policy(self):
+        UserProfile.objects.filter(user=self.user).delete()
+        self.assertEqual(len(plan_meals(User.objects.get(pk=self.user.pk), days=5)), 5)
+
+    def test_endpoint_saves_a_shopping_list(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.post("/api/recipes/meal_plan/", {"days": 2, "save": True, "name": "Week"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["meals"]), 2)
+        shopping_list = ShoppingList.objects.get(pk=response.data["shopping_list_id"])
+        self.assertEqual(
+            set(shopping_list.recipes.values_list("pk", flat=True)), {m["recipe_id"] for m in response.data["meals"]}
+        )
+        self.assertEqual(APIClient().get("/api/recipes/meal_plan/").status_code, 401)
@@ -0,0 +1,199 @@
+import json
+from datetime import timedelta
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from ..measurements.conversion import conversion_index
+from ..measurements.parsing import parse_quantity, split_quantity
+from ..measurements.units import parsed_quantity_fields
+from ..models import Recipe, Ingredient, Inventory, RecipeIngredient, Unit
+
+User = get_user_model()
+
+
+def post_shopping_list(client, recipes):
+    response = client.post("/shopping-list/", {"recipe_ids": [str(r.pk) for r in recipes]}, format="json")
+    assert response.status_code == 200, response
+    return json.loads(b"".join(response.streaming_content))
+
+
+class QuantityParsingTests(TestCase):
+    def test_parse_quantity(self):
+        cases = {
+            "2": (2.0, None, ""),
+            "1/2": (0.5, None, ""),
+            "1 1/2 cups": (1.5, None, "cups"),
+            "½": (0.5, None, ""),
+            "1½ tbsp": (1.5, None, "tbsp"),
+            "1-2": (1.0, 2.0, ""),
+            "2 to 3 cloves": (2.0, 3.0, "cloves"),
+            "1 - 1/2 cups": (1.5, None, "cups"),
+            "1-1/2": (1.5, None, ""),
+            "1/2-1 cup": (0.5, 1.0, "cup"),
+            "1,5 l": (1.5, None, "l"),
+            "1,000 g": (1000.0, None, "g"),
+            "12,500.5 ml": (12500.5, None, "ml"),
+            "1,000-2,000 g": (1000.0, 2000.0, "g"),
+            "2,25 kg": (2.25, None, "kg"),
+            "one and a half cups": (1.5, None, "cups"),
+            "half a cup": (0.5, None, "cup"),
+            "a couple of eggs": (2.0, None, "eggs"),
+            "A few": (None, None, "A few"),
+            "a little salt": (None, None, "a little salt"),
+            "a dozen": (12.0, None, ""),
+            "to taste": (None, None, "to taste"),
+            "about 2 cups": (2.0, None, "cups"),
+            "approx. 1-2 tsp": (1.0, 2.0, "tsp"),
+            "~250 g": (250.0, None, "g"),
+            "about a dozen": (12.0, None, ""),
+            "about": (None, None, "about"),
+            "3/0": (None, None, "3/0"),
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                parsed = parse_quantity(text)
+                self.assertEqual((parsed.amount, parsed.amount_max, parsed.unit), expected)
+
+    def test_split_quantity_and_base_units(self):
+        self.assertEqual(split_quantity("1½ cups"), ("1 1/2", "cups"))
+        self.assertEqual(split_quantity("pinch"), ("pinch", ""))
+        self.assertEqual(split_quantity("about 2 cups"), ("about 2", "cups"))
+        self.assertEqual(parsed_quantity_fields("1-2", "kg")["base_quantity"], 2000.0)
+        self.assertEqual(parsed_quantity_fields("2 tbsp", None)["base_unit"], "ml")
+        self.assertEqual(parsed_quantity_fields("3", None)["base_unit"], "count")
+        self.assertEqual(parsed_quantity_fields("1", "pinch")["base_quantity"], None)
+
+
+class StructuredQuantityTests(TestCase):
+    def setUp(self):
+        self.grams = Unit.objects.create(name="grams", unit_type="weight")
+        self.rice = Ingredient.objects.create(name="rice")
+        self.recipes = [Recipe.objects.create(title=f"R{i}", instructions="Cook.") for i in range(3)]
+
+    def test_columns_are_filled_on_save_and_by_backfill(self):
+        row = RecipeIngredient.objects.create(recipe=self.recipes[0], ingredient=self.rice, quantity="½", unit=self.grams)
+        row.refresh_from_db()
+        self.assertEqual((row.amount, row.base_quantity, row.base_unit), (0.5, 0.5, "g"))
+
+        RecipeIngredient.objects.filter(pk=row.pk).update(amount=None, base_quantity=None, base_unit="")
+        call_command("backfill_quantities", "--batch-size", "1", stdout=StringIO())
+        row.refresh_from_db()
+        self.assertEqual((row.amount, row.base_quantity, row.base_unit), (0.5, 0.5, "g"))
+
+    def test_unit_is_only_read_when_quantity_or_unit_changes(self):
+        row = RecipeIngredient.objects.create(recipe=self.recipes[0], ingredient=self.rice, quantity="2")
+        row = RecipeIngredient.objects.get(pk=row.pk)
+        with self.assertNumQueries(1):
+            row.save()
+        row.quantity, row.unit_id = "3", self.grams.pk
+        # The unit's name, type and factor, then the update
+        with self.assertNumQueries(2):
+            row.save()
+        self.assertEqual((row.amount, row.base_quantity, row.base_unit), (3.0, 3.0, "g"))
+
+    def test_shopping_list_sums_parsed_quantities(self):
+        for recipe, quantity in zip(self.recipes, ["1/2", "1-2", "to taste"]):
+            RecipeIngredient.objects.create(recipe=recipe, ingredient=self.rice, quantity=quantity, unit=self.grams)
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create_user(username="u", password="x"))
+
+        data = post_shopping_list(client, self.recipes)
+        self.assertEqual(data["shopping_list"][0]["total_quantity"], 2.5)
+        self.assertEqual(data["total_items"], 1)
+
+    def test_shopping_list_rejects_invalid_recipe_ids(self):
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create_user(username="u", password="x"))
+        for recipe_ids in (["nope"], str(self.recipes[0].pk), []):
+            with self.subTest(recipe_ids=recipe_ids):
+                response = client.post("/shopping-list/", {"recipe_ids": recipe_ids}, format="json")
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.streaming)
+
+
+class UnitConversionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cup = Unit.objects.create(name="cup", unit_type="volume", to_base_factor=240.0)
+            self.grams = Unit.objects.create(name="g", unit_type="weight", to_base_factor=1.0)
+            self.flour = Ingredient.objects.create(name="flour", density=0.53)
+            self.eggs = Ingredient.objects.create(name="eggs")
+            self.recipes = [Recipe.objects.create(title=f"R{i}", instructions="Bake.") for i in range(3)]
+
+    def test_unit_factor_overrides_name_table(self):
+        row = RecipeIngredient.objects.create(recipe=self.recipes[0], ingredient=self.flour, quantity="1", unit=self.cup)
+        self.assertEqual((row.base_quantity, row.base_unit), (240.0, "ml"))
+
+    def test_canonical_totals(self):
+        totals = conversion_index.canonical_totals(
+            [self.flour.pk, self.flour.pk, self.eggs.pk, self.eggs.pk, self.eggs.pk, self.eggs.pk],
+            [240.0, 120.0, 2.0, 1.0, 50.0, None],
+            ["ml", "g", "count", "count", "g", ""],
+        )
+        self.assertEqual(totals[self.flour.pk].unit, "g")
+        self.assertAlmostEqual(totals[self.flour.pk].quantity, 240 * 0.53 + 120)
+        self.assertEqual(
+            (totals[self.eggs.pk].quantity, totals[self.eggs.pk].unit, totals[self.eggs.pk].unconverted),
+            (3.0, "count", [(50.0, "g")]),
+        )
+        self.assertEqual(totals[self.eggs.pk].unparsed, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.eggs.piece_weight = 50.0
+            self.eggs.save()
+        totals = conversion_index.canonical_totals([self.eggs.pk] * 2, [2.0, 50.0], ["count", "g"])
+        self.assertEqual((totals[self.eggs.pk].quantity, totals[self.eggs.pk].unit), (150.0, "g"))
+
+    def test_shopping_list_has_one_line_per_ingredient(self):
+        RecipeIngredient.objects.create(recipe=self.recipes[0], ingredient=self.flour, quantity="1", unit=self.cup)
+        RecipeIngredient.objects.create(recipe=self.recipes[1], ingredient=self.flour, quantity="120", unit=self.grams)
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create_user(username="u", password="x"))
+
+        [line] = post_shopping_list(client, self.recipes)["shopping_list"]
+        self.assertEqual(line["unit"], "g")
+        self.assertAlmostEqual(line["total_quantity"], 240 * 0.53 + 120)
+        self.assertEqual(line["quantity"], "1 cup, 120 g")
+
+
+class InventoryNettingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.kg = Unit.objects.create(name="kg", unit_type="weight", to_base_factor=1000.0)
+            self.grams = Unit.objects.create(name="g", unit_type="weight", to_base_factor=1.0)
+            self.rice = Ingredient.objects.create(name="rice")
+            self.recipes = [Recipe.objects.create(title=f"R{i}", instructions="Cook.") for i in range(2)]
+        self.user = User.objects.create_user(username="u", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_lots_are_used_first_expired_first_out(self):
+        for recipe in self.recipes:
+            RecipeIngredient.objects.create(recipe=recipe, ingredient=self.rice, quantity="400", unit=self.grams)
+        today = timezone.localdate()
+        late = Inventory.objects.create(user=self.user, ingredient=self.rice, quantity=1, unit=self.kg)
+        soon = Inventory.objects.create(
+            user=self.user, ingredient=self.rice, quantity=300, unit=self.grams, expiry_date=today + timedelta(days=2)
+        )
+        Inventory.objects.create(
+            user=self.user, ingredient=self.rice, quantity=5, unit=self.kg, expiry_date=today - timedelta(days=1)
+        )
+
+        conversion_index.get()
+        with self.assertNumQueries(1):
+            [line] = post_shopping_list(self.client, self.recipes)["shopping_list"]
+        self.assertEqual((line["total_quantity"], line["inventory_quantity"], line["to_buy"]), (800.0, 1300.0, 0.0))
+        self.assertEqual([(lot["id"], lot["quantity"]) for lot in line["inventory_lots"]], [(str(soon.pk), 300.0), (str(late.pk), 500.0)])
+
+    def test_shortfall_is_left_to_buy(self):
+        RecipeIngredient.objects.create(recipe=self.recipes[0], ingredient=self.rice, quantity="1", unit=self.kg)
+        Inventory.objects.create(user=self.user, ingredient=self.rice, quantity=250, unit=self.grams)
+
+        [line] = post_shopping_list(self.client, self.recipes[:1])["shopping_list"]
+        self.assertEqual((line["in_inventory"], line["to_buy"], line["unit"]), (True, 750.0, "g"))
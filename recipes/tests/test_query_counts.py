@@ -0,0 +1,153 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from ..query_plans import missing_lookups
+from ..search.pantry import pantry_index
+from ..serializers import RecipeSerializer, RecipeListSerializer, RecipePreferenceSerializer
+from ..views.viewsets import RecipeViewSet, RecipePreferenceViewSet
+from ..models import (
+    Recipe,
+    Ingredient,
+    Category,
+    Unit,
+    FodmapCategory,
+    Feedback,
+    RecipeIngredient,
+    RecipePreference,
+    Tag,
+    DietType,
+    DietaryRestriction,
+    FoodPreference,
+    UserProfile,
+)
+
+User = get_user_model()
+
+
+class QueryCountTestCase(TestCase):
+    """Endpoints must run the same number of queries for small and large pages"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="u", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        category = Category.objects.create(name="Vegetables")
+        unit = Unit.objects.create(name="g", unit_type="weight")
+        fodmap = FodmapCategory.objects.create(name="Low")
+        self.ingredients = [
+            Ingredient.objects.create(
+                name=f"ingredient {i}", category=category, default_unit=unit, fodmap_category=fodmap
+            )
+            for i in range(3)
+        ]
+
+    def count_queries(self, url, **params):
+        cache.clear()
+        pantry_index.get()  # index builds are amortized across requests
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, url, grow, **params):
+        small = self.count_queries(url, **params)
+        grow()
+        large = self.count_queries(url, **params)
+        self.assertEqual(small, large)
+
+
+class FeedbackQueryCountTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        profile = UserProfile.objects.get(user=self.user)
+        profile.diet_types.add(
+            DietType.objects.get_or_create(name="Vegan")[0], DietType.objects.get_or_create(name="Keto")[0]
+        )
+        profile.dietary_restrictions.add(DietaryRestriction.objects.get_or_create(name="Gluten Intolerance")[0])
+        for ingredient in self.ingredients:
+            FoodPreference.objects.create(user=self.user, ingredient=ingredient, preference="like")
+        self.add_feedback(2)
+
+    def add_feedback(self, n):
+        for i in range(n):
+            recipe = Recipe.objects.create(title=f"Recipe {Recipe.objects.count()}", instructions="Cook.")
+            Feedback.objects.create(user=self.user, recipe=recipe, rating=i % 5)
+
+    def test_feedback_list(self):
+        self.assertConstantQueries("/api/feedback/", lambda: self.add_feedback(6))
+
+    def test_profile_list(self):
+        def grow():
+            for i in range(4):
+                ingredient = Ingredient.objects.create(name=f"extra {i}")
+                FoodPreference.objects.create(user=self.user, ingredient=ingredient, preference="dislike")
+
+        self.assertConstantQueries("/api/user-profile/", grow)
+
+    def test_food_preference_list(self):
+        def grow():
+            for i in range(4):
+                FoodPreference.objects.create(
+                    user=self.user, ingredient=Ingredient.objects.create(name=f"more {i}")
+                )
+
+        self.assertConstantQueries("/api/food-preferences/", grow)
+
+
+class QueryPlanCoverageTests(TestCase):
+    def test_plans_cover_serializer_field_graph(self):
+        for action_name, serializer_class in (("retrieve", RecipeSerializer), ("list", RecipeListSerializer)):
+            recipe_plan = RecipeViewSet.query_plans[action_name]
+            self.assertEqual(missing_lookups(serializer_class(), recipe_plan), set(), serializer_class)
+        self.assertIs(RecipeViewSet.query_plans["popular"], RecipeViewSet.query_plans["list"])
+
+        preference_plan = RecipePreferenceViewSet.query_plans["default"]
+        self.assertEqual(missing_lookups(RecipePreferenceSerializer(), preference_plan), set())
+
+
+class RecipeQueryCountTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tags = [Tag.objects.create(name=f"tag {i}") for i in range(3)]
+        self.unit = Unit.objects.get(name="g")
+        self.add_recipes(2)
+
+    def add_recipes(self, n):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._add_recipes(n)
+
+    def _add_recipes(self, n):
+        for _ in range(n):
+            recipe = Recipe.objects.create(
+                title=f"Recipe {Recipe.all_objects.count()}", instructions="Cook.", fodmap_friendly=True
+            )
+            recipe.tags.add(*self.tags)
+            for ingredient in self.ingredients:
+                RecipeIngredient.objects.create(recipe=recipe, ingredient=ingredient, quantity="1", unit=self.unit)
+            RecipePreference.objects.create(user=self.user, recipe=recipe, preference="favorite")
+
+    def test_recipe_endpoints(self):
+        first_ingredient = str(self.ingredients[0].pk)
+        for url, params in (
+            ("/api/recipes/", {}),
+            ("/api/recipes/", {"expand": "ingredients_detail"}),
+            ("/api/recipes/fodmap_friendly/", {}),
+            ("/api/recipes/by_ingredients/", {"ingredients": first_ingredient}),
+            ("/api/recipes/favorites/", {}),
+            ("/api/recipe_preferences/", {}),
+        ):
+            with self.subTest(url=url, params=params):
+                self.assertConstantQueries(url, lambda: self.add_recipes(3), **params)
+
+    def test_recipe_detail(self):
+        recipe = Recipe.objects.first()
+        small = self.count_queries(f"/api/recipes/{recipe.pk}/")
+        for i in range(5):
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=Ingredient.objects.create(name=f"extra {i}"), quantity="2", unit=self.unit
+            )
+        self.assertEqual(small, self.count_queries(f"/api/recipes/{recipe.pk}/"))
@@ -0,0 +1,114 @@
+import importlib.util
+from unittest import mock, skipUnless
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from rest_framework.test import APIClient
+from ..ingestion.ocr import ocr_image
+from ..ingestion.receipts import match_ingredient, parse_receipt, run_receipt_job
+from ..models import IngestionJob, Ingredient, IngredientAlias, Inventory, Unit
+
+User = get_user_model()
+
+RECEIPT = """
+FRESH MART #0412
+4011 KIRKLAND ORG BANANAS 1.24 kg @ 1.99/kg   2.47
+2 x GREEK YOGRT 500G   7.98 F
+RED ONIONS   1.29
+WIDGET CLEANER   4.99 T
+SUBTOTAL   16.73
+TAX   0.40
+VISA   17.13
+"""
+
+
+class ReceiptParsingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.banana = Ingredient.objects.create(name="Banana")
+            self.yogurt = Ingredient.objects.create(name="Greek yogurt")
+            self.red_onion = Ingredient.objects.create(name="Red onion")
+            Ingredient.objects.create(name="Onion")
+            IngredientAlias.objects.create(name="bananas", ingredient=self.banana)
+
+    def test_parses_item_lines_and_skips_totals(self):
+        lines = parse_receipt(RECEIPT)
+        self.assertEqual(
+            [(line.description, line.quantity, line.unit, line.price) for line in lines],
+            [
+                ("KIRKLAND ORG BANANAS", 1.24, "kg", 2.47),
+                ("GREEK YOGRT", 1000.0, "g", 7.98),
+                ("RED ONIONS", 1.0, "", 1.29),
+                ("WIDGET CLEANER", 1.0, "", 4.99),
+            ],
+        )
+        self.assertEqual(parse_receipt("3 x LEMONS  1.50")[0].quantity, 3)
+
+    def test_matches_words_within_abbreviated_descriptions(self):
+        self.assertEqual(match_ingredient("KIRKLAND ORG BANANAS")[0]["name"], "Banana")
+        self.assertEqual(match_ingredient("GREEK YOGRT")[0]["name"], "Greek yogurt")
+        self.assertEqual(match_ingredient("RED ONIONS")[0]["name"], "Red onion")
+        self.assertIsNone(match_ingredient("WIDGET CLEANER")[0])
+
+
+class ReceiptJobTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.banana = Ingredient.objects.create(name="Banana")
+            self.onion = Ingredient.objects.create(name="Red onion")
+        self.kg = Unit.objects.create(name="kg", unit_type="weight")
+        self.user = User.objects.create_user(username="u", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def scan(self, count=2):
+        images = [SimpleUploadedFile(f"{i}.jpg", b"jpeg", content_type="image/jpeg") for i in range(count)]
+        return self.client.post("/api/inventory/scan_receipts/", {"images": images}, format="multipart")
+
+    @mock.patch("recipes.views.viewsets.ocr_available", return_value=True)
+    @mock.patch("recipes.ingestion.receipts._get_executor")
+    @mock.patch("recipes.ingestion.receipts.ocr_images")
+    def test_job_reports_progress_and_upserts_inventory(self, ocr_images, get_executor, _):
+        ocr_images.return_value = iter([None, "BANANAS 1.5 kg   2.99\nRED ONION   0.99\nTOTAL   3.98"])
+        # Run the job on the test thread and connection once the upload commits
+        get_executor.return_value.submit.side_effect = lambda fn, job_id, images: run_receipt_job(job_id, images)
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.scan()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.data["status"], response.data["total"], response.data["progress"]), ("pending", 2, 0.0))
+        for callback in callbacks:
+            callback()
+
+        job = self.client.get(f"/api/ingestion-jobs/{response.data['id']}/").data
+        self.assertEqual((job["status"], job["processed"], job["progress"]), ("done", 2, 1.0))
+        self.assertEqual(job["result"]["unreadable_images"], [0])
+        self.assertEqual(job["result"]["added"], 2)
+        self.assertEqual([line["status"] for line in job["result"]["lines"]], ["created", "created"])
+        bananas = Inventory.objects.get(ingredient=self.banana)
+        self.assertEqual((bananas.quantity, bananas.unit), (1.5, self.kg))
+
+        other = User.objects.create_user(username="other", password="x")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(f"/api/ingestion-jobs/{response.data['id']}/").status_code, 404)
+
+    @mock.patch("recipes.ingestion.receipts.ocr_images", side_effect=RuntimeError("tesseract is not installed"))
+    def test_failed_job_records_the_error(self, _):
+        job = IngestionJob.objects.create(user=self.user, kind=IngestionJob.Kind.RECEIPT, total=1)
+        with self.assertLogs("recipes.ingestion.receipts", "ERROR"):
+            run_receipt_job(job.pk, [b"jpeg"])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ("failed", "tesseract is not installed"))
+
+    @mock.patch("recipes.views.viewsets.ocr_available", return_value=True)
+    def test_rejects_empty_and_oversized_batches(self, _):
+        self.assertEqual(self.client.post("/api/inventory/scan_receipts/", {}, format="multipart").status_code, 400)
+        self.assertEqual(self.scan(21).status_code, 400)
+        self.assertFalse(IngestionJob.objects.exists())
+
+    @skipUnless(importlib.util.find_spec("cv2") and importlib.util.find_spec("pytesseract"), "OCR is not installed")
+    def test_ocr_image_rejects_non_images(self):
+        self.assertIsNone(ocr_image(b"not an image"))
@@ -0,0 +1,70 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from ..models import Recipe, Feedback, RecipePreference
+
+User = get_user_model()
+
+
+class RecipeAggregateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="u", password="x")
+        self.other = User.objects.create_user(username="v", password="x")
+        self.recipe = Recipe.objects.create(title="Soup", instructions="Boil.")
+        self.second = Recipe.objects.create(title="Salad", instructions="Toss.")
+
+    def assertAggregates(self, recipe, rating_sum, rating_count, favorites_count):
+        recipe = Recipe.all_objects.get(pk=recipe.pk)
+        self.assertEqual(
+            (recipe.rating_sum, recipe.rating_count, recipe.favorites_count),
+            (rating_sum, rating_count, favorites_count),
+        )
+
+    def test_feedback_updates_rating_columns(self):
+        fb = Feedback.objects.create(user=self.user, recipe=self.recipe, rating=4)
+        Feedback.objects.create(user=self.other, recipe=self.recipe, rating=2)
+        self.assertAggregates(self.recipe, 6, 2, 0)
+
+        fb.rating = 5
+        fb.save()
+        self.assertAggregates(self.recipe, 7, 2, 0)
+
+        fb.recipe = self.second
+        fb.save()
+        self.assertAggregates(self.recipe, 2, 1, 0)
+        self.assertAggregates(self.second, 5, 1, 0)
+
+        fb.soft_delete()
+        self.assertAggregates(self.second, 0, 0, 0)
+        fb.restore()
+        self.assertAggregates(self.second, 5, 1, 0)
+
+        fb.hard_delete()
+        self.assertAggregates(self.second, 0, 0, 0)
+
+    def test_preferences_update_favorites_count(self):
+        pref = RecipePreference.objects.create(user=self.user, recipe=self.recipe, preference="favorite")
+        RecipePreference.objects.create(user=self.other, recipe=self.recipe, preference="like")
+        self.assertAggregates(self.recipe, 0, 0, 1)
+
+        pref.preference = "dislike"
+        pref.save()
+        self.assertAggregates(self.recipe, 0, 0, 0)
+
+        pref.preference = "favorite"
+        pref.save()
+        pref.delete()
+        self.assertAggregates(self.recipe, 0, 0, 0)
+
+    def test_reconcile_command_repairs_drift(self):
+        Feedback.objects.create(user=self.user, recipe=self.recipe, rating=3)
+        RecipePreference.objects.create(user=self.user, recipe=self.recipe, preference="favorite")
+        Recipe.all_objects.filter(pk=self.recipe.pk).update(rating_sum=99, rating_count=0, favorites_count=7)
+
+        call_command("reconcile_recipe_aggregates", "--dry-run", stdout=StringIO())
+        self.assertAggregates(self.recipe, 99, 0, 7)
+
+        call_command("reconcile_recipe_aggregates", stdout=StringIO())
+        self.assertAggregates(self.recipe, 3, 1, 1)
+        self.assertAggregates(self.second, 0, 0, 0)
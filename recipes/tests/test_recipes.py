@@ -0,0 +1,86 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from ..models import Recipe, Ingredient, RecipeIngredient, Tag, Unit
+
+User = get_user_model()
+
+
+class RecipeSparseFieldsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.tag = Tag.objects.create(name="quick")
+        self.unit = Unit.objects.create(name="g", unit_type="weight")
+        self.recipe = Recipe.objects.create(
+            title="Carrot Soup", instructions="Blend.", cuisine="French", prep_time=5, cook_time=20, total_time=25
+        )
+        self.recipe.tags.add(self.tag)
+        RecipeIngredient.objects.create(
+            recipe=self.recipe, ingredient=Ingredient.objects.create(name="carrot"), quantity="200", unit=self.unit
+        )
+
+    def test_list_rows_are_compact(self):
+        row = self.client.get("/api/recipes/").json()["results"][0]
+        self.assertEqual(
+            set(row),
+            {"id", "title", "prep_time", "cook_time", "total_time", "cuisine", "tags", "fodmap_friendly", "thumbnail"},
+        )
+        self.assertEqual(row["tags"], ["quick"])
+
+    def test_list_fields_and_expand(self):
+        row = self.client.get(
+            "/api/recipes/", {"fields": "id,title,ingredients_detail", "expand": "ingredients_detail"}
+        ).json()["results"][0]
+        self.assertEqual(set(row), {"id", "title", "ingredients_detail"})
+        self.assertEqual(row["ingredients_detail"][0]["ingredient"]["name"], "carrot")
+
+    def test_detail_fields(self):
+        row = self.client.get(f"/api/recipes/{self.recipe.pk}/", {"fields": "title,cuisine"}).json()
+        self.assertEqual(row, {"title": "Carrot Soup", "cuisine": "French"})
+
+    def test_detail_is_full_by_default(self):
+        row = self.client.get(f"/api/recipes/{self.recipe.pk}/").json()
+        self.assertIn("ingredients_detail", row)
+        self.assertEqual(row["tags"][0]["name"], "quick")
+
+
+class RecipeFullTextSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.soup = Recipe.objects.create(
+                title="Carrot Ginger Soup", description="Warming and smooth", instructions="Simmer carrots, then blend."
+            )
+            self.salad = Recipe.objects.create(
+                title="Quinoa Salad", description="Fresh lunch with a carrot dressing", instructions="Toss everything."
+            )
+            self.stew = Recipe.objects.create(title="Beef Stew", instructions="Braise slowly.")
+            RecipeIngredient.objects.create(
+                recipe=self.stew, ingredient=Ingredient.objects.create(name="parsnip"), quantity="2"
+            )
+
+    def search(self, q):
+        return self.client.get("/api/recipes/", {"q": q}).json()["results"]
+
+    def test_ranked_by_relevance_with_snippets(self):
+        results = self.search("carrot")
+        self.assertEqual([r["title"] for r in results], ["Carrot Ginger Soup", "Quinoa Salad"])
+        self.assertIn("<mark>", results[0]["snippet"])
+        self.assertGreater(results[0]["search_rank"], results[1]["search_rank"])
+
+    def test_matches_ingredient_names_and_prefixes(self):
+        self.assertEqual([r["title"] for r in self.search("parsn")], ["Beef Stew"])
+
+    def test_index_follows_updates_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.stew.title = "Braised Beef"
+            self.stew.save()
+            self.salad.soft_delete()
+        self.assertEqual([r["title"] for r in self.search("braised")], ["Braised Beef"])
+        self.assertEqual([r["title"] for r in self.search("carrot")], ["Carrot Ginger Soup"])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(self.search('carrot" OR NEAR('), [])
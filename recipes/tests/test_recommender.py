@@ -0,0 +1,85 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from ..models import (
+    Recipe,
+    Ingredient,
+    RecipeIngredient,
+    RecipePreference,
+    Feedback,
+    Tag,
+    DietType,
+    UserProfile,
+    UserRecommendation,
+)
+from ..models.policy import DietTypeRule
+from ..policy.policy import CompiledPolicy, filter_recipe_ids_by_policy
+
+User = get_user_model()
+
+
+class TrainRecommenderTests(TestCase):
+    def setUp(self):
+        self.meat = Tag.objects.create(name="meat")
+        self.beef = Ingredient.objects.create(name="beef")
+        self.beef.tags.add(self.meat)
+
+        self.recipes = {title: Recipe.objects.create(title=title, instructions="Cook.") for title in "ABCDEF"}
+        RecipeIngredient.objects.create(recipe=self.recipes["C"], ingredient=self.beef, quantity="1")
+
+        self.users = [User.objects.create_user(username=f"u{i}", password="x") for i in range(5)]
+        # Two taste clusters: A-B-C and D-E-F
+        for user in self.users[:3]:
+            self.interact(user, "ABC")
+        for user in self.users[3:]:
+            self.interact(user, "DEF")
+        self.target = User.objects.create_user(username="target", password="x")
+        self.interact(self.target, "AB")
+        Feedback.objects.create(user=self.target, recipe=self.recipes["D"], rating=1)
+
+    def interact(self, user, titles):
+        for title in titles:
+            RecipePreference.objects.create(user=user, recipe=self.recipes[title], preference="like")
+
+    def recommended(self, user):
+        return [
+            Recipe.objects.get(pk=pk).title
+            for pk in UserRecommendation.objects.filter(user=user).values_list("recipe_id", flat=True)
+        ]
+
+    def test_recommends_unseen_recipes_from_similar_users(self):
+        call_command("train_recommender", "--top", "3", stdout=StringIO())
+
+        picks = self.recommended(self.target)
+        self.assertEqual(picks[0], "C")
+        self.assertNotIn("A", picks)
+        self.assertNotIn("D", picks)
+
+    def test_diet_policy_filters_recommendations(self):
+        vegetarian, _ = DietType.objects.get_or_create(name="Vegetarian")
+        DietTypeRule.objects.create(diet_type=vegetarian, tag=self.meat, rule=DietTypeRule.Rule.AVOID)
+        UserProfile.objects.get(user=self.target).diet_types.add(vegetarian)
+
+        call_command("train_recommender", "--top", "3", stdout=StringIO())
+        self.assertNotIn("C", self.recommended(self.target))
+        self.assertIn("C", self.recommended(self.users[3]))
+
+    def test_filter_recipe_ids_by_policy(self):
+        ids = [recipe.pk for recipe in self.recipes.values()]
+        self.assertEqual(filter_recipe_ids_by_policy(CompiledPolicy(), ids), ids)
+        policy = CompiledPolicy(forbidden_tag_ids={self.meat.pk})
+        self.assertNotIn(self.recipes["C"].pk, filter_recipe_ids_by_policy(policy, ids))
+        policy = CompiledPolicy(forbidden_ingredient_ids={self.beef.pk})
+        self.assertEqual(len(filter_recipe_ids_by_policy(policy, ids)), 5)
+
+    def test_for_you_reads_precomputed_rows(self):
+        call_command("train_recommender", "--top", "3", stdout=StringIO())
+        client = APIClient()
+        self.assertEqual(client.get("/api/recipes/for_you/").status_code, 401)
+        client.force_authenticate(user=self.target)
+        with self.assertNumQueries(1):
+            response = client.get("/api/recipes/for_you/")
+        self.assertEqual(response.data[0]["title"], "C")
+        self.assertEqual([row["rank"] for row in response.data], list(range(1, len(response.data) + 1)))
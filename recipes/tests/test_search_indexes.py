@@ -0,0 +1,295 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from ..models import Recipe, Ingredient, IngredientAlias, RecipeIngredient, Inventory, Tag, Feedback, RecipePreference
+from ..search.pantry import pantry_index
+from ..search.autocomplete import autocomplete_index
+from ..search.suggest import title_suggest_index
+from ..search.facets import recipe_facet_index
+from ..search.index import schedule_once
+from ..search.tag_expr import MAX_NESTING_DEPTH, TagExpressionError, parse
+
+User = get_user_model()
+
+
+class ScheduleOnceTests(TestCase):
+    def test_one_callback_per_key_and_transaction(self):
+        calls = []
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_once("test", [1, 2], calls.append)
+            schedule_once("test", [2, 3], calls.append)
+            schedule_once("other", [9], calls.append)
+        self.assertEqual(calls, [{1, 2, 3}, {9}])
+
+    def test_rolled_back_ids_are_dropped(self):
+        calls = []
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    schedule_once("test", [1], calls.append)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            schedule_once("test", [2], calls.append)
+        self.assertEqual(calls, [{2}])
+
+
+class PantryMatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="u", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        names = ["rice", "egg", "carrot", "tofu", "chicken", "soy sauce"]
+        self.ing = {name: Ingredient.objects.create(name=name) for name in names}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fried_rice = self.recipe("Fried Rice", ["rice", "egg", "carrot", "soy sauce"])
+            self.omelette = self.recipe("Omelette", ["egg"])
+            self.stir_fry = self.recipe("Tofu Stir Fry", ["tofu", "carrot", "soy sauce", "rice", "chicken"])
+            self.recipe("Chicken Soup", ["chicken"])
+
+    def recipe(self, title, ingredient_names):
+        recipe = Recipe.objects.create(title=title, instructions="Cook.")
+        for name in ingredient_names:
+            RecipeIngredient.objects.create(recipe=recipe, ingredient=self.ing[name], quantity="1")
+        return recipe
+
+    def ids(self, *names):
+        return {self.ing[name].pk for name in names}
+
+    def test_ranked_by_coverage_then_missing(self):
+        matches = pantry_index.match(self.ids("egg", "rice", "carrot"))
+        self.assertEqual(
+            [m.recipe_id for m in matches], [self.omelette.pk, self.fried_rice.pk, self.stir_fry.pk]
+        )
+        self.assertEqual((matches[1].matched, matches[1].missing), (3, 1))
+        self.assertAlmostEqual(matches[1].coverage, 0.75)
+
+    def test_max_missing(self):
+        matches = pantry_index.match(self.ids("egg", "rice", "carrot"), max_missing=1)
+        self.assertEqual([m.recipe_id for m in matches], [self.omelette.pk, self.fried_rice.pk])
+
+    def test_index_follows_recipe_changes(self):
+        pantry_index.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.create(recipe=self.omelette, ingredient=self.ing["tofu"], quantity="1")
+        match = pantry_index.match(self.ids("egg"), k=1)[0]
+        self.assertEqual((match.recipe_id, match.missing), (self.omelette.pk, 1))
+
+    def test_endpoint_reads_inventory(self):
+        Inventory.objects.create(user=self.user, ingredient=self.ing["rice"], quantity=2)
+        Inventory.objects.create(user=self.user, ingredient=self.ing["soy sauce"], quantity=1)
+        response = self.client.get(
+            "/api/recipes/by_ingredients/",
+            {"ingredients": [str(self.ing["egg"].pk), str(self.ing["carrot"].pk)], "use_inventory": "true"},
+        )
+        self.assertEqual(response.status_code, 200)
+        rows = response.json()
+        self.assertEqual(rows[0]["title"], "Fried Rice")
+        self.assertEqual((rows[0]["coverage"], rows[0]["missing_count"]), (1.0, 0))
+        self.assertEqual(rows[2]["missing_ingredients"], ["chicken", "tofu"])
+
+    def test_endpoint_limit_is_at_least_one(self):
+        response = self.client.get(
+            "/api/recipes/by_ingredients/", {"ingredients": [str(self.ing["egg"].pk)], "limit": "-1"}
+        )
+        self.assertEqual([row["title"] for row in response.json()], ["Omelette"])
+
+
+class IngredientAutocompleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="u", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.onion = Ingredient.objects.create(name="Onion")
+            self.green_onion = Ingredient.objects.create(name="Green Onion")
+            self.scallion = IngredientAlias.objects.create(name="Scallion", ingredient=self.green_onion)
+            self.oregano = Ingredient.objects.create(name="Oregano")
+            recipe = Recipe.objects.create(title="Soup", instructions="Cook.")
+            RecipeIngredient.objects.create(recipe=recipe, ingredient=self.oregano, quantity="1")
+
+    def names(self, term):
+        return [row["name"] for row in autocomplete_index.suggest(term)]
+
+    def test_prefix_matches_word_starts_and_ranks_popular_first(self):
+        self.assertEqual(self.names("o"), ["Oregano", "Onion", "Green Onion"])
+        self.assertEqual(self.names("oni"), ["Onion", "Green Onion"])
+
+    def test_aliases_and_typos(self):
+        rows = autocomplete_index.suggest("scal")
+        self.assertEqual([(r["name"], r["matched_name"]) for r in rows], [("Green Onion", "Scallion")])
+        self.assertEqual(self.names("oreagno")[:1], ["Oregano"])
+
+    def test_keystrokes_skip_the_database_until_ingredients_change(self):
+        autocomplete_index.get()
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/ingredients/auto_complete/", {"q": "gre"})
+        self.assertEqual([row["name"] for row in response.data], ["Green Onion"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            IngredientAlias.objects.create(name="Spring Onion", ingredient=self.green_onion)
+        response = self.client.post("/api/ingredients/auto_complete/", {"search_term": "spring"})
+        self.assertEqual(response.data[0]["matched_name"], "Spring Onion")
+
+
+class TitleSuggestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="u", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pad_thai = Recipe.objects.create(title="Pad Thai", cuisine="Thai", instructions="Cook.")
+            self.padron = Recipe.objects.create(
+                title="Padron Peppers", cuisine="Spanish", instructions="Cook.", rating_sum=45, rating_count=10
+            )
+            self.curry = Recipe.objects.create(title="Green Curry", cuisine="Thai", instructions="Cook.")
+
+    def titles(self, term):
+        return [row["title"] for row in title_suggest_index.suggest(term)]
+
+    def test_prefixes_ranked_by_rating_and_multi_word(self):
+        self.assertEqual(self.titles("pad"), ["Padron Peppers", "Pad Thai"])
+        self.assertEqual(self.titles("thai"), ["Green Curry", "Pad Thai"])
+        self.assertEqual(self.titles("pad th"), ["Pad Thai"])
+        self.assertEqual(self.titles("xyz"), [])
+
+    def test_saves_patch_the_index_without_a_rebuild(self):
+        data = title_suggest_index.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.curry.title = "Panang Curry"
+            self.curry.save()
+            Recipe.objects.create(title="Pancakes", instructions="Cook.")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pad_thai.delete()
+
+        self.assertIs(title_suggest_index.get(), data)
+        self.assertEqual(self.titles("pa"), ["Padron Peppers", "Panang Curry", "Pancakes"])
+        self.assertEqual(self.titles("green"), [])
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/recipes/suggest/", {"q": "panc"})
+        self.assertEqual([row["title"] for row in response.data], ["Pancakes"])
+
+    def test_ratings_and_favorites_rescore_suggestions(self):
+        data = title_suggest_index.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(5):
+                Feedback.objects.create(user=self.user, recipe=self.pad_thai, rating=5)
+            RecipePreference.objects.create(user=self.user, recipe=self.pad_thai, preference="favorite")
+        self.assertIs(title_suggest_index.get(), data)
+        self.assertEqual(self.titles("pad"), ["Pad Thai", "Padron Peppers"])
+        self.assertEqual(title_suggest_index.suggest("pad thai")[0]["average_rating"], 5)
+
+
+class RecipeFacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="u", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vegan = Tag.objects.create(name="vegan")
+            self.quick = Tag.objects.create(name="quick")
+            self.salad = Recipe.objects.create(title="Salad", cuisine="Greek", total_time=10, instructions="Mix.")
+            self.curry = Recipe.objects.create(title="Curry", cuisine="Thai", total_time=45, instructions="Cook.")
+            self.stew = Recipe.objects.create(
+                title="Stew", cuisine="Thai", total_time=120, fodmap_friendly=False, instructions="Cook."
+            )
+            self.salad.tags.add(self.vegan, self.quick)
+            self.curry.tags.add(self.vegan)
+
+    def facets(self, **params):
+        response = self.client.get("/api/recipes/facets/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def values(self, data, facet):
+        key = "name" if facet == "tags" else "value"
+        return {row[key]: row["count"] for row in data["facets"][facet]}
+
+    def test_counts_every_facet_for_the_filtered_set(self):
+        recipe_facet_index.get()
+        with self.assertNumQueries(0):
+            data = self.facets(cuisine="Thai")
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(self.values(data, "tags"), {"vegan": 1})
+        self.assertEqual(self.values(data, "fodmap_friendly"), {"true": 1, "false": 1})
+        self.assertEqual([row["value"] for row in data["facets"]["total_time"]], ["31-60", "60+"])
+
+        data = self.facets(tags=str(self.vegan.pk), fodmap_friendly="true")
+        self.assertEqual(self.values(data, "cuisine"), {"Greek": 1, "Thai": 1})
+        self.assertEqual(self.facets(search="sal")["count"], 1)
+
+    def test_recipe_and_tag_changes_patch_the_bitmaps(self):
+        data = recipe_facet_index.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.stew.tags.add(self.quick)
+            self.vegan.recipe_set.remove(self.curry)
+            self.salad.delete()
+            Recipe.objects.create(title="Soup", cuisine="Thai", total_time=20, instructions="Cook.")
+        self.assertIs(recipe_facet_index.get(), data)
+
+        data = self.facets()
+        self.assertEqual(data["count"], 3)
+        self.assertEqual(self.values(data, "tags"), {"quick": 1})
+        self.assertEqual(self.values(data, "cuisine"), {"Thai": 3})
+        self.assertEqual(self.values(data, "total_time"), {"16-30": 1, "31-60": 1, "60+": 1})
+
+
+class TagExpressionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="u", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            tags = {name: Tag.objects.create(name=name) for name in ["vegan", "quick", "spicy", "one pot"]}
+            self.recipes = {}
+            for title, names in [
+                ("Salad", ["vegan", "quick"]),
+                ("Chili", ["vegan", "spicy", "one pot"]),
+                ("Dal", ["vegan", "one pot"]),
+                ("Steak", ["quick"]),
+            ]:
+                recipe = Recipe.objects.create(title=title, instructions="Cook.")
+                recipe.tags.set(tags[name] for name in names)
+            chilli = Ingredient.objects.create(name="Chilli")
+            chilli.tags.add(tags["spicy"], tags["vegan"])
+            Ingredient.objects.create(name="Rice").tags.add(tags["vegan"])
+
+    def titles(self, expression):
+        response = self.client.get("/api/recipes/", {"tag_expr": expression, "fields": "title"})
+        self.assertEqual(response.status_code, 200, response.data)
+        return sorted(row["title"] for row in response.data["results"])
+
+    def test_boolean_expressions(self):
+        self.assertEqual(self.titles("vegan AND NOT spicy"), ["Dal", "Salad"])
+        self.assertEqual(self.titles('quick OR "one pot" AND spicy'), ["Chili", "Salad", "Steak"])
+        self.assertEqual(self.titles('(quick OR "One Pot") spicy'), ["Chili"])
+        self.assertEqual(self.titles("NOT vegan"), ["Steak"])
+        self.assertEqual(self.titles("missing"), [])
+
+    def test_ingredients_and_facets_accept_expressions(self):
+        response = self.client.get("/api/ingredients/", {"tag_expr": "vegan not spicy"})
+        self.assertEqual([row["name"] for row in response.data["results"]], ["Rice"])
+        response = self.client.get("/api/recipes/facets/", {"tag_expr": "vegan AND NOT spicy"})
+        self.assertEqual(response.data["count"], 2)
+
+    def test_syntax_errors_are_rejected(self):
+        for expression in ["vegan AND", "(vegan", "vegan)", "NOT"]:
+            response = self.client.get("/api/recipes/", {"tag_expr": expression})
+            self.assertEqual(response.status_code, 400, expression)
+
+    def test_deep_nesting_is_rejected(self):
+        self.assertEqual(parse("(" * MAX_NESTING_DEPTH + "vegan" + ")" * MAX_NESTING_DEPTH), ("tag", "vegan"))
+        for expression in ["(" * 499 + "a", "NOT " * 100 + "a", "(NOT " * 17 + "a" + ")" * 17]:
+            with self.assertRaises(TagExpressionError):
+                parse(expression)
+        response = self.client.get("/api/recipes/", {"tag_expr": "(" * 499 + "a"})
+        self.assertEqual(response.status_code, 400)
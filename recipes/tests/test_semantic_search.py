@@ -0,0 +1,122 @@
+import importlib.util
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from ..models import Recipe, Ingredient, RecipeIngredient, Tag, DietType, UserProfile
+from ..models.policy import DietTypeRule
+from ..search import semantic
+from ..search.semantic import semantic_index
+
+User = get_user_model()
+
+
+class SemanticSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings_override = override_settings(SEMANTIC_INDEX_DIR=self.directory, SEMANTIC_SEARCH_MODEL="")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.meat = Tag.objects.create(name="meat")
+        self.ing = {name: Ingredient.objects.create(name=name) for name in ["chicken", "rice", "beef", "oats", "milk"]}
+        self.ing["chicken"].tags.add(self.meat)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.stir_fry = self.recipe("Chicken Stir Fry", 20, True, ["chicken", "rice"])
+            self.stew = self.recipe("Beef Stew", 180, False, ["beef"])
+            self.porridge = self.recipe("Porridge", 10, True, ["oats", "milk"])
+        self.user = User.objects.create_user(username="u", password="x")
+        self.client = APIClient()
+
+    def recipe(self, title, total_time, fodmap_friendly, names):
+        recipe = Recipe.objects.create(
+            title=title, total_time=total_time, fodmap_friendly=fodmap_friendly, instructions="Cook."
+        )
+        for name in names:
+            RecipeIngredient.objects.create(recipe=recipe, ingredient=self.ing[name], quantity="1")
+        return recipe
+
+    def search(self, q):
+        response = self.client.get("/api/recipes/semantic/", {"q": q})
+        self.assertEqual(response.status_code, 200)
+        return [row["title"] for row in response.data]
+
+    def test_natural_language_query_ranks_matching_recipe_first(self):
+        self.assertEqual(self.search("quick chicken dinner"), [])
+        call_command("build_semantic_index", stdout=StringIO())
+
+        self.assertEqual(self.search("quick gut-friendly chicken dinner")[0], "Chicken Stir Fry")
+        self.assertEqual(self.search("slow cooked beef")[0], "Beef Stew")
+
+    def test_saved_recipes_are_appended_and_newest_row_wins(self):
+        call_command("build_semantic_index", stdout=StringIO())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe("Chicken Noodle Soup", 25, True, ["chicken"])
+            self.porridge.title = "Overnight Oats with Milk"
+            self.porridge.save()
+
+        self.assertIn("Chicken Noodle Soup", self.search("chicken soup"))
+        results = self.search("overnight oats")
+        self.assertEqual(results[0], "Overnight Oats with Milk")
+        self.assertEqual(results.count("Overnight Oats with Milk"), 1)
+
+    def test_deleted_recipes_leave_the_index(self):
+        call_command("build_semantic_index", stdout=StringIO())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.stew.soft_delete()
+        self.assertNotIn(self.stew.pk, {pk for pk, _ in semantic_index.search("slow cooked beef stew", k=10)})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.stew.restore()
+        self.assertEqual(self.search("slow cooked beef stew")[0], "Beef Stew")
+
+    def test_limit_is_at_least_one(self):
+        call_command("build_semantic_index", stdout=StringIO())
+        response = self.client.get("/api/recipes/semantic/", {"q": "chicken", "limit": "-5"})
+        self.assertEqual(len(response.data), 1)
+
+    def test_results_respect_the_users_diet_policy(self):
+        call_command("build_semantic_index", stdout=StringIO())
+        vegetarian, _ = DietType.objects.get_or_create(name="Vegetarian")
+        DietTypeRule.objects.create(diet_type=vegetarian, tag=self.meat, rule=DietTypeRule.Rule.AVOID)
+        UserProfile.objects.get(user=self.user).diet_types.add(vegetarian)
+
+        self.assertIn("Chicken Stir Fry", self.search("chicken"))
+        self.client.force_authenticate(user=self.user)
+        self.assertNotIn("Chicken Stir Fry", self.search("chicken"))
+
+    def test_users_without_a_profile_get_unfiltered_results(self):
+        call_command("build_semantic_index", stdout=StringIO())
+        UserProfile.objects.filter(user=self.user).delete()
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk))
+        self.assertIn("Chicken Stir Fry", self.search("chicken"))
+
+    def test_ivf_probing_finds_the_same_best_match(self):
+        with mock.patch.object(semantic, "IVF_MIN_ROWS", 2):
+            call_command("build_semantic_index", stdout=StringIO())
+        self.assertIsNotNone(semantic_index.get().centroids)
+        self.assertEqual(self.search("quick gut-friendly chicken dinner")[0], "Chicken Stir Fry")
+
+    def test_encoder_needs_a_keras_path(self):
+        with self.assertRaises(CommandError):
+            call_command("train_semantic_encoder", os.path.join(self.directory, "model.h5"), stdout=StringIO())
+
+    @skipUnless(importlib.util.find_spec("keras") and importlib.util.find_spec("tensorflow"), "Keras is not installed")
+    def test_trained_encoder_is_used_for_the_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(10):
+                self.recipe(f"Chicken Rice Bowl {i}", 25, True, ["chicken", "rice"])
+        path = os.path.join(self.directory, "encoder.keras")
+        call_command("train_semantic_encoder", path, "--epochs", "2", "--dim", "8", stdout=StringIO())
+        with override_settings(SEMANTIC_SEARCH_MODEL=path):
+            self.assertEqual(semantic.get_encoder().dim, 8)
+            call_command("build_semantic_index", stdout=StringIO())
+            self.assertEqual(len(self.search("chicken")), 10)
@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+from ..models import Ingredient, Inventory, Recipe, RecipeIngredient, ShoppingListItem, Unit
+
+User = get_user_model()
+
+
+class ShoppingListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            grams = Unit.objects.create(name="g", unit_type="weight", to_base_factor=1.0)
+            self.rice, self.beans, self.oil = (Ingredient.objects.create(name=n) for n in ("rice", "beans", "oil"))
+            self.pilaf = Recipe.objects.create(title="Pilaf", instructions="Cook.")
+            self.chili = Recipe.objects.create(title="Chili", instructions="Cook.")
+            for recipe, ingredient, quantity in [
+                (self.pilaf, self.rice, "200"),
+                (self.pilaf, self.oil, "20"),
+                (self.chili, self.beans, "400"),
+                (self.chili, self.oil, "10"),
+            ]:
+                RecipeIngredient.objects.create(recipe=recipe, ingredient=ingredient, quantity=quantity, unit=grams)
+        self.grams = grams
+        self.user = User.objects.create_user(username="u", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.post(
+            "/api/shopping-lists/", {"name": "Week", "recipe_ids": [str(self.pilaf.pk)]}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.list_id = response.data["id"]
+
+    def url(self, name=""):
+        return f"/api/shopping-lists/{self.list_id}/" + (f"{name}/" if name else "")
+
+    def items(self, data):
+        return {item["ingredient_name"]: item for item in data["items"]}
+
+    def test_create_builds_items(self):
+        data = self.client.get(self.url()).data
+        self.assertEqual(data["version"], 1)
+        self.assertEqual({n: i["to_buy"] for n, i in self.items(data).items()}, {"rice": 200.0, "oil": 20.0})
+
+    def test_mutations_return_only_affected_items(self):
+        oil = ShoppingListItem.objects.get(ingredient=self.oil)
+        response = self.client.post(self.url("check"), {"item_ids": [str(oil.pk)]}, format="json")
+        self.assertEqual((response.data["version"], list(self.items(response.data))), (2, ["oil"]))
+
+        response = self.client.post(self.url("add_recipes"), {"recipe_ids": [str(self.chili.pk)]}, format="json")
+        changed = self.items(response.data)
+        self.assertEqual(set(changed), {"beans", "oil"})
+        self.assertEqual((changed["oil"]["to_buy"], changed["oil"]["checked"]), (30.0, False))
+
+        response = self.client.post(self.url("remove_recipes"), {"recipe_ids": [str(self.pilaf.pk)]}, format="json")
+        changed = self.items(response.data)
+        self.assertEqual((set(changed), changed["rice"]["removed"]), ({"rice", "oil"}, True))
+
+        response = self.client.get(self.url("changes"), {"since": 2})
+        self.assertEqual(response.data["version"], 4)
+        self.assertEqual(set(self.items(response.data)), {"beans", "oil", "rice"})
+
+    def test_sync_inventory_updates_changed_items(self):
+        Inventory.objects.create(user=self.user, ingredient=self.rice, quantity=150, unit=self.grams)
+        response = self.client.post(self.url("sync_inventory"))
+        [rice] = response.data["items"]
+        self.assertEqual((rice["ingredient_name"], rice["to_buy"], rice["inventory_quantity"]), ("rice", 50.0, 150.0))
+
+        self.assertEqual(self.client.post(self.url("sync_inventory")).data["items"], [])
+
+    def test_lists_are_private(self):
+        other = APIClient()
+        other.force_authenticate(user=User.objects.create_user(username="v", password="x"))
+        self.assertEqual(other.get(self.url("changes")).status_code, 404)
+        self.assertEqual(other.post(self.url("sync_inventory")).status_code, 404)
@@ -0,0 +1,71 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+from ..models import Recipe, Ingredient, RecipeIngredient, RecipeSimilarity, Tag
+
+
+class SimilarRecipesTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.ing = {
+            name: Ingredient.objects.create(name=name)
+            for name in ["rice", "egg", "soy sauce", "scallion", "pasta", "tomato", "basil", "salt"]
+        }
+        self.quick = Tag.objects.create(name="quick")
+        self.fried_rice = self.recipe("Fried Rice", "Chinese", ["rice", "egg", "soy sauce", "salt"])
+        self.egg_rice = self.recipe("Egg Rice", "Chinese", ["rice", "egg", "soy sauce", "scallion", "salt"])
+        self.pasta = self.recipe("Pasta", "Italian", ["pasta", "tomato", "basil", "salt"])
+        self.sugo = self.recipe("Sugo", "Italian", ["pasta", "tomato", "salt"])
+        self.plain = self.recipe("Plain Rice", "", ["rice"])
+        self.pasta.tags.add(self.quick)
+        self.sugo.tags.add(self.quick)
+
+    def recipe(self, title, cuisine, names):
+        recipe = Recipe.objects.create(title=title, cuisine=cuisine, instructions="Cook.")
+        for name in names:
+            RecipeIngredient.objects.create(recipe=recipe, ingredient=self.ing[name], quantity="1")
+        return recipe
+
+    def neighbors(self, recipe):
+        return list(
+            RecipeSimilarity.objects.filter(recipe=recipe).order_by("rank").values_list("neighbor_id", flat=True)
+        )
+
+    def snapshot(self):
+        return {
+            (row.recipe_id, row.rank): (row.neighbor_id, round(row.score, 6))
+            for row in RecipeSimilarity.objects.all()
+        }
+
+    def test_ranks_by_shared_weighted_features(self):
+        call_command("compute_similar_recipes", "--top", "3", stdout=StringIO())
+
+        self.assertEqual(self.neighbors(self.fried_rice), [self.egg_rice.pk, self.plain.pk, self.sugo.pk])
+        self.assertEqual(self.neighbors(self.pasta)[0], self.sugo.pk)
+        self.assertNotIn(self.pasta.pk, self.neighbors(self.pasta))
+        top = RecipeSimilarity.objects.get(recipe=self.fried_rice, rank=1)
+        self.assertGreater(top.score, 0.8)
+        self.assertLessEqual(top.score, 1.0)
+
+    def test_incremental_run_matches_full_recompute(self):
+        call_command("compute_similar_recipes", "--top", "2", stdout=StringIO())
+        for name in ["rice", "egg", "soy sauce"]:
+            RecipeIngredient.objects.create(recipe=self.sugo, ingredient=self.ing[name], quantity="1")
+        self.egg_rice.soft_delete()
+
+        call_command("compute_similar_recipes", "--top", "2", stdout=StringIO())
+        incremental = self.snapshot()
+        self.assertNotIn(self.egg_rice.pk, {neighbor for neighbor, _ in incremental.values()})
+        self.assertIn(self.sugo.pk, self.neighbors(self.fried_rice))
+
+        call_command("compute_similar_recipes", "--top", "2", "--full", stdout=StringIO())
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_similar_action_is_one_query(self):
+        call_command("compute_similar_recipes", stdout=StringIO())
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/recipes/{self.pasta.pk}/similar/")
+        self.assertEqual(response.data[0]["recipe_id"], self.sugo.pk)
+        self.assertEqual(response.data[0]["title"], "Sugo")
+        self.assertEqual(self.client.get("/api/recipes/not-a-uuid/similar/").status_code, 404)
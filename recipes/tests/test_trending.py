@@ -0,0 +1,49 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+from ..models import Recipe, Feedback, RecipePreference, TrendingRecipe
+
+User = get_user_model()
+
+
+class ComputeTrendingTests(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f"u{i}", password="x") for i in range(3)]
+        self.fresh = Recipe.objects.create(title="Fresh Curry", instructions="Cook.", cuisine="Thai", fodmap_friendly=True)
+        self.stale = Recipe.objects.create(title="Old Stew", instructions="Cook.", cuisine="Irish", fodmap_friendly=False)
+
+        for user in self.users:
+            Feedback.objects.create(user=user, recipe=self.fresh, rating=4)
+            Feedback.objects.create(user=user, recipe=self.stale, rating=5)
+        RecipePreference.objects.create(user=self.users[0], recipe=self.fresh, preference="favorite")
+
+        # Same volume of events, but a week old
+        Feedback.objects.filter(recipe=self.stale).update(created_at=timezone.now() - timedelta(days=7))
+
+    def test_decayed_ranking_and_scopes(self):
+        call_command("compute_trending", stdout=StringIO())
+
+        overall = list(
+            TrendingRecipe.objects.filter(scope=TrendingRecipe.Scope.ALL).values_list("recipe_id", flat=True)
+        )
+        self.assertEqual(overall, [self.fresh.pk, self.stale.pk])
+        self.assertTrue(
+            TrendingRecipe.objects.filter(scope=TrendingRecipe.Scope.CUISINE, scope_value="irish", rank=1).exists()
+        )
+        self.assertEqual(
+            TrendingRecipe.objects.get(scope=TrendingRecipe.Scope.FODMAP, scope_value="true").recipe_id,
+            self.fresh.pk,
+        )
+
+    def test_trending_endpoint_reads_rollup(self):
+        call_command("compute_trending", stdout=StringIO())
+        client = APIClient()
+
+        with self.assertNumQueries(1):
+            response = client.get("/api/recipes/trending/", {"cuisine": "Thai"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["title"] for row in response.json()], ["Fresh Curry"])
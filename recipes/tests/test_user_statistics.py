@@ -0,0 +1,50 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from ..models import Recipe, Feedback, RecipePreference, UserStatistics
+
+User = get_user_model()
+
+
+class UserStatisticsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="u", password="x")
+        self.thai = Recipe.objects.create(title="Curry", instructions="Cook.", cuisine="Thai", fodmap_friendly=True)
+        self.irish = Recipe.objects.create(title="Stew", instructions="Cook.", cuisine="Irish", fodmap_friendly=False)
+        Feedback.objects.create(user=self.user, recipe=self.thai, rating=4)
+
+    def test_rebuild_then_incremental_updates(self):
+        call_command("rebuild_user_statistics", stdout=StringIO())
+        stats = UserStatistics.objects.get(pk=self.user.pk)
+        self.assertEqual((stats.ratings_count, stats.rating_sum, stats.fodmap_recipes_tried), (1, 4, 1))
+        self.assertEqual(stats.cuisine_counts, {"Thai": 1})
+
+        fb = Feedback.objects.create(user=self.user, recipe=self.irish, rating=2)
+        pref = RecipePreference.objects.create(user=self.user, recipe=self.irish, preference="favorite")
+        stats.refresh_from_db()
+        self.assertEqual((stats.favorites_count, stats.ratings_count, stats.rating_sum), (1, 2, 6))
+        self.assertEqual(stats.cuisine_counts, {"Thai": 1, "Irish": 2})
+
+        fb.soft_delete()
+        pref.delete()
+        stats.refresh_from_db()
+        self.assertEqual((stats.favorites_count, stats.ratings_count, stats.rating_sum), (0, 1, 4))
+        self.assertEqual(stats.cuisine_counts, {"Thai": 1})
+
+    def test_endpoint_is_a_single_read(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        first = client.get("/user/statistics/")
+        self.assertEqual(first.status_code, 200)
+
+        with self.assertNumQueries(1):
+            response = client.get("/user/statistics/")
+        self.assertEqual(response.json(), {
+            "total_favorites": 0,
+            "total_rated": 1,
+            "average_rating": 4.0,
+            "fodmap_recipes_tried": 1,
+            "top_cuisines": [{"cuisine": "Thai", "count": 1}],
+        })
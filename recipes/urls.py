@@ -16,8 +16,10 @@ from .views.viewsets import (
     FodmapCategoryViewSet,
     UnitViewSet,
     RecipeIngredientViewSet,
+    IngestionJobViewSet,
 )
 
+from .views.shopping_list_views import ShoppingListViewSet
 from .views.update_recipe_view import UpdateFODMAPRecipeView
 from .views.generate_recipe_view import FODMAPRecipeGeneratorView
 
@@ -41,6 +43,8 @@ router.register(
 )
 router.register(r"fodmap-categories", FodmapCategoryViewSet)
 router.register(r"units", UnitViewSet)
+router.register(r"shopping-lists", ShoppingListViewSet, basename="shopping-lists")
+router.register(r"ingestion-jobs", IngestionJobViewSet, basename="ingestion-jobs")
 
 urlpatterns = [
     path(
@@ -19,6 +19,7 @@ from ..models import (
 )
 from ..policy.validation import check_recipe_against_policy
 from ..policy.llm_prompts import build_generation_prompt, build_repair_prompt
+from ..measurements.parsing import split_quantity
 from jsonschema import validate, ValidationError as JSONSchemaValidationError
 
 
@@ -132,13 +133,7 @@ class FODMAPRecipeGeneratorView(APIView):
                 name = parts[0].strip() if parts else ""
                 quantity_unit = parts[1].strip() if len(parts) > 1 else ""
 
-                quantity_match = re.search(r"^([\d./]+)\s*(.*)$", quantity_unit)
-                if quantity_match:
-                    quantity = quantity_match.group(1)
-                    unit_name = quantity_match.group(2)
-                else:
-                    quantity = quantity_unit
-                    unit_name = ""
+                quantity, unit_name = split_quantity(quantity_unit)
 
             if name:
                 ingredient, _ = Ingredient.objects.get_or_create(name=name)
@@ -1,10 +1,23 @@
-from rest_framework import status
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.utils.encoders import JSONEncoder
+from django.db import transaction
 from django.db.models import F
-from ..models import Recipe, RecipeIngredient
-import re
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from ..measurements.shopping import create_shopping_list, refresh_items, shopping_lines
+from ..models import Recipe, RecipeIngredient, ShoppingList, ShoppingListItem
+from ..serializers import (
+    ShoppingListSerializer,
+    ShoppingListItemSerializer,
+    ShoppingListRecipesSerializer,
+    ShoppingListCheckSerializer,
+    RecipeIdsSerializer,
+)
 
 
 class ShoppingListView(APIView):
@@ -12,84 +25,135 @@ class ShoppingListView(APIView):
 
     def post(self, request):
         """Create shopping list from recipe IDs"""
-        recipe_ids = request.data.get("recipe_ids", [])
-        if not recipe_ids:
+        if not request.data.get("recipe_ids"):
             return Response(
                 {"error": "No recipe IDs provided"}, status=status.HTTP_400_BAD_REQUEST
             )
+        # Errors raised once streaming has started would truncate a 200 response
+        serializer = RecipeIdsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        recipe_ids = serializer.validated_data["recipe_ids"]
 
-        ingredients = (
-            RecipeIngredient.objects.filter(recipe_id__in=recipe_ids)
-            .select_related("ingredient", "unit")
-            .values(
-                "ingredient__name",
-                "ingredient__id",
-                "unit__name",
-                "quantity",
-                "recipe__title",
-            )
-        )
+        lines = shopping_lines(recipe_ids, request.user)
+        return StreamingHttpResponse(_stream_json(lines, len(recipe_ids)), content_type="application/json")
+
+
+def _stream_json(lines, recipe_count):
+    encoder = JSONEncoder()
+    yield '{"shopping_list": ['
+    total = 0
+    for line in lines:
+        yield ("," if total else "") + encoder.encode(line)
+        total += 1
+    yield f'], "total_items": {total}, "recipe_count": {recipe_count}}}'
+
+
+class ShoppingListViewSet(viewsets.ModelViewSet):
+    """Saved shopping lists with incremental updates.
+
+    Every mutation bumps the list's version and rewrites only the items it
+    affects. The mutation actions respond with the changed items, and
+    GET changes/?since=<version> returns everything changed after a version
+    the client already has, including removed items.
+    """
 
-        shopping_list = {}
-        for item in ingredients:
-            key = f"{item['ingredient__name']}_{item['unit__name'] or 'unit'}"
-
-            if key not in shopping_list:
-                shopping_list[key] = {
-                    "ingredient_id": item["ingredient__id"],
-                    "ingredient": item["ingredient__name"],
-                    "unit": item["unit__name"],
-                    "quantities": [],
-                    "recipes": [],
-                }
-            shopping_list[key]["quantities"].append(item["quantity"])
-            shopping_list[key]["recipes"].append(item["recipe__title"])
-
-        from ..models import Inventory
-
-        inventory_items = Inventory.objects.filter(
-            user=request.user,
-            ingredient__in=[item["ingredient_id"] for item in shopping_list.values()],
-        ).values("ingredient__id", "quantity", "unit__name")
-
-        inventory_map = {item["ingredient__id"]: item for item in inventory_items}
-
-        final_list = []
-        for item in shopping_list.values():
-            in_inventory = inventory_map.get(item["ingredient_id"])
-
-            final_list.append(
-                {
-                    "ingredient": item["ingredient"],
-                    "unit": item["unit"],
-                    "quantity": item["quantity"],
-                    "total_quantity": self._sum_quantities(item["quantities"]),
-                    "recipes": list(set(item["recipes"])),
-                    "in_inventory": bool(in_inventory),
-                    "inventory_quantity": (
-                        in_inventory["quantity"] if in_inventory else 0
-                    ),
-                    "inventory_unit": (
-                        in_inventory["unit__name"] if in_inventory else None
-                    ),
-                }
+    serializer_class = ShoppingListSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return ShoppingListSerializer.eager_loading(ShoppingList.objects.filter(user=self.request.user))
+
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        serializer.instance = create_shopping_list(self.request.user, data.get("recipes", []), data.get("name", ""))
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            shopping_list = serializer.save(version=F("version") + 1)
+            shopping_list.refresh_from_db(fields=["version"])
+            if "recipes" in serializer.validated_data:
+                refresh_items(shopping_list, shopping_list.version)
+
+    def _mutate(self, change):
+        """Apply change(shopping_list, version) under a row lock and respond with what it changed"""
+        with transaction.atomic():
+            shopping_list = get_object_or_404(
+                ShoppingList.objects.select_for_update().filter(user=self.request.user), pk=self.kwargs["pk"]
             )
+            previous = shopping_list.version
+            shopping_list.version += 1
+            shopping_list.save(update_fields=["version", "updated_at"])
+            change(shopping_list, shopping_list.version)
+        return self._changes_since(shopping_list, previous)
+
+    def _changes_since(self, shopping_list, since):
+        items = ShoppingListItem.all_objects.filter(shopping_list=shopping_list, version__gt=since).select_related(
+            "ingredient"
+        )
         return Response(
             {
-                "shopping_list": final_list,
-                "total_items": len(final_list),
-                "recipe_count": len(recipe_ids),
+                "id": shopping_list.pk,
+                "version": shopping_list.version,
+                "since": since,
+                "items": ShoppingListItemSerializer(items.order_by("ingredient__name"), many=True).data,
             }
         )
 
-    def _sum_quantities(self, quantities):
-        """Try to sum quantities"""
-        total = 0
-        for q in quantities:
-            try:
-                match = re.search(r"([\d.]+)", str(q))
-                if match:
-                    total += float(match.group(1))
-            except:
-                pass
-        return total if total > 0 else "Multiple"
+    @action(detail=True, methods=["get"])
+    def changes(self, request, pk=None):
+        """Items changed after ?since=<version>; since=0 returns every item ever on the list"""
+        try:
+            since = int(request.query_params.get("since", 0))
+        except ValueError:
+            return Response({"error": "since must be an integer version"}, status=status.HTTP_400_BAD_REQUEST)
+        shopping_list = get_object_or_404(ShoppingList.objects.filter(user=request.user), pk=pk)
+        return self._changes_since(shopping_list, since)
+
+    @action(detail=True, methods=["post"])
+    def add_recipes(self, request, pk=None):
+        recipes = self._recipes(request)
+
+        def change(shopping_list, version):
+            shopping_list.recipes.add(*recipes)
+            refresh_items(shopping_list, version, _ingredient_ids(recipes))
+
+        return self._mutate(change)
+
+    @action(detail=True, methods=["post"])
+    def remove_recipes(self, request, pk=None):
+        recipes = self._recipes(request)
+
+        def change(shopping_list, version):
+            shopping_list.recipes.remove(*recipes)
+            refresh_items(shopping_list, version, _ingredient_ids(recipes))
+
+        return self._mutate(change)
+
+    @action(detail=True, methods=["post"])
+    def check(self, request, pk=None):
+        """Check off (or with checked=false, uncheck) items by id"""
+        serializer = ShoppingListCheckSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        def change(shopping_list, version):
+            shopping_list.items.filter(pk__in=serializer.validated_data["item_ids"]).update(
+                checked=serializer.validated_data["checked"], version=version, updated_at=timezone.now()
+            )
+
+        return self._mutate(change)
+
+    @action(detail=True, methods=["post"])
+    def sync_inventory(self, request, pk=None):
+        """Recompute to_buy against the current inventory; only items whose numbers moved are returned"""
+        return self._mutate(refresh_items)
+
+    @staticmethod
+    def _recipes(request):
+        serializer = ShoppingListRecipesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data["recipe_ids"]
+
+
+def _ingredient_ids(recipes):
+    return set(RecipeIngredient.objects.filter(recipe__in=recipes).values_list("ingredient_id", flat=True))
@@ -1,9 +1,10 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
-from django.db.models import Count, Avg, Q
-from ..models import Recipe, Feedback, RecipePreference
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from ..models import UserStatistics
+from ..aggregates import rebuild_user_statistics
+from ..cache_utils import CacheMetrics
 
 
 class UserStatisticsView(APIView):
@@ -11,38 +12,25 @@ class UserStatisticsView(APIView):
 
     def get(self, request):
         """Get user's recipe statistics"""
-        user = request.user
-
-        total_favorites = RecipePreference.objects.filter(
-            user=user, preference="favorite"
-        ).count()
-
-        total_rated = Feedback.objects.filter(user=user).count()
-
-        avg_rating = (
-            Feedback.objects.filter(user=user).aggregate(avg=Avg("rating"))["avg"] or 0
-        )
-
-        fodmap_recipes_tried = Feedback.objects.filter(
-            user=user, recipe__fodmap_friendly=True
-        ).count()
-
-        cuisine_stats = (
-            Recipe.objects.filter(
-                Q(user_preferences__user=user, user_preferences__preference="favorite")
-                | Q(feedback__user=user)
-            )
-            .values("cuisine")
-            .annotate(count=Count("id"))
-            .order_by("-count")[:5]
-        )
+        stats = UserStatistics.objects.filter(pk=request.user.pk).first()
+        if stats is None:
+            rebuild_user_statistics([request.user.pk])
+            stats = UserStatistics.objects.get(pk=request.user.pk)
 
         return Response(
             {
-                "total_favorites": total_favorites,
-                "total_rated": total_rated,
-                "average_rating": avg_rating,
-                "fodmap_recipes_tried": fodmap_recipes_tried,
-                "top_cuisines": cuisine_stats,
+                "total_favorites": stats.favorites_count,
+                "total_rated": stats.ratings_count,
+                "average_rating": stats.average_rating,
+                "fodmap_recipes_tried": stats.fodmap_recipes_tried,
+                "top_cuisines": stats.top_cuisines(),
             }
         )
+
+
+class CacheMetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """Get cache hit/miss/fill/invalidation metrics per key family"""
+        return Response({"families": CacheMetrics.snapshot()})
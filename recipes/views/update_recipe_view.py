@@ -12,6 +12,7 @@ from ..models import (
     FoodPreference,
     Unit
 )
+from ..measurements.parsing import split_quantity
 
 class UpdateFODMAPRecipeView(APIView):
     """View for updating FODMAP-friendly recipes"""
@@ -87,13 +88,7 @@ class UpdateFODMAPRecipeView(APIView):
                 quantity_unit = parts[1].strip() if len(parts) > 1 else ""
                 
                 # Try to separate quantity and unit
-                quantity_match = re.search(r"^([\d./]+)\s*(.*)$", quantity_unit)
-                if quantity_match:
-                    quantity = quantity_match.group(1)
-                    unit_name = quantity_match.group(2)
-                else:
-                    quantity = quantity_unit
-                    unit_name = ""
+                quantity, unit_name = split_quantity(quantity_unit)
             
             if name:
                 # Get or create ingredient
@@ -1,5 +1,7 @@
 # pylint: disable=no-member
 
+import uuid
+from dataclasses import asdict
 from logging import config
 from rest_framework import viewsets, permissions, status, generics
 from rest_framework.views import APIView
@@ -12,7 +14,7 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django_ratelimit.decorators import ratelimit
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
-from django.core.cache import cache
+from django.db.models import F, Prefetch
 from ..models import (
     Recipe,
     Ingredient,
@@ -28,9 +30,15 @@ from ..models import (
     FodmapCategory,
     Unit,
     RecipeIngredient,
+    TrendingRecipe,
+    RecipeSimilarity,
+    UserRecommendation,
+    IngestionJob,
+    rating_average,
 )
 from ..serializers import (
     RecipeSerializer,
+    RecipeListSerializer,
     IngredientSerializer,
     TagSerializer,
     InventorySerializer,
@@ -44,10 +52,27 @@ from ..serializers import (
     FodmapCategorySerializer,
     UnitSerializer,
     RecipeIngredientSerializer,
+    IngestionJobSerializer,
 )
 from dj_rest_auth.registration.views import SocialLoginView
 from allauth.socialaccount.providers.google.views import GoogleOAuth2Adapter
 from ..permissions import IsOwnerOrReadOnly, IsAuthenticatedOrReadOnly
+from ..cache_utils import CacheKeys, get_or_fill
+from ..query_plans import QueryPlan, QueryPlanMixin
+from ..search.fulltext import FullTextSearchFilter, SEARCH_PARAM
+from ..search.pantry import pantry_index
+from ..search.autocomplete import autocomplete_index
+from ..search.suggest import title_suggest_index
+from ..search.facets import recipe_facet_index, ingredient_tag_index
+from ..search.semantic import semantic_index
+from ..search.tag_expr import TAG_EXPR_PARAM, TagExpressionError, TagExpressionFilter, evaluate, parse
+from ..policy.policy import compile_policy_for_user, filter_recipe_ids_by_policy
+from ..planning.planner import DEFAULT_DAYS, DEFAULT_MAX_PER_CUISINE, DEFAULT_MAX_PER_TAG, MAX_DAYS, plan_meals
+from ..measurements.shopping import create_shopping_list
+from ..ingestion.inventory import ADD, SET, MAX_ITEMS as MAX_UPSERT_ITEMS, bulk_upsert_inventory
+from ..ingestion.barcodes import MAX_IMAGE_BYTES, MAX_IMAGES as MAX_BARCODE_IMAGES, ingest_barcode_images
+from ..ingestion.ocr import ocr_available
+from ..ingestion.receipts import MAX_IMAGES as MAX_RECEIPT_IMAGES, start_receipt_job
 
 class GoogleLogin(SocialLoginView):
     adapter_class = GoogleOAuth2Adapter
@@ -62,6 +87,9 @@ class IngredientViewSet(BaseViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
 
+    filter_backends = BaseViewSet.filter_backends + [TagExpressionFilter]
+    tag_index = ingredient_tag_index
+
     filterset_fields = ["category__id", "fodmap_category__id"]
 
     search_fields = ["name"]
@@ -69,15 +97,37 @@ class IngredientViewSet(BaseViewSet):
     ordering_fields = ["name", "category__name"]
     ordering = ["name"]
 
-    @action(detail=False, methods=["post"])
+    @action(detail=False, methods=["get", "post"])
     def auto_complete(self, request):
-        search_term = request.data.get("search_term", "")
-        results = self.queryset.filter(name__icontains=search_term)[:10]
-        serializer = self.get_serializer(results, many=True)
-        return Response(serializer.data)
+        """Suggest ingredients by name or alias from the in-memory index; ?q= on GET, search_term on POST"""
+        search_term = request.data.get("search_term") or request.query_params.get("q", "")
+        return Response(autocomplete_index.suggest(search_term, limit=10))
+
+
+RECIPE_FIELD_PREFETCHES = {
+    'tags': ('tags',),
+    'ingredients_detail': (
+        Prefetch(
+            'recipeingredient_set',
+            queryset=RecipeIngredient.objects.select_related(
+                'ingredient__category',
+                'ingredient__fodmap_category',
+                'ingredient__default_unit',
+                'unit',
+            ),
+        ),
+    ),
+}
+
+# List rows render tags as names and only show ingredients when expanded
+RECIPE_LIST_PLAN = QueryPlan(per_field={
+    **RECIPE_FIELD_PREFETCHES,
+    'tags': (Prefetch('tags', queryset=Tag.objects.only('id', 'name')),),
+})
+RECIPE_DETAIL_PLAN = QueryPlan(per_field=RECIPE_FIELD_PREFETCHES)
 
 
-class RecipeViewSet(BaseViewSet):
+class RecipeViewSet(QueryPlanMixin, BaseViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
 
@@ -88,19 +138,30 @@ class RecipeViewSet(BaseViewSet):
     ordering_fields = ["created_at", "title", "total_time"]
     ordering = ["-created_at"]
     permission_classes = [IsAuthenticatedOrReadOnly]
-    
-    def get_queryset(self):
-        queryset = Recipe.objects.select_related(
-            'created_by',
-            'created_by__profile'
-        ).prefetch_related(
-            'tags',
-            'recipe_ingredients__ingredient__category',
-            'recipe_ingredients__ingredient__fodmap_category',
-            'recipe_ingredients__unit',
-            'feedback_set__user'
-        )
-        
+
+    filter_backends = BaseViewSet.filter_backends + [TagExpressionFilter, FullTextSearchFilter]
+    tag_index = recipe_facet_index
+
+    list_actions = {'list', 'popular', 'fodmap_friendly', 'by_ingredients', 'favorites'}
+    # Plans follow get_serializer_class(): list rows for list_actions, full recipes otherwise
+    query_plans = {
+        **{action_name: RECIPE_LIST_PLAN for action_name in list_actions},
+        'retrieve': RECIPE_DETAIL_PLAN,
+        'default': RECIPE_DETAIL_PLAN,
+    }
+
+    def get_serializer_class(self):
+        if self.action in self.list_actions:
+            return RecipeListSerializer
+        return RecipeSerializer
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["search_hits"] = getattr(self, "search_hits", None)
+        return context
+
+    def base_queryset(self):
+        queryset = Recipe.objects.all()
         if self.request.GET.get('fodmap_friendly'):
             queryset = queryset.filter(
                 fodmap_friendly=self.request.GET.get('fodmap_friendly') == 'true'
@@ -111,76 +172,198 @@ class RecipeViewSet(BaseViewSet):
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
     
-    def request(self, request, *args, **kwargs):
-        recipe_id = kwargs.get('pk')
-        cache_key = f'recipe_detail_{recipe_id}'
-        
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return Response(cached_data)
-        
-        response = super().retrieve(request, *args, **kwargs)
+    def retrieve(self, request, *args, **kwargs):
+        recipe_id = kwargs['pk']
+        cache_key = CacheKeys.get_recipe_detail(recipe_id, **{
+            param: request.query_params[param]
+            for param in ('fields', 'expand')
+            if param in request.query_params
+        })
         recipe_info_cache_time_in_secs = 60 * 10
-        cache.set(cache_key, response.data, recipe_info_cache_time_in_secs)
-        
-        return response
+
+        data = get_or_fill(
+            cache_key,
+            lambda: super(RecipeViewSet, self).retrieve(request, *args, **kwargs).data,
+            recipe_info_cache_time_in_secs,
+            tags=[f'recipe:{recipe_id}', 'recipe:all'],
+        )
+        return Response(data)
     
     @action(detail=False, methods=['get'])
     def popular(self,request):
-        """Get populate recipes based on ratings and favorites"""
-        cache_key = 'popular_recipes'
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            return Response(cached_data)
-        
-        from django.db.models import Count, Avg, Q
-        recipes = self.get_queryset().annotate(
-            avg_rating=Avg('feedback__rating'),
-            favorites_count=Count(
-                'user_preferences',
-                filter=Q(user_preferences__preference='favorite')
-            ),
-            total_ratings=Count('feedback')
-        ).filter(
-            total_ratings__gte=5
-        ).order_by('-avg_rating', '-favorites_count')[:10]
-        
+        """Get popular recipes based on ratings and favorites"""
+        def fill():
+            recipes = self.get_queryset().filter(
+                rating_count__gte=5
+            ).order_by(rating_average().desc(), '-favorites_count')[:10]
+            return self.get_serializer(recipes, many=True).data
+
         favorites_cache_time_in_secs = 60 * 30
-        serializer = self.get_serializer(recipes, many=True)
-        cache.set(cache_key, serializer.data, favorites_cache_time_in_secs)
+        cache_key = CacheKeys.get_recipe_popular(**{
+            param: request.query_params[param]
+            for param in ('fields', 'expand', 'fodmap_friendly')
+            if param in request.query_params
+        })
+        data = get_or_fill(cache_key, fill, favorites_cache_time_in_secs, tags=['recipe:popular'])
+        return Response(data)
 
-        return Response(serializer.data)
+    @action(detail=False, methods=["get"])
+    def semantic(self, request):
+        """Natural-language search ("quick gut-friendly chicken dinner") over recipe embeddings"""
+        text = request.query_params.get("q", "").strip()
+        if not text:
+            return Response({"error": "Query parameter q is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(request.query_params.get("limit", 10)), 50))
+        except ValueError:
+            return Response({"error": "Invalid limit"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Over-fetch so that policy filtering still leaves `limit` results
+        hits = dict(semantic_index.search(text, k=limit * 3))
+        recipe_ids = list(hits)
+        if request.user.is_authenticated:
+            try:
+                recipe_ids = filter_recipe_ids_by_policy(compile_policy_for_user(request.user), recipe_ids)
+            except UserProfile.DoesNotExist:
+                # Users created outside sign-up have no profile, and so no diet policy
+                pass
+        rows = {
+            row["recipe_id"]: row
+            for row in Recipe.objects.filter(pk__in=recipe_ids).values(
+                "title", "cuisine", "total_time", "fodmap_friendly", recipe_id=F("id")
+            )
+        }
+        results = [{**rows[pk], "score": hits[pk]} for pk in recipe_ids if pk in rows]
+        return Response(results[:limit])
+
+    @action(detail=False, methods=["get"])
+    def facets(self, request):
+        """Counts per tag, cuisine, FODMAP flag and time bucket for the results of the current filters"""
+        data = recipe_facet_index.get()
+        params = request.query_params
+        selected = data.alive
+        try:
+            if params.getlist("tags"):
+                selected &= data.any_tag(uuid.UUID(tag_id) for tag_id in params.getlist("tags"))
+        except ValueError:
+            return Response({"error": "Invalid tag id"}, status=status.HTTP_400_BAD_REQUEST)
+        if params.get("cuisine"):
+            selected &= data.cuisine.get(params["cuisine"], 0)
+        if params.get("fodmap_friendly"):
+            selected &= data.fodmap_friendly.get(params["fodmap_friendly"] == "true", 0)
+        if params.get(TAG_EXPR_PARAM):
+            try:
+                selected &= evaluate(parse(params[TAG_EXPR_PARAM]), data)
+            except TagExpressionError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # Text search cannot be answered from bitmaps; one id query narrows the selection
+        if params.get("search") or params.get(SEARCH_PARAM):
+            selected &= data.bitmap(self.filter_queryset(self.base_queryset()).values_list("pk", flat=True))
+        return Response(data.counts(selected))
+
+    @action(detail=False, methods=["get"])
+    def suggest(self, request):
+        """Top title suggestions for a partial ?q=, served from the in-memory n-gram index"""
+        return Response(title_suggest_index.suggest(request.query_params.get("q", ""), limit=10))
+
+    @action(detail=False, methods=["get"])
+    def trending(self, request):
+        """Get trending recipes from the precomputed rollup, optionally per cuisine or FODMAP flag"""
+        cuisine = request.query_params.get("cuisine")
+        fodmap_friendly = request.query_params.get("fodmap_friendly")
+
+        if cuisine:
+            scope, value = TrendingRecipe.Scope.CUISINE, cuisine.strip().lower()
+        elif fodmap_friendly:
+            scope, value = TrendingRecipe.Scope.FODMAP, str(fodmap_friendly == "true").lower()
+        else:
+            scope, value = TrendingRecipe.Scope.ALL, ""
+
+        rows = TrendingRecipe.objects.filter(
+            scope=scope, scope_value=value, recipe__is_active=True
+        ).order_by("rank").values(
+            "rank",
+            "score",
+            "computed_at",
+            "recipe_id",
+            title=F("recipe__title"),
+            cuisine=F("recipe__cuisine"),
+            total_time=F("recipe__total_time"),
+            fodmap_friendly=F("recipe__fodmap_friendly"),
+        )
+        return Response(list(rows))
+
+    @action(detail=True, methods=["get"])
+    def similar(self, request, pk=None):
+        """Most similar recipes by ingredients, tags and cuisine, precomputed by compute_similar_recipes"""
+        try:
+            recipe_id = uuid.UUID(pk)
+        except ValueError:
+            return Response({"error": "Recipe not found"}, status=status.HTTP_404_NOT_FOUND)
+        rows = RecipeSimilarity.objects.filter(
+            recipe_id=recipe_id, neighbor__is_active=True
+        ).order_by("rank").values(
+            "rank",
+            "score",
+            "neighbor_id",
+            title=F("neighbor__title"),
+            cuisine=F("neighbor__cuisine"),
+            total_time=F("neighbor__total_time"),
+            fodmap_friendly=F("neighbor__fodmap_friendly"),
+        )
+        return Response([{"recipe_id": row.pop("neighbor_id"), **row} for row in rows])
 
     @action(detail=False, methods=["get"])
     def fodmap_friendly(self, request):
         """Get only FODMAP friendly recipes"""
-        recipes = self.queryset.filter(fodmap_friendly=True)
-        page = self.paginate_queryset(recipes)
-
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(recipes, many=True)
-        return Response(serializer.data)
+        recipes = self.filter_queryset(self.get_queryset()).filter(fodmap_friendly=True)
+        return self._paginated(recipes)
 
     @action(detail=False, methods=["get"])
     def by_ingredients(self, request):
-        """Find recipes by given ingredients"""
-        ingredient_ids = request.query_params.getlist("ingredients")
+        """Rank recipes by how much of their ingredient list is covered by the given ingredients.
+
+        ?ingredients=<id>&ingredients=<id> and/or ?use_inventory=true (the user's Inventory),
+        ?limit= (default 20), ?max_missing= to only return recipes missing at most N items.
+        """
+        try:
+            ingredient_ids = {uuid.UUID(i) for i in request.query_params.getlist("ingredients")}
+            limit = max(1, min(int(request.query_params.get("limit", 20)), 100))
+            max_missing = request.query_params.get("max_missing")
+            max_missing = int(max_missing) if max_missing is not None else None
+        except ValueError:
+            return Response({"error": "Invalid ingredient id or number"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.query_params.get("use_inventory") == "true" and request.user.is_authenticated:
+            ingredient_ids |= set(
+                Inventory.objects.filter(user=request.user, quantity__gt=0).values_list("ingredient_id", flat=True)
+            )
         if not ingredient_ids:
             return Response(
                 {"error": "No ingredients provided"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        recipes = Recipe.objects.filter(ingredients__id__in=ingredient_ids).distinct()
-        page = self.paginate_queryset(recipes)
-
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(recipes, many=True)
-        return Response(serializer.data)
+        # Over-fetch so query filters (cuisine, tags, ...) still leave `limit` rows
+        matches = {m.recipe_id: m for m in pantry_index.match(ingredient_ids, k=limit * 3, max_missing=max_missing)}
+        rank = {pk: i for i, pk in enumerate(matches)}
+        recipes = self.filter_queryset(self.get_queryset()).filter(pk__in=list(matches))
+        recipes = sorted(recipes, key=lambda r: rank[r.pk])[:limit]
+
+        missing_names = {}
+        for recipe_id, name in RecipeIngredient.objects.filter(
+            recipe_id__in=[r.pk for r in recipes]
+        ).exclude(ingredient_id__in=ingredient_ids).values_list("recipe_id", "ingredient__name"):
+            missing_names.setdefault(recipe_id, []).append(name)
+
+        results = []
+        for recipe, row in zip(recipes, self.get_serializer(recipes, many=True).data):
+            match = matches[recipe.pk]
+            row["coverage"] = round(match.coverage, 4)
+            row["matched_count"] = match.matched
+            row["missing_count"] = match.missing
+            row["missing_ingredients"] = sorted(set(missing_names.get(recipe.pk, [])))
+            results.append(row)
+        return Response(results)
 
     @action(detail=False, methods=["get"])
     def favorites(self, request):
@@ -188,15 +371,66 @@ class RecipeViewSet(BaseViewSet):
         if not request.user.is_authenticated:
             return Response({"error": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
 
-        favorite_recipes = Recipe.objects.filter(
+        favorite_recipes = self.filter_queryset(self.get_queryset()).filter(
             user_preferences__user=request.user, user_preferences__preference="favorite"
         )
-        page = self.paginate_queryset(favorite_recipes)
+        return self._paginated(favorite_recipes)
+
+    @action(detail=False, methods=["get"])
+    def for_you(self, request):
+        """Personalized recommendations precomputed by train_recommender (already diet-policy filtered)"""
+        if not request.user.is_authenticated:
+            return Response({"error": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        rows = UserRecommendation.objects.filter(
+            user=request.user, recipe__is_active=True
+        ).order_by("rank").values(
+            "rank",
+            "score",
+            "recipe_id",
+            title=F("recipe__title"),
+            cuisine=F("recipe__cuisine"),
+            total_time=F("recipe__total_time"),
+            fodmap_friendly=F("recipe__fodmap_friendly"),
+        )
+        return Response(list(rows))
+
+    @action(detail=False, methods=["get", "post"])
+    def meal_plan(self, request):
+        """Plan ?days= (default 7) meals that use up the pantry, soonest-expiring first, under the diet policy.
+
+        ?max_per_cuisine= and ?max_per_tag= cap repeats (0 disables a cap).
+        POST with save=true also saves the plan as a shopping list named `name`.
+        """
+        if not request.user.is_authenticated:
+            return Response({"error": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
+        params = request.data if request.method == "POST" else request.query_params
+        try:
+            days = min(max(int(params.get("days", DEFAULT_DAYS)), 1), MAX_DAYS)
+            max_per_cuisine = int(params.get("max_per_cuisine", DEFAULT_MAX_PER_CUISINE)) or None
+            max_per_tag = int(params.get("max_per_tag", DEFAULT_MAX_PER_TAG)) or None
+        except (TypeError, ValueError):
+            return Response({"error": "Invalid number"}, status=status.HTTP_400_BAD_REQUEST)
+
+        meals = plan_meals(request.user, days, max_per_cuisine, max_per_tag)
+        result = {
+            "meals": [asdict(meal) for meal in meals],
+            "to_buy": sorted({name for meal in meals for name in meal.to_buy}),
+        }
+        if request.method == "POST" and str(params.get("save", "")).lower() == "true":
+            shopping_list = create_shopping_list(
+                request.user, [meal.recipe_id for meal in meals], name=params.get("name", "")
+            )
+            result["shopping_list_id"] = shopping_list.pk
+        return Response(result)
+
+    def _paginated(self, recipes):
+        page = self.paginate_queryset(recipes)
 
         if page is not None:
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(favorite_recipes, many=True)
+        serializer = self.get_serializer(recipes, many=True)
         return Response(serializer.data)
 
 
@@ -275,6 +509,100 @@ class InventoryViewSet(BaseViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=False, methods=["post"])
+    def bulk_upsert(self, request):
+        """Create or update up to 500 lots in one transaction, with a result per item in request order.
+
+        Body: {"items": [{ingredient_id or ingredient, quantity, unit_id or unit, expiry_date}], "mode": "add" | "set"}.
+        "add" (the default) adds to a matching lot's quantity, "set" replaces it.
+        """
+        items, mode = request.data.get("items"), request.data.get("mode", ADD)
+        if not isinstance(items, list) or not items:
+            return Response({"error": "items must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > MAX_UPSERT_ITEMS:
+            return Response(
+                {"error": f"At most {MAX_UPSERT_ITEMS} items per request"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if mode not in (ADD, SET):
+            return Response({"error": "mode must be add or set"}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = bulk_upsert_inventory(request.user, items, mode)
+        return Response(
+            {
+                "created": sum(r.status == "created" for r in results),
+                "updated": sum(r.status == "updated" for r in results),
+                "errors": sum(r.status == "error" for r in results),
+                "results": [asdict(r) for r in results],
+            }
+        )
+
+    @action(detail=False, methods=["post"])
+    def scan_barcodes(self, request):
+        """Add the products in a batch of photos (multipart "images") to the inventory, one package per barcode.
+
+        Each barcode is looked up by GTIN in the imported product table and added through bulk_upsert.
+        """
+        images, error = _uploaded_images(request, MAX_BARCODE_IMAGES)
+        if error:
+            return error
+        try:
+            scan = ingest_barcode_images(request.user, images)
+        except ImportError:
+            return Response(
+                {"error": "Barcode scanning is not available on this server"}, status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        results = scan.pop("results")
+        return Response(
+            {
+                **scan,
+                "added": sum(r.status in ("created", "updated") for r in results),
+                "results": [asdict(r) for r in results],
+            }
+        )
+
+    @action(detail=False, methods=["post"])
+    def scan_receipts(self, request):
+        """Start a background job that OCRs receipt photos (multipart "images") and adds the matched items.
+
+        Responds 202 with the job; poll /api/ingestion-jobs/{id}/ for progress and the per-line results.
+        """
+        if not ocr_available():
+            return Response(
+                {"error": "Receipt scanning is not available on this server"}, status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        images, error = _uploaded_images(request, MAX_RECEIPT_IMAGES)
+        if error:
+            return error
+        job = start_receipt_job(request.user, images)
+        return Response(IngestionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+def _uploaded_images(request, max_images):
+    """The bytes of the multipart "images" files, or an error response when there are none, too many or too large"""
+    images = request.FILES.getlist("images")
+    if not images:
+        return None, Response({"error": "Upload one or more images"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(images) > max_images:
+        return None, Response({"error": f"At most {max_images} images per request"}, status=status.HTTP_400_BAD_REQUEST)
+    too_large = [image.name for image in images if image.size > MAX_IMAGE_BYTES]
+    if too_large:
+        return None, Response(
+            {"error": f"Images larger than {MAX_IMAGE_BYTES // (1024 * 1024)} MB: {', '.join(too_large)}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return [image.read() for image in images], None
+
+
+class IngestionJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status, progress and results of the user's background inventory imports"""
+
+    serializer_class = IngestionJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = ["kind", "status"]
+
+    def get_queryset(self):
+        return IngestionJob.objects.filter(user=self.request.user)
+
 
 class FeedbackViewSet(BaseViewSet):
     serializer_class = FeedbackSerializer
@@ -288,7 +616,7 @@ class FeedbackViewSet(BaseViewSet):
     ordering = ["-created_at"]
 
     def get_queryset(self):
-        return Feedback.objects.filter(user=self.request.user)
+        return FeedbackSerializer.eager_loading(Feedback.objects.filter(user=self.request.user))
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -298,7 +626,7 @@ class UserProfileViewSet(BaseViewSet):
     serializer_class = UserProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    filterset_fields = ["diet_type"]
+    filterset_fields = ["diet_types"]
 
     search_fields = ["dietary_restrictions__name"]
 
@@ -306,7 +634,7 @@ class UserProfileViewSet(BaseViewSet):
     ordering = ["-created_at"]
 
     def get_queryset(self):
-        return UserProfile.objects.filter(user=self.request.user)
+        return UserProfileSerializer.eager_loading(UserProfile.objects.filter(user=self.request.user))
 
     def perform_create(self, serializer):
         try:
@@ -339,13 +667,15 @@ class FoodPreferenceViewSet(viewsets.ReadOnlyModelViewSet):
     ordering = ["preference"]
 
     def get_queryset(self):
-        return FoodPreference.objects.filter(user=self.request.user)
+        return FoodPreference.objects.filter(user=self.request.user).select_related(
+            "ingredient__category", "ingredient__default_unit", "ingredient__fodmap_category"
+        )
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
-class RecipePreferenceViewSet(viewsets.ReadOnlyModelViewSet):
+class RecipePreferenceViewSet(QueryPlanMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = RecipePreferenceSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -354,7 +684,11 @@ class RecipePreferenceViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ["preference", "recipe__title"]
     ordering = ["preference"]
 
-    def get_queryset(self):
+    query_plans = {
+        'default': QueryPlan(select_related=('recipe',), per_field={'recipe': ('recipe__tags',)}),
+    }
+
+    def base_queryset(self):
         return RecipePreference.objects.filter(user=self.request.user)
 
     def perform_create(self, serializer):